@@ -1,17 +1,19 @@
 import os
-import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from flask_sock import Sock
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from services.logging_config import configure_logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Log through a background thread as JSON; see services/logging_config.py for the LOG_* settings
+configure_logging()
 
 class Base(DeclarativeBase):
     pass
 
 db = SQLAlchemy(model_class=Base)
+sock = Sock()
 
 # Create the app
 app = Flask(__name__)
@@ -27,6 +29,28 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 
 # Configure upload settings
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
+app.config['UPLOAD_CHUNK_SIZE'] = 2 * 1024 * 1024  # Chunk size for resumable uploads
+app.config['MAX_CHUNKED_UPLOAD_SIZE'] = int(os.environ.get("MAX_CHUNKED_UPLOAD_SIZE", 500 * 1024 * 1024))
+# Unfinished chunked uploads idle this long are deleted
+app.config['CHUNKED_UPLOAD_EXPIRY_SECONDS'] = int(os.environ.get("CHUNKED_UPLOAD_EXPIRY_SECONDS", 24 * 3600))
+# Live transcript drafts that are never finalized are deleted after this long without a delta
+app.config['DRAFT_EXPIRY_SECONDS'] = int(os.environ.get("DRAFT_EXPIRY_SECONDS", 24 * 3600))
+# Time budget for one generation job (transcription, title, slides) or export
+app.config['JOB_DEADLINE_SECONDS'] = float(os.environ.get("JOB_DEADLINE_SECONDS", 120))
+# Hand generation to `flask worker` processes through the job table instead of running it in the request
+app.config['USE_JOB_QUEUE'] = os.environ.get("USE_JOB_QUEUE", "false").lower() == "true"
+app.config['JOB_LEASE_SECONDS'] = int(os.environ.get("JOB_LEASE_SECONDS", 60))
+# Threads that serve the Flask routes under `uvicorn asgi:application`
+app.config['ASGI_WSGI_THREADS'] = int(os.environ.get("ASGI_WSGI_THREADS", 32))
+# Request profiling: sample a fraction of requests, or profile requests carrying
+# a token signed with PROFILE_SECRET; profiles over the threshold are kept
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+app.config['PROFILE_SLOW_SECONDS'] = float(os.environ.get("PROFILE_SLOW_SECONDS", 2.0))
+app.config['PROFILE_MAX_FILES'] = int(os.environ.get("PROFILE_MAX_FILES", 50))
+app.config['PROFILE_SECRET'] = os.environ.get("PROFILE_SECRET") or None
+app.config['PROFILE_DIR'] = os.environ.get("PROFILE_DIR") or os.path.join(app.instance_path, 'profiles')
+# Lock files that let processes on this host share identical exports and generations
+app.config['SINGLE_FLIGHT_DIR'] = os.environ.get("SINGLE_FLIGHT_DIR") or os.path.join(app.instance_path, 'single_flight')
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
 
 # Ensure upload directory exists
@@ -34,11 +58,14 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Initialize the app with the extension
 db.init_app(app)
+sock.init_app(app)
 
-with app.app_context():
-    # Import models to create tables
-    import models  # noqa: F401
-    db.create_all()
+# Register the models; their tables are created by `flask init-db` or on the
+# first request (see schema.py), not on import
+import models  # noqa: F401
 
 # Import and register routes
 from routes import *  # noqa: F401, F403
+
+# Register CLI commands
+import cli  # noqa: F401
@@ -0,0 +1,311 @@
+"""
+ASGI entry point: ``uvicorn asgi:application``
+
+Slide generation from a transcript, the status endpoint and the status
+event stream are served natively on the event loop, so a waiting LLM call
+or an idle event stream costs a coroutine rather than a worker. Every
+other request is passed to the Flask app unchanged, on a pool of
+``ASGI_WSGI_THREADS`` threads. Database access stays on the existing sync
+engine and runs in threads.
+The live transcription WebSocket still needs the WSGI server.
+"""
+import re
+import json
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import app, db
+from models import Presentation, TermStatistic
+from schema import ensure_schema, schema_checked
+from routes import (
+    learn_transcript_terms, get_event_bus, publish_status, format_event, transcript_key,
+    transcript_flight, FINAL_STATUSES, EVENT_KEEPALIVE_SECONDS
+)
+from services.slide_generator import SlideGenerator
+from services.keyphrase_extractor import KeyphraseExtractor
+from services.deadline import Deadline, DeadlineExceeded
+from services.scheduler import INTERACTIVE
+from services.tracing import span, current_span
+from services.logging_config import bind_log_context
+
+logger = logging.getLogger(__name__)
+
+STATUS_PATH = re.compile(r'/api/presentations/(\d+)/status')
+EVENTS_PATH = re.compile(r'/api/presentations/(\d+)/events')
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """
+    WsgiToAsgi that runs each request on a thread of its own pool.
+
+    asgiref runs wrapped WSGI apps thread-sensitively by default, which puts
+    every request on one shared thread, so the Flask routes would be served
+    one at a time.
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application, self.executor, self.duplicate_header_limit)(
+            scope, receive, send
+        )
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    # The undecorated method, so it can be wrapped for the pool instead
+    _run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+
+    def __init__(self, wsgi_application, executor, duplicate_header_limit=100):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        run = sync_to_async(self._run_wsgi_app, thread_sensitive=False, executor=self.executor)
+        await run(body)
+
+flask_application = ThreadPoolWsgiToAsgi(app, app.config['ASGI_WSGI_THREADS'])
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        # WebSockets are only served by the WSGI server
+        await send({'type': 'websocket.close', 'code': 1000})
+        return
+
+    if not schema_checked():
+        await run_in_app_context(ensure_schema)
+
+    path, method = scope['path'], scope['method']
+    if path == '/process_transcript' and method == 'POST':
+        return await process_transcript(scope, receive, send)
+    match = STATUS_PATH.fullmatch(path)
+    if match and method == 'GET':
+        return await presentation_status(int(match.group(1)), send)
+    match = EVENTS_PATH.fullmatch(path)
+    if match and method == 'GET':
+        return await presentation_events(int(match.group(1)), receive, send)
+
+    await flask_application(scope, receive, send)
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await run_in_app_context(ensure_schema)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def process_transcript(scope, receive, send):
+    body = await read_body(receive)
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        # A JSON list, string or number carries no transcript
+        data = {}
+
+    if data.get('mode') == 'draft' or app.config['USE_JOB_QUEUE']:
+        # Local drafts are instant and queued jobs return at once, so Flask handles both
+        return await flask_application(scope, replay_body(body, receive), send)
+
+    transcript = data.get('transcript') or ''
+    # A number or object in place of the text is no transcript either
+    transcript = transcript.strip() if isinstance(transcript, str) else ''
+    if not transcript:
+        return await send_json(send, {'error': 'No transcript provided', 'success': False}, 400)
+    if len(transcript.split()) < 10:
+        return await send_json(send, {'error': 'Transcript too short. Please provide at least 10 words.', 'success': False}, 400)
+
+    with span('POST /process_transcript', path=scope['path']) as request_span:
+        deadline = Deadline(app.config['JOB_DEADLINE_SECONDS'])
+        try:
+            # Repeated submits of the same transcript while the first is
+            # still generating get the first one's presentation
+            payload, status = await transcript_flight.do_async(
+                transcript_key(transcript),
+                partial(generate_presentation, scope, transcript, deadline),
+                deadline=deadline
+            )
+        except DeadlineExceeded as e:
+            logger.error(f"Gave up waiting for an identical generation: {str(e)}")
+            payload, status = {'error': 'Generating slides took too long. Please try again with a shorter transcript.', 'success': False}, 504
+        request_span.set_attribute('presentation_id', payload.get('presentation_id'))
+        return await send_json(send, payload, status)
+
+async def generate_presentation(scope, transcript, deadline):
+    """Create a presentation and generate its slides, returning the (payload, status) to send"""
+    presentation_id = None
+    try:
+        slide_generator = await run_in_app_context(create_slide_generator, client_address(scope))
+        presentation_id = await run_in_app_context(create_presentation, slide_generator, transcript, deadline)
+        current_span().set_attribute('presentation_id', presentation_id)
+        bind_log_context(presentation_id=presentation_id)
+        await run_in_app_context(publish_stage, presentation_id, 'generating')
+        slides = await slide_generator.generate_slides_async(transcript, deadline=deadline)
+        if slides and await run_in_app_context(save_slides, presentation_id, slide_generator, transcript, slides):
+            logger.info(f"Presentation {presentation_id} stage timings: {deadline.summary()}")
+            return {
+                'success': True,
+                'presentation_id': presentation_id,
+                'message': 'Slides generated successfully'
+            }, 200
+        logger.error("Failed to generate slides")
+    except DeadlineExceeded as e:
+        logger.error(f"Gave up generating slides for presentation {presentation_id}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error processing transcript: {str(e)}")
+
+    if presentation_id:
+        await run_in_app_context(mark_failed, presentation_id)
+    if deadline.expired():
+        return {'error': 'Generating slides took too long. Please try again with a shorter transcript.', 'success': False}, 504
+    return {'error': 'Failed to generate slides. Please try again with a shorter transcript or check your API key.', 'success': False}, 500
+
+async def presentation_status(presentation_id, send):
+    status = await run_in_app_context(get_status, presentation_id)
+    if status is None:
+        return await send_json(send, {'error': 'Not found'}, 404)
+    await send_json(send, status)
+
+async def presentation_events(presentation_id, receive, send):
+    """Server-sent status events, as in the Flask route of the same path"""
+    bus = get_event_bus()
+    # Subscribe before reading the status so no change can slip in between
+    subscription = await asyncio.to_thread(bus.subscribe, presentation_id, asyncio.get_running_loop())
+    disconnected = asyncio.create_task(wait_for_disconnect(receive))
+    try:
+        current = await run_in_app_context(get_status, presentation_id)
+        if current is None:
+            return await send_json(send, {'error': 'Not found'}, 404)
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send_chunk(send, format_event(current))
+        status = current['status']
+        while status not in FINAL_STATUSES and not disconnected.done():
+            event = await subscription.get_async(timeout=EVENT_KEEPALIVE_SECONDS)
+            if event is None:
+                await send_chunk(send, ': keep-alive\n\n')
+                continue
+            status = event['status']
+            await send_chunk(send, format_event(event))
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        bus.unsubscribe(subscription)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def send_chunk(send, text):
+    await send({'type': 'http.response.body', 'body': text.encode(), 'more_body': True})
+
+def create_slide_generator(client_id):
+    # Term statistics are looked up from worker threads, so each lookup
+    # brings its own app context
+    extractor = KeyphraseExtractor(
+        lookup=partial(in_app_context, TermStatistic.lookup),
+        document_count=TermStatistic.total_documents()
+    )
+    return SlideGenerator(keyphrase_extractor=extractor, priority=INTERACTIVE, client_id=client_id)
+
+def create_presentation(slide_generator, transcript, deadline):
+    title = slide_generator.generate_presentation_title(transcript, deadline=deadline)
+    learn_transcript_terms(transcript)
+    presentation = Presentation(title=title, transcript=transcript, status='processing')
+    db.session.add(presentation)
+    with span('db.commit'):
+        db.session.commit()
+    return presentation.id
+
+def save_slides(presentation_id, slide_generator, transcript, slides):
+    presentation = db.session.get(Presentation, presentation_id)
+    if not presentation:
+        return False
+    slide_generator.assign_source_spans(transcript, slides)
+    presentation.set_slides(slides)
+    presentation.status = 'completed'
+    with span('db.commit'):
+        db.session.commit()
+    publish_status(presentation)
+    return True
+
+def publish_stage(presentation_id, stage):
+    presentation = db.session.get(Presentation, presentation_id)
+    if presentation:
+        publish_status(presentation, stage=stage)
+
+def mark_failed(presentation_id):
+    presentation = db.session.get(Presentation, presentation_id)
+    if presentation:
+        presentation.status = 'error'
+        db.session.commit()
+        publish_status(presentation)
+
+def get_status(presentation_id):
+    presentation = db.session.get(Presentation, presentation_id)
+    if not presentation:
+        return None
+    return {'status': presentation.status, 'title': presentation.title}
+
+def in_app_context(func, *args):
+    with app.app_context():
+        return func(*args)
+
+async def run_in_app_context(func, *args):
+    """Run blocking database work in a thread with its own app context and session"""
+    return await asyncio.to_thread(in_app_context, func, *args)
+
+def client_address(scope):
+    # Match ProxyFix: trust the first X-Forwarded-For hop
+    for name, value in scope.get('headers', []):
+        if name == b'x-forwarded-for':
+            return value.decode('latin-1').split(',')[0].strip()
+    client = scope.get('client')
+    return client[0] if client else None
+
+async def read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+def replay_body(body, receive):
+    """Return a receive callable that yields an already-read body again"""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+
+    return replay
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,141 @@
+"""
+Cold-start report: how long a fresh process takes to import the app, how
+much memory it holds afterwards, and which imports the time goes to.
+
+    python -m benchmarks.boot_time
+    python -m benchmarks.boot_time --target asgi --repeat 10 --top 20
+    python -m benchmarks.boot_time --output boot.json
+
+Every run starts a new interpreter, the way an autoscaled worker does, so
+nothing is cached in memory between runs (the OS file cache stays warm).
+The timed runs import the target plainly; one more run with
+``-X importtime`` gives the per-module breakdown. The report also lists
+which of the known heavy packages were loaded at boot: they should only
+load when the work that needs them first runs.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that take a large share of boot time when imported eagerly
+HEAVY_MODULES = ('anthropic', 'weasyprint', 'speech_recognition', 'pydub', 'numpy', 'httpx')
+
+# What each process kind imports at startup
+TARGETS = {
+    'app': 'app',  # gunicorn / flask web workers
+    'asgi': 'asgi',  # uvicorn asgi:application
+}
+
+CHILD = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'import_seconds': seconds,
+    'peak_rss_mib': peak / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+    'modules': len(sys.modules),
+    'heavy_loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def run_child(module, database_url, importtime=False):
+    """
+    Import ``module`` in a new interpreter and return its measurements
+    and stderr
+    """
+    code = CHILD.format(module=module, heavy=HEAVY_MODULES)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def parse_importtime(stderr):
+    """
+    Return (module, self_us, cumulative_us, depth) rows from -X importtime output
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, int(self_us), int(cumulative_us), depth))
+    return rows
+
+def report(target, repeat=5, top=15, database_url=None):
+    module = TARGETS[target]
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Importing must not touch the database, but point it somewhere harmless
+        database_url = database_url or f"sqlite:///{os.path.join(work_dir, 'boot.db')}"
+        runs = [run_child(module, database_url)[0] for _ in range(repeat)]
+        _, stderr = run_child(module, database_url, importtime=True)
+
+    rows = parse_importtime(stderr)
+    # Top-level imports of the app's own modules hide their dependencies,
+    # so rank every third-party package by its own top-level import
+    packages = {}
+    for name, self_us, cumulative_us, depth in rows:
+        package = name.split('.')[0]
+        if '.' not in name and package not in packages:
+            packages[package] = cumulative_us
+    local = {'app', 'routes', 'models', 'cli', 'asgi', 'services', 'benchmarks'}
+    heaviest = sorted(
+        ((name, us) for name, us in packages.items() if name not in local),
+        key=lambda item: -item[1]
+    )[:top]
+
+    times = [run['import_seconds'] for run in runs]
+    return {
+        'target': target,
+        'python': sys.version.split()[0],
+        'runs': repeat,
+        'import_seconds': {
+            'min': min(times),
+            'median': statistics.median(times),
+            'max': max(times),
+        },
+        'peak_rss_mib': statistics.median(run['peak_rss_mib'] for run in runs),
+        'modules_loaded': runs[-1]['modules'],
+        'heavy_loaded': runs[-1]['heavy_loaded'],
+        'slowest_packages': [{'package': name, 'milliseconds': us / 1000} for name, us in heaviest],
+    }
+
+def print_report(result):
+    seconds = result['import_seconds']
+    print(f"Import of '{result['target']}' over {result['runs']} fresh processes (Python {result['python']})")
+    print(f"  time      min {seconds['min'] * 1000:.0f} ms  median {seconds['median'] * 1000:.0f} ms  max {seconds['max'] * 1000:.0f} ms")
+    print(f"  memory    peak RSS {result['peak_rss_mib']:.1f} MiB, {result['modules_loaded']} modules")
+    heavy = ', '.join(result['heavy_loaded']) or 'none'
+    print(f"  heavy packages loaded at boot: {heavy}")
+    print('  slowest packages (cumulative import time):')
+    for entry in result['slowest_packages']:
+        print(f"    {entry['package']:<28} {entry['milliseconds']:>8.1f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=sorted(TARGETS), default='app', help='Entry point to import')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes to time')
+    parser.add_argument('--top', type=int, default=15, help='Packages to list')
+    parser.add_argument('--database-url', help='DATABASE_URL for the child processes (defaults to a temporary SQLite file)')
+    parser.add_argument('--output', help='Also write the report as JSON to this file')
+    options = parser.parse_args(argv)
+
+    result = report(options.target, repeat=options.repeat, top=options.top, database_url=options.database_url)
+    print_report(result)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import json
+import random
+from types import SimpleNamespace
+from services.slide_generator import SlideGenerator
+from services.llm_router import ModelRouter
+from services.scheduler import Scheduler
+from benchmarks.fixtures import generate_transcript, generate_slides_response
+
+# Speaking rate used to size fake transcripts to the audio they came from
+WORDS_PER_SECOND = 2.5
+
+class FakeSpeechBackend:
+    """
+    Recognition backend that returns a fixed transcript sized to the audio,
+    so transcription benchmarks measure everything but the network call
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def recognize(self, audio_data, timeout=None):
+        seconds = len(audio_data.frame_data) / (audio_data.sample_rate * audio_data.sample_width)
+        return generate_transcript(max(1, int(seconds * WORDS_PER_SECOND)), seed=self.seed)
+
+def deck_size(prompt):
+    """
+    One slide per 150 words of prompt, as a real deck roughly would be
+    """
+    return min(40, max(5, len(prompt.split()) // 150))
+
+class FakeMessages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, messages, **options):
+        self.client.calls += 1
+        prompt = messages[-1]['content']
+        text = generate_slides_response(deck_size(prompt), seed=self.client.seed)
+        return SimpleNamespace(
+            model=model,
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(
+                input_tokens=len(prompt) // 4,
+                output_tokens=len(text) // 4,
+                cache_read_input_tokens=0,
+                cache_creation_input_tokens=0
+            )
+        )
+
+class FakeAnthropic:
+    """
+    Stand-in for the Anthropic client: ``messages.create`` answers at once
+    with a deterministic deck in the format the slide prompt asks for
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.calls = 0
+        self.messages = FakeMessages(self)
+
+    def with_options(self, **options):
+        return self
+
+def unlimited_scheduler():
+    """
+    Return a scheduler that never makes a benchmark wait for a slot
+    """
+    scheduler = Scheduler()
+    for upstream in ('anthropic', 'speech'):
+        scheduler.configure(upstream, rate_per_minute=1e9, max_concurrency=1000, burst=1000)
+    return scheduler
+
+def fake_slide_generator(seed=0):
+    """
+    Return a SlideGenerator on the Anthropic engine whose API calls go to FakeAnthropic
+    """
+    slide_generator = SlideGenerator(engine='local')
+    # Built as a local generator so no API key is needed, then switched over
+    slide_generator.engine = 'anthropic'
+    slide_generator.local_fallback = False
+    slide_generator.client = FakeAnthropic(seed)
+    slide_generator.router = ModelRouter(
+        slide_generator.client,
+        default_model=slide_generator.model,
+        scheduler=unlimited_scheduler()
+    )
+    return slide_generator
+
+class FakePresentation:
+    """
+    The parts of a Presentation that exports read, without a database
+    """
+
+    def __init__(self, title, slides, id=None):
+        self.id = id
+        self.title = title
+        self._slides = json.dumps(slides)
+
+    def get_slides(self):
+        return json.loads(self._slides)
+
+def fake_presentation(slide_count, seed=0):
+    slide_generator = SlideGenerator(engine='local')
+    slides = slide_generator._parse_slides_response(generate_slides_response(slide_count, seed=seed))
+    return FakePresentation(f"Benchmark deck ({slide_count} slides)", slides)
+
+def image_prompts(count, seed=0):
+    """
+    Return image prompts covering every icon category and the default
+    """
+    subjects = [
+        'planet earth and climate', 'digital technology', 'business meeting',
+        'medical doctor', 'school and learning', 'budget and money', 'abstract idea'
+    ]
+    rng = random.Random(seed)
+    return [f"simple icon of {rng.choice(subjects)}" for _ in range(count)]
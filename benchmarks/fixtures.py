@@ -0,0 +1,111 @@
+import os
+import json
+import wave
+import random
+import numpy as np
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fixtures')
+
+SAMPLE_RATE = 16000
+
+VOCABULARY = (
+    "the model data training network learning results system process energy "
+    "climate research students budget market customers product design team "
+    "analysis growth risk value performance memory latency users question "
+    "important because however therefore we our this that with from into "
+    "measure improve build explain compare deliver review plan test scale"
+).split()
+
+def generate_transcript(word_count, seed=0):
+    """
+    Return a deterministic transcript of ``word_count`` words in sentences
+    of 8 to 20 words
+    """
+    rng = random.Random(seed)
+    sentences = []
+    remaining = word_count
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 20))
+        words = [rng.choice(VOCABULARY) for _ in range(length)]
+        sentences.append(' '.join(words).capitalize() + '.')
+        remaining -= length
+    return ' '.join(sentences)
+
+def generate_slides_response(slide_count, seed=0):
+    """
+    Return a model response in the shape the slide prompt asks for: a
+    title slide, content and comparison slides and a closing slide
+    """
+    rng = random.Random(seed)
+
+    def phrase(words):
+        return ' '.join(rng.choice(VOCABULARY) for _ in range(words)).capitalize()
+
+    slides = [{
+        'slide_number': 1, 'type': 'title', 'title': phrase(4), 'subtitle': phrase(6),
+        'image_prompt': 'planet earth and climate', 'layout': 'centered', 'speaker_notes': phrase(20)
+    }]
+    for number in range(2, slide_count):
+        if number % 4 == 0:
+            slides.append({
+                'slide_number': number, 'type': 'comparison', 'title': phrase(3),
+                'left_column': {'title': phrase(2), 'content': [phrase(6) for _ in range(3)]},
+                'right_column': {'title': phrase(2), 'content': [phrase(6) for _ in range(3)]},
+                'layout': 'two_column', 'speaker_notes': phrase(30)
+            })
+        else:
+            slides.append({
+                'slide_number': number, 'type': 'content', 'title': phrase(3),
+                'content': [phrase(8) for _ in range(4)],
+                'image_prompt': rng.choice(['digital technology', 'business meeting', 'budget and money']),
+                'layout': 'text_with_image', 'speaker_notes': phrase(40)
+            })
+    slides.append({
+        'slide_number': slide_count, 'type': 'ending', 'title': 'Questions?', 'subtitle': 'Thank you',
+        'image_prompt': 'closing', 'layout': 'centered', 'speaker_notes': phrase(10)
+    })
+    # Models often wrap the JSON in a sentence, which the parser has to skip
+    return "Here are the slides:\n" + json.dumps({'slides': slides}, indent=2)
+
+def audio_fixture(minutes, seed=0):
+    """
+    Return the path of a mono 16 kHz WAV recording of ``minutes`` length,
+    generating it on first use. The signal is deterministic noise shaped
+    into syllable-length bursts, so it compresses and decodes like speech
+    rather than silence.
+    """
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, f"speech_{minutes}min.wav")
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng(seed)
+    temp_path = f"{path}.tmp"
+    with wave.open(temp_path, 'wb') as output:
+        output.setnchannels(1)
+        output.setsampwidth(2)
+        output.setframerate(SAMPLE_RATE)
+        # Ten seconds at a time, so an hour never has to fit in memory
+        remaining = int(minutes * 60 * SAMPLE_RATE)
+        while remaining > 0:
+            t = np.arange(min(remaining, SAMPLE_RATE * 10)) / SAMPLE_RATE
+            remaining -= t.size
+            envelope = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None)
+            tone = np.sin(2 * np.pi * rng.uniform(120, 240) * t)
+            signal = (0.6 * tone + 0.2 * rng.standard_normal(t.size)) * envelope
+            output.writeframes((signal * 12000).astype('<i2').tobytes())
+    os.replace(temp_path, path)
+    return path
+
+def encoded_audio_fixture(minutes, audio_format='ogg'):
+    """
+    Return the WAV fixture encoded as ``audio_format``, the way browsers
+    upload it. Needs ffmpeg.
+    """
+    from pydub import AudioSegment
+
+    path = os.path.join(FIXTURE_DIR, f"speech_{minutes}min.{audio_format}")
+    if not os.path.exists(path):
+        AudioSegment.from_wav(audio_fixture(minutes)).export(f"{path}.tmp", format=audio_format)
+        os.replace(f"{path}.tmp", path)
+    return path
@@ -0,0 +1,349 @@
+"""
+Concurrent load test against the Flask app.
+
+    python -m benchmarks.load_test --concurrency 16 --duration 60
+    python -m benchmarks.load_test --mix transcript=1,status=10 --llm-latency 2.5
+
+By default the real app is served in this process by a threaded WSGI
+server, on a fresh SQLite database, with the upstreams stubbed: Anthropic
+requests go to a local HTTP stub (through ANTHROPIC_BASE_URL) and speech
+recognition returns a fixed transcript. Both stubs take a configurable
+latency, so the app sees upstream waits like production's without the
+network or the cost.
+
+To load a separately started deployment (e.g. gunicorn with several
+workers), pass ``--url``. Start it with ANTHROPIC_BASE_URL pointing at a
+stub from ``--serve-stub PORT``; its speech recognition is not stubbed, so
+leave ``upload`` out of the mix unless it should reach the real service.
+
+Virtual users each send one request at a time, chosen at random by the
+weights in ``--mix``. Latency percentiles, error rates and throughput are
+reported per route and written as JSON with ``--output``.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.fakes import FakeSpeechBackend, deck_size
+from benchmarks.fixtures import audio_fixture, generate_transcript, generate_slides_response
+
+ROUTES = ('upload', 'transcript', 'status', 'export')
+
+DEFAULT_MIX = 'upload=1,transcript=3,status=20,export=2'
+
+class AnthropicStub(ThreadingHTTPServer):
+    """
+    HTTP server answering the Messages API with a deterministic deck after ``latency`` seconds
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0):
+        super().__init__(('127.0.0.1', port), AnthropicStubHandler)
+        self.latency = latency
+        self.calls = 0
+        # Model of each request, in arrival order
+        self.models = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class AnthropicStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server._lock:
+            self.server.calls += 1
+            self.server.models.append(request.get('model'))
+        time.sleep(self.server.latency)
+
+        prompt = request.get('messages', [{}])[-1].get('content', '')
+        if isinstance(prompt, list):
+            prompt = ' '.join(block.get('text', '') for block in prompt)
+        text = generate_slides_response(deck_size(prompt))
+        body = json.dumps({
+            'id': f"msg_{uuid.uuid4().hex}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_in_thread(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_local_app(options, stub):
+    """
+    Import the app against a throwaway database and the stubs, and serve it
+    on a free port. Returns the base URL.
+    """
+    work_dir = tempfile.mkdtemp(prefix='load-test-')
+    os.environ['DATABASE_URL'] = options.database_url or f"sqlite:///{os.path.join(work_dir, 'load_test.db')}"
+    os.environ['ANTHROPIC_API_KEY'] = 'load-test'
+    os.environ['ANTHROPIC_BASE_URL'] = stub.url
+
+    from services import audio_processor
+    backend = FakeSpeechBackend()
+
+    def recognize(self, audio_data, timeout=None):
+        time.sleep(options.speech_latency)
+        return backend.recognize(audio_data, timeout)
+
+    audio_processor.GoogleSpeechBackend.recognize = recognize
+
+    from werkzeug.serving import make_server
+    from app import app, db
+    import routes
+
+    with app.app_context():
+        db.create_all()
+
+    # Keep uploaded recordings out of the checkout
+    routes.get_upload_folder = lambda: os.path.join(work_dir, 'uploads')
+
+    # app.py turns on debug logging for the whole process, and werkzeug
+    # logs every request at INFO
+    for name in (None, 'werkzeug'):
+        logging.getLogger(name).setLevel(options.log_level)
+    server = serve_in_thread(make_server('127.0.0.1', 0, app, threaded=True))
+    return f"http://127.0.0.1:{server.server_port}"
+
+class LoadTest:
+    """
+    Drive the app with ``concurrency`` virtual users for ``duration`` seconds
+    """
+
+    def __init__(self, base_url, mix, concurrency=8, duration=30, transcript_words=400,
+                 audio_minutes=0.25, timeout=120, seed=0):
+        self.base_url = base_url.rstrip('/')
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.timeout = timeout
+        self.seed = seed
+        self.transcript = generate_transcript(transcript_words, seed=seed)
+        with open(audio_fixture(audio_minutes), 'rb') as f:
+            self.audio = f.read()
+        self.presentation_ids = []
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def run(self):
+        # Status and export requests need finished presentations to ask about
+        for _ in range(min(self.concurrency, 4)):
+            self.send('transcript')
+        if not self.presentation_ids:
+            raise RuntimeError('Could not create any presentations; is the app up?')
+        self.samples.clear()
+        self.statuses.clear()
+
+        stop_at = time.perf_counter() + self.duration
+        users = [
+            threading.Thread(target=self._user, args=(random.Random(self.seed + i), stop_at), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        start_time = time.perf_counter()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        return self.report(time.perf_counter() - start_time)
+
+    def _user(self, rng, stop_at):
+        while time.perf_counter() < stop_at:
+            self.send(rng.choices(self.routes, self.weights)[0], rng)
+
+    def send(self, route, rng=random):
+        request = getattr(self, f"_{route}_request")(rng)
+        start_time = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status = response.status
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, b''
+        except Exception as e:
+            status, body = type(e).__name__, b''
+        latency = time.perf_counter() - start_time
+
+        ok = isinstance(status, int) and status < 400
+        if ok and route in ('upload', 'transcript'):
+            presentation_id = json.loads(body).get('presentation_id')
+            if presentation_id:
+                with self._lock:
+                    self.presentation_ids.append(presentation_id)
+        with self._lock:
+            self.samples[route].append((latency, ok))
+            self.statuses[route][str(status)] += 1
+
+    def _upload_request(self, rng):
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="audio_file"; filename="load_test.wav"\r\n'
+            f"Content-Type: audio/wav\r\n\r\n"
+        ).encode() + self.audio + f"\r\n--{boundary}--\r\n".encode()
+        return urllib.request.Request(
+            f"{self.base_url}/upload_audio",
+            data=body,
+            headers={'Content-Type': f"multipart/form-data; boundary={boundary}"}
+        )
+
+    def _transcript_request(self, rng):
+        return urllib.request.Request(
+            f"{self.base_url}/process_transcript",
+            data=json.dumps({'transcript': self.transcript}).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+
+    def _status_request(self, rng):
+        return urllib.request.Request(f"{self.base_url}/api/presentations/{self._pick_presentation(rng)}/status")
+
+    def _export_request(self, rng):
+        return urllib.request.Request(f"{self.base_url}/export/{self._pick_presentation(rng)}/pdf")
+
+    def _pick_presentation(self, rng):
+        with self._lock:
+            return rng.choice(self.presentation_ids)
+
+    def report(self, elapsed):
+        routes = {}
+        all_latencies = []
+        all_errors = 0
+        for route in ROUTES:
+            samples = self.samples.get(route)
+            if not samples:
+                continue
+            latencies = sorted(latency for latency, ok in samples)
+            errors = sum(1 for latency, ok in samples if not ok)
+            all_latencies.extend(latencies)
+            all_errors += errors
+            routes[route] = summarize(latencies, errors, elapsed)
+            routes[route]['statuses'] = dict(self.statuses[route])
+        return {
+            'base_url': self.base_url,
+            'concurrency': self.concurrency,
+            'elapsed_seconds': elapsed,
+            'routes': routes,
+            'total': summarize(sorted(all_latencies), all_errors, elapsed),
+        }
+
+def percentile(latencies, p):
+    """
+    Nearest-rank percentile of sorted latencies
+    """
+    if not latencies:
+        return None
+    rank = max(1, -(-len(latencies) * p // 100))
+    return latencies[int(rank) - 1]
+
+def summarize(latencies, errors, elapsed):
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': errors / count if count else 0.0,
+        'throughput_rps': count / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': latencies[-1] if latencies else None,
+    }
+
+def print_report(report):
+    print(f"{report['concurrency']} users for {report['elapsed_seconds']:.1f}s against {report['base_url']}")
+    print(f"{'route':<12} {'requests':>9} {'rps':>8} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in list(report['routes'].items()) + [('total', report['total'])]:
+        print(
+            f"{route:<12} {stats['requests']:>9} {stats['throughput_rps']:>8.1f} "
+            f"{stats['error_rate']:>7.1%} {milliseconds(stats['p50']):>9} "
+            f"{milliseconds(stats['p95']):>9} {milliseconds(stats['p99']):>9}"
+        )
+
+def milliseconds(seconds):
+    return '-' if seconds is None else f"{seconds * 1000:.0f}"
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route '{route}', expected one of {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the app with stubbed upstreams.')
+    parser.add_argument('--url', help='Load an already running server instead of starting the app here')
+    parser.add_argument('--serve-stub', type=int, metavar='PORT', help='Only run the Anthropic stub on PORT')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Route weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help='Virtual users')
+    parser.add_argument('--duration', '-d', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='Seconds the Anthropic stub takes per call')
+    parser.add_argument('--speech-latency', type=float, default=0.5, help='Seconds stubbed recognition takes per call')
+    parser.add_argument('--transcript-words', type=int, default=400, help='Size of submitted transcripts')
+    parser.add_argument('--audio-minutes', type=float, default=0.25, help='Length of uploaded recordings')
+    parser.add_argument('--database-url', help='Database for the local app (default: a temporary SQLite file)')
+    parser.add_argument('--timeout', type=float, default=120, help='Client timeout per request')
+    parser.add_argument('--log-level', default='WARNING', help='Log level for the local app')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    stub = serve_in_thread(AnthropicStub(options.serve_stub or 0, options.llm_latency))
+
+    if options.serve_stub:
+        print(f"Anthropic stub listening on {stub.url}; start the app with ANTHROPIC_BASE_URL={stub.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    base_url = options.url or start_local_app(options, stub)
+    load_test = LoadTest(
+        base_url,
+        options.mix,
+        concurrency=options.concurrency,
+        duration=options.duration,
+        transcript_words=options.transcript_words,
+        audio_minutes=options.audio_minutes,
+        timeout=options.timeout
+    )
+    report = load_test.run()
+    if not options.url:
+        report['upstream_calls'] = {'anthropic': stub.calls}
+    print_report(report)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {options.output}")
+
+if __name__ == '__main__':
+    sys.exit(main())
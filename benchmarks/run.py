@@ -0,0 +1,295 @@
+"""
+Offline benchmarks for the voice-to-slides pipeline.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --only transcribe_audio --audio-minutes 1 10
+    python -m benchmarks.run --compare benchmarks/results/<earlier run>.json
+    python -m benchmarks.run --smoke
+
+The speech recognizer and the Anthropic client are replaced by
+deterministic fakes, and audio and transcript fixtures are generated on
+first use, so runs need no network and are comparable between machines
+and commits. Each case is run once under tracemalloc for its peak memory
+(which also warms it up) and then timed ``--repeat`` times without it.
+Results are written as JSON to ``benchmarks/results``.
+
+``--smoke`` runs every benchmark once on the smallest inputs and exits
+non-zero if any case fails, as a quick check that the benchmarks still
+work against the current code.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime
+from services.audio_processor import AudioProcessor
+from services.slide_generator import SlideGenerator
+from services.deadline import Deadline
+from benchmarks.fakes import (
+    FakeSpeechBackend, unlimited_scheduler, fake_slide_generator, fake_presentation, image_prompts
+)
+from benchmarks.fixtures import (
+    audio_fixture, encoded_audio_fixture, generate_transcript, generate_slides_response
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Long enough that no benchmark hits it; used only to collect stage timings
+STAGE_CLOCK_SECONDS = 10 ** 9
+
+class Skip(Exception):
+    """
+    Raised by a benchmark that cannot run in this environment
+    """
+
+class Case:
+    """
+    One benchmark input. ``run`` does one iteration and returns the stage
+    timings it recorded, if any; ``work`` is the amount processed per
+    iteration, in ``unit``, for throughput.
+    """
+
+    def __init__(self, name, run, work, unit):
+        self.name = name
+        self.run = run
+        self.work = work
+        self.unit = unit
+
+def bench_convert_to_wav(options):
+    if not shutil.which('ffmpeg'):
+        raise Skip('ffmpeg is not installed')
+    processor = AudioProcessor(backend=FakeSpeechBackend(), scheduler=unlimited_scheduler())
+    for minutes in options.audio_minutes:
+        source = encoded_audio_fixture(minutes)
+
+        def run(source=source):
+            wav_path = processor._convert_to_wav(source)
+            if wav_path == source:
+                raise RuntimeError('Conversion failed')
+            os.remove(wav_path)
+
+        yield Case(f"{minutes}min", run, minutes * 60, 'audio s')
+
+def bench_transcribe_audio(options):
+    processor = AudioProcessor(backend=FakeSpeechBackend(), scheduler=unlimited_scheduler())
+    for minutes in options.audio_minutes:
+        path = audio_fixture(minutes)
+
+        def run(path=path):
+            deadline = Deadline(STAGE_CLOCK_SECONDS)
+            if not processor.transcribe_audio(path, deadline=deadline):
+                raise RuntimeError('Transcription failed')
+            return deadline.timings
+
+        yield Case(f"{minutes}min", run, minutes * 60, 'audio s')
+
+def bench_parse_slides_response(options):
+    slide_generator = SlideGenerator(engine='local')
+    for slide_count in options.slides:
+        content = generate_slides_response(slide_count)
+
+        def run(content=content):
+            if not slide_generator._parse_slides_response(content):
+                raise RuntimeError('Parsing failed')
+
+        yield Case(f"{slide_count}slides", run, slide_count, 'slides')
+
+def bench_generate_svg_icon(options):
+    slide_generator = SlideGenerator(engine='local')
+    prompts = image_prompts(1000)
+
+    def run():
+        for prompt in prompts:
+            slide_generator._generate_svg_icon(prompt)
+
+    yield Case('1000icons', run, len(prompts), 'icons')
+
+def bench_generate_slides(options):
+    slide_generator = fake_slide_generator()
+    for word_count in options.transcript_words:
+        transcript = generate_transcript(word_count)
+
+        def run(transcript=transcript):
+            deadline = Deadline(STAGE_CLOCK_SECONDS)
+            if not slide_generator.generate_slides(transcript, deadline=deadline):
+                raise RuntimeError('Slide generation failed')
+            return deadline.timings
+
+        yield Case(f"{word_count}words", run, word_count, 'words')
+
+def export_benchmark(export_format):
+    def bench(options):
+        if export_format == 'pdf':
+            try:
+                import weasyprint  # noqa: F401
+            except (ImportError, OSError) as e:
+                # WeasyPrint needs system libraries (Pango) as well as the package
+                raise Skip(f"WeasyPrint is unavailable: {str(e)}")
+        from services.export_service import ExportService
+        export = getattr(ExportService(), f"export_{export_format}")
+        for slide_count in options.slides:
+            presentation = fake_presentation(slide_count)
+
+            def run(presentation=presentation):
+                deadline = Deadline(STAGE_CLOCK_SECONDS)
+                os.remove(export(presentation, deadline=deadline))
+                return deadline.timings
+
+            yield Case(f"{slide_count}slides", run, slide_count, 'slides')
+    return bench
+
+BENCHMARKS = {
+    'convert_to_wav': bench_convert_to_wav,
+    'transcribe_audio': bench_transcribe_audio,
+    'parse_slides_response': bench_parse_slides_response,
+    'generate_svg_icon': bench_generate_svg_icon,
+    'generate_slides': bench_generate_slides,
+    'export_html': export_benchmark('html'),
+    'export_pdf': export_benchmark('pdf'),
+}
+
+def measure(case, repeat):
+    tracemalloc.start()
+    try:
+        case.run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    durations = []
+    stage_runs = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        stages = case.run()
+        durations.append(time.perf_counter() - start_time)
+        stage_runs.append(stages or {})
+
+    median = statistics.median(durations)
+    stage_names = sorted({name for stages in stage_runs for name in stages})
+    return {
+        'runs': repeat,
+        'seconds': {
+            'min': min(durations),
+            'median': median,
+            'mean': statistics.mean(durations),
+            'max': max(durations),
+        },
+        'throughput': {'value': case.work / median if median else None, 'unit': f"{case.unit}/s"},
+        'peak_memory_bytes': peak_memory,
+        'stages': {
+            name: statistics.median(stages.get(name, 0.0) for stages in stage_runs)
+            for name in stage_names
+        },
+    }
+
+def run_benchmarks(options):
+    results = []
+    for name in options.only or BENCHMARKS:
+        try:
+            for case in BENCHMARKS[name](options):
+                result = {'benchmark': name, 'case': case.name}
+                try:
+                    result.update(measure(case, options.repeat))
+                    print_result(result)
+                except Exception as e:
+                    result['error'] = str(e)
+                    print(f"{name:<22} {case.name:<12} error: {str(e)}")
+                results.append(result)
+        except Skip as e:
+            results.append({'benchmark': name, 'skipped': str(e)})
+            print(f"{name:<22} skipped: {str(e)}")
+    return results
+
+def print_result(result):
+    throughput = result['throughput']
+    print(
+        f"{result['benchmark']:<22} {result['case']:<12} "
+        f"median {result['seconds']['median'] * 1000:10.2f} ms  "
+        f"{throughput['value'] or 0:12.1f} {throughput['unit']:<12} "
+        f"peak {result['peak_memory_bytes'] / 2 ** 20:8.1f} MiB"
+    )
+
+def compare(results, baseline_path):
+    """
+    Print how each case's median time changed against an earlier run
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (result['benchmark'], result.get('case')): result
+            for result in json.load(f)['results']
+        }
+    print(f"\nCompared with {baseline_path} (ratio of median times, below 1 is faster):")
+    for result in results:
+        previous = baseline.get((result['benchmark'], result.get('case')))
+        if 'seconds' not in result or not previous or 'seconds' not in previous:
+            continue
+        ratio = result['seconds']['median'] / previous['seconds']['median']
+        memory_ratio = result['peak_memory_bytes'] / max(1, previous['peak_memory_bytes'])
+        print(f"{result['benchmark']:<22} {result['case']:<12} time x{ratio:6.2f}  memory x{memory_ratio:6.2f}")
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline pipeline benchmarks.')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (default: all)')
+    parser.add_argument('--audio-minutes', nargs='+', type=int, default=[1, 10, 60], help='Audio fixture lengths')
+    parser.add_argument('--slides', nargs='+', type=int, default=[6, 20, 100], help='Deck sizes for parsing and export')
+    parser.add_argument('--transcript-words', nargs='+', type=int, default=[500, 5000, 20000], help='Transcript fixture sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier result file to compare against')
+    parser.add_argument('--smoke', action='store_true', help='Run each benchmark once on the smallest inputs and fail on any error')
+    options = parser.parse_args(argv)
+    if options.smoke:
+        options.audio_minutes = [min(options.audio_minutes)]
+        options.slides = [min(options.slides)]
+        options.transcript_words = [min(options.transcript_words)]
+        options.repeat = 1
+    return options
+
+def main(argv=None):
+    options = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    started_at = datetime.now()
+    results = run_benchmarks(options)
+    report = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': vars(options),
+        'results': results,
+    }
+
+    output = options.output or os.path.join(RESULTS_DIR, f"{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if options.compare:
+        compare(results, options.compare)
+
+    failed = [f"{result['benchmark']} {result['case']}" for result in results if 'error' in result]
+    if failed:
+        print(f"{len(failed)} benchmark cases failed: {', '.join(failed)}")
+        if options.smoke:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os
+import click
+from app import app, db
+from models import TranscriptDraft
+from schema import SchemaError, ensure_schema, upgrade_schema
+from routes import JOB_HANDLERS, get_job_queue, get_upload_manager, mark_job_presentation_failed, profiler
+from services.job_queue import Worker
+from services.batch_converter import BatchConverter
+from services.assets import build_assets, BUILD_DIRECTORY
+from services.metrics import start_http_server
+from services.tracing import default_trace_file, load_traces, trace_rows
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create missing database tables and add columns newer models expect."""
+    try:
+        added = upgrade_schema()
+    except SchemaError as e:
+        raise click.ClickException(str(e))
+    for name in added:
+        click.echo(f"  added column {name}")
+    click.echo('Database tables are up to date.')
+
+@app.cli.command('prune-uploads')
+def prune_uploads_command():
+    """Delete chunked uploads that were abandoned before they finished."""
+    removed = get_upload_manager().prune_expired()
+    click.echo(f"Removed {removed} expired uploads.")
+
+@app.cli.command('prune-drafts')
+def prune_drafts_command():
+    """Delete live transcript drafts that were never finalized."""
+    removed = TranscriptDraft.prune_expired(app.config['DRAFT_EXPIRY_SECONDS'])
+    db.session.commit()
+    click.echo(f"Removed {removed} expired drafts.")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress the static CSS and JavaScript."""
+    manifest = build_assets(app.static_folder)
+    for source, built in manifest.items():
+        click.echo(f"  {source} -> {BUILD_DIRECTORY}/{built}")
+    click.echo(f"Built {len(manifest)} assets into {os.path.join(app.static_folder, BUILD_DIRECTORY)}")
+
+@app.cli.command('worker')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty instead of polling.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds between polls of an empty queue.')
+@click.option('--metrics-port', type=int, default=None, help='Serve Prometheus metrics for this worker on this port.')
+def worker_command(once, poll_interval, metrics_port):
+    """Run a background worker that processes queued generation jobs."""
+    if metrics_port:
+        start_http_server(metrics_port)
+    ensure_schema()
+    worker = Worker(
+        get_job_queue(),
+        JOB_HANDLERS,
+        on_failure=mark_job_presentation_failed,
+        poll_interval=poll_interval
+    )
+    worker.run(once=once)
+
+@app.cli.command('convert-batch')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', default='batch_output', show_default=True, help='Directory for exports, the checkpoint and the report.')
+@click.option('--workers', '-j', default=2, show_default=True, help='Number of files converted in parallel.')
+@click.option('--format', 'formats', type=click.Choice(['html', 'pdf']), multiple=True, default=['html'], show_default=True, help='Export format; repeat for several.')
+@click.option('--engine', type=click.Choice(['anthropic', 'local']), default=None, help='Slide engine (defaults to SLIDE_ENGINE).')
+@click.option('--timeout', default=3600, show_default=True, help='Seconds allowed per file.')
+@click.option('--retry-failed', is_flag=True, help='Convert files that failed in an earlier run again.')
+def convert_batch_command(directory, output, workers, formats, engine, timeout, retry_failed):
+    """Convert a directory of recordings to slide exports, resuming an interrupted run."""
+    converter = BatchConverter(
+        directory,
+        output,
+        formats=formats,
+        workers=workers,
+        engine=engine,
+        timeout=timeout,
+        retry_failed=retry_failed
+    )
+
+    def show_result(result):
+        if result['status'] == 'completed':
+            click.echo(f"  done    {result['file']} ({result['seconds']:.1f}s)")
+        else:
+            click.echo(f"  failed  {result['file']}: {result['error']}")
+
+    report = converter.run(on_result=show_result)
+    click.echo(
+        f"{report['completed']} of {report['files']} files converted, {report['failed']} failed "
+        f"({report['converted_this_run']} this run, {report['elapsed_seconds']:.1f}s)"
+    )
+    for stage, seconds in report['stages'].items():
+        click.echo(f"  {stage:<10} total {seconds['total']:.1f}s  mean {seconds['mean']:.1f}s  max {seconds['max']:.1f}s")
+    click.echo(f"Report written to {os.path.join(output, 'report.json')}")
+
+@app.cli.command('profile-token')
+@click.option('--ttl', default=3600, show_default=True, help='Seconds the token stays valid.')
+def profile_token_command(ttl):
+    """Print a token for the X-Profile header and the admin profile views."""
+    try:
+        click.echo(profiler.create_token(ttl))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+@app.cli.command('trace-report')
+@click.argument('presentation_id', required=False)
+@click.option('--trace', 'trace_id', default=None, help='Show this trace id instead of a presentation.')
+@click.option('--file', 'path', default=None, help='Trace file (defaults to TRACE_FILE or instance/traces.jsonl).')
+def trace_report_command(presentation_id, trace_id, path):
+    """Show where the time went in the traces of one presentation."""
+    if not presentation_id and not trace_id:
+        raise click.UsageError('Give a presentation id or --trace')
+    path = path or os.environ.get('TRACE_FILE') or default_trace_file()
+    if not os.path.exists(path):
+        raise click.ClickException(f"No trace file at {path}; set TRACE_EXPORTER=jsonl to record traces")
+
+    traces = load_traces(path, presentation_id=presentation_id, trace_id=trace_id)
+    if not traces:
+        raise click.ClickException('No matching traces')
+    for key, spans in sorted(traces.items(), key=lambda item: min(record['start_ns'] for record in item[1])):
+        rows = trace_rows(spans)
+        click.echo(f"Trace {key}")
+        for depth, record, self_ms in rows:
+            error = f"  [{record['error']}]" if record['error'] else ''
+            click.echo(f"  {'  ' * depth}{record['name']:<{40 - 2 * depth}} {record['duration_ms']:>10.1f} ms  self {self_ms:>9.1f} ms{error}")
+        _, slowest, slowest_ms = max(rows, key=lambda row: row[2])
+        click.echo(f"  Most time spent in {slowest['name']}: {slowest_ms:.1f} ms of its own")
@@ -1,7 +1,14 @@
 from app import db
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
 import json
 
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE term counts use
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Rows per upsert statement, well under SQLite's bound parameter limit
+UPSERT_BATCH = 500
+
 class Presentation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -10,6 +17,16 @@ class Presentation(db.Model):
     slides_data = db.Column(db.Text)  # JSON string of slides
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(50), default='processing')  # processing, completed, error
+    # Bumped whenever what the preview and exports show changes; see bump_presentation_version
+    version = db.Column(db.Integer, default=1, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Columns the preview and exports are rendered from
+    CONTENT_COLUMNS = ('title', 'slides_data', 'status')
+    
+    @property
+    def last_modified(self):
+        return self.updated_at or self.created_at
     
     def get_slides(self):
         """Return slides data as Python object"""
@@ -20,3 +37,123 @@ class Presentation(db.Model):
     def set_slides(self, slides):
         """Set slides data from Python object"""
         self.slides_data = json.dumps(slides)
+
+@db.event.listens_for(Presentation, 'before_update')
+def bump_presentation_version(mapper, connection, target):
+    """Give a presentation a new content version when its rendered content changes"""
+    state = db.inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in Presentation.CONTENT_COLUMNS):
+        # Incremented in SQL, so concurrent writers never share a version
+        target.version = Presentation.version + 1
+        target.updated_at = datetime.utcnow()
+
+class TranscriptDraft(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    transcript = db.Column(db.Text, default='')
+    title = db.Column(db.String(200))
+    outline_data = db.Column(db.Text)  # JSON string of the draft outline
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_outline(self):
+        """Return draft outline as Python object"""
+        if self.outline_data:
+            return json.loads(self.outline_data)
+        return None
+    
+    def set_outline(self, outline):
+        """Set draft outline from Python object"""
+        self.outline_data = json.dumps(outline)
+    
+    @classmethod
+    def prune_expired(cls, max_age_seconds):
+        """Delete drafts not updated for ``max_age_seconds``; the caller commits"""
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+        return cls.query.filter(cls.updated_at < cutoff).delete(synchronize_session=False)
+
+class TermStatistic(db.Model):
+    """Document frequency of a term across stored transcripts"""
+    term = db.Column(db.String(100), primary_key=True)
+    document_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Row holding the number of transcripts seen so far
+    DOCUMENTS_KEY = '__documents__'
+    
+    @classmethod
+    def total_documents(cls):
+        """Return how many transcripts have been counted"""
+        row = db.session.get(cls, cls.DOCUMENTS_KEY)
+        return row.document_count if row else 0
+    
+    @classmethod
+    def lookup(cls, terms):
+        """Return document frequencies for the given terms"""
+        rows = cls.query.filter(cls.term.in_(list(terms))).all()
+        return {row.term: row.document_count for row in rows}
+    
+    @classmethod
+    def add_document(cls, terms):
+        """
+        Count one more transcript containing the given terms.
+        
+        On SQLite and PostgreSQL the counts are incremented by an upsert, so
+        concurrent submits neither lose increments nor collide inserting the
+        same new term.
+        """
+        # Sorted so concurrent upserts lock rows in the same order
+        keys = sorted({term[:100] for term in terms} | {cls.DOCUMENTS_KEY})
+        dialect = db.engine.dialect.name
+        if dialect in UPSERT_DIALECTS:
+            for start in range(0, len(keys), UPSERT_BATCH):
+                statement = UPSERT_DIALECTS[dialect](cls.__table__).values(
+                    [{'term': key, 'document_count': 1} for key in keys[start:start + UPSERT_BATCH]]
+                )
+                db.session.execute(statement.on_conflict_do_update(
+                    index_elements=[cls.term],
+                    set_={'document_count': cls.__table__.c.document_count + 1}
+                ))
+            # Rows already loaded in this session no longer match the table
+            for row in [obj for obj in db.session.identity_map.values() if isinstance(obj, cls)]:
+                db.session.expire(row)
+            return
+        
+        existing = {row.term: row for row in cls.query.filter(cls.term.in_(keys)).all()}
+        for key in keys:
+            if key in existing:
+                existing[key].document_count += 1
+            else:
+                db.session.add(cls(term=key, document_count=1))
+
+class Job(db.Model):
+    """Durable unit of background work, claimed and leased by worker processes"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # process_audio, generate_slides
+    payload = db.Column(db.Text)  # JSON string of job arguments
+    presentation_id = db.Column(db.Integer, db.ForeignKey('presentation.id'), index=True)
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)  # queued, running, completed, failed
+    priority = db.Column(db.Integer, default=0, nullable=False)  # lower runs first
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # hidden from workers until then
+    lease_owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(db.DateTime, index=True)  # visibility timeout while running
+    heartbeat_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def get_payload(self):
+        """Return job arguments as Python object"""
+        if self.payload:
+            return json.loads(self.payload)
+        return {}
+    
+    def set_payload(self, payload):
+        """Set job arguments from Python object"""
+        self.payload = json.dumps(payload)
+
+class StatusEvent(db.Model):
+    """Status event broadcast to other processes where LISTEN/NOTIFY is unavailable"""
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON string of the event message
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -1,18 +1,100 @@
 import os
 import uuid
-from flask import render_template, request, jsonify, redirect, url_for, send_file, flash
+import json
+import socket
+import threading
+from flask import render_template, request, jsonify, redirect, url_for, send_file, flash, has_request_context, Response
 from werkzeug.utils import secure_filename
-from app import app, db
-from models import Presentation
+from simple_websocket import ConnectionClosed
+from app import app, db, sock
+from models import Presentation, TranscriptDraft, TermStatistic, StatusEvent, Job
+from schema import ensure_schema
 from services.audio_processor import AudioProcessor
 from services.slide_generator import SlideGenerator
 from services.export_service import ExportService
+from services.upload_manager import ChunkedUploadManager, UploadError
+from services.streaming_transcriber import StreamingTranscriber
+from services.transcript_drafter import TranscriptDrafter
+from services.keyphrase_extractor import KeyphraseExtractor
+from services.deadline import Deadline, DeadlineExceeded
+from services.scheduler import INTERACTIVE, BULK, PRIORITIES, get_scheduler
+from services.job_queue import JobQueue, JobFailed, JobAborted
+from services.events import EventBus, create_notifier
+from services.profiler import RequestProfiler
+from services.assets import AssetPipeline
+from services.single_flight import SingleFlight, content_key
+from services.http_cache import (
+    PRIVATE_REVALIDATE, SHARED_REVALIDATE, render_version, presentation_etag, last_modified,
+    is_not_modified, set_cache_headers, not_modified_response
+)
+from services.tracing import span, current_span, trace_requests
+from services.logging_config import bind_log_context, clear_log_context
+from services.metrics import (
+    REGISTRY, ERRORS, JOBS_IN_FLIGHT, JOB_QUEUE_DEPTH, UPSTREAM_IN_FLIGHT, UPSTREAM_QUEUED
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'm4a', 'webm'}
 
+# Number of words the title generator looks at
+TITLE_WORDS = 100
+
+# Presentation statuses after which no more events are sent
+FINAL_STATUSES = ('completed', 'error')
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE_SECONDS = 15
+
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+profiler = RequestProfiler(
+    app.config['PROFILE_DIR'],
+    sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+    slow_seconds=app.config['PROFILE_SLOW_SECONDS'],
+    max_profiles=app.config['PROFILE_MAX_FILES'],
+    secret=app.config['PROFILE_SECRET']
+)
+profiler.init_app(app)
+trace_requests(app)
+
+assets = AssetPipeline(app.static_folder)
+assets.init_app(app)
+
+# Identical exports and generations that overlap share one computation,
+# within this process and with other processes on the host
+export_flight = SingleFlight('export', lock_dir=app.config['SINGLE_FLIGHT_DIR'])
+# Error responses are not handed to other processes, which retry instead
+transcript_flight = SingleFlight(
+    'generate',
+    lock_dir=app.config['SINGLE_FLIGHT_DIR'],
+    shareable=lambda result: result[1] < 400
+)
+
+# Changes when a deploy changes how presentations are rendered
+RENDER_VERSION = render_version([
+    os.path.join(app.root_path, 'services', 'export_service.py'),
+    os.path.join(app.root_path, app.template_folder),
+])
+
+@app.before_request
+def check_database_schema():
+    # Deployments that skipped `flask init-db` get their tables on the first request
+    ensure_schema()
+
+@app.before_request
+def reset_log_context():
+    """Start each request's log context afresh, with the presentation it is about"""
+    clear_log_context()
+    if request.view_args and 'presentation_id' in request.view_args:
+        bind_log_context(presentation_id=request.view_args['presentation_id'])
+
+@app.teardown_request
+def end_log_context(error=None):
+    clear_log_context()
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -34,46 +116,238 @@ def upload_audio():
             return jsonify({'error': 'Invalid file type. Please upload a valid audio file.'}), 400
         
         # Create upload folder if it doesn't exist
-        upload_folder = os.path.join(os.path.dirname(__file__), 'uploads')
+        upload_folder = get_upload_folder()
         os.makedirs(upload_folder, exist_ok=True)
-        
+
         # Generate unique filename
         filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
         filepath = os.path.join(upload_folder, filename)
-        file.save(filepath)
-        
-        # Create presentation record
-        presentation = Presentation(
-            title=f"Presentation {filename}",
-            audio_filename=filename,
-            status='processing'
+        with span('upload.save', filename=filename) as save_span:
+            file.save(filepath)
+            save_span.set_attribute('bytes', os.path.getsize(filepath))
+
+        return create_presentation_from_audio(filename, filepath)
+
+    except Exception as e:
+        logger.error(f"Error uploading audio: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing your request'}), 500
+
+def get_upload_folder():
+    return os.path.join(os.path.dirname(__file__), 'uploads')
+
+def create_presentation_from_audio(filename, filepath):
+    """Create a presentation record for a saved audio file and process it"""
+    deadline = create_deadline()
+    presentation = Presentation(
+        title=f"Presentation {filename}",
+        audio_filename=filename,
+        status='processing'
+    )
+    db.session.add(presentation)
+    with span('db.commit'):
+        db.session.commit()
+    current_span().set_attribute('presentation_id', presentation.id)
+    bind_log_context(presentation_id=presentation.id)
+
+    if app.config['USE_JOB_QUEUE']:
+        job = get_job_queue().enqueue(
+            'process_audio',
+            {'filepath': filepath},
+            presentation_id=presentation.id,
+            priority=BULK
         )
-        db.session.add(presentation)
+        return queued_response(presentation, job)
+
+    # Process audio immediately, in this request
+    with JOBS_IN_FLIGHT.track(kind='process_audio'):
+        success = process_audio_file(presentation.id, filepath, deadline=deadline)
+
+    if success:
+        return jsonify({
+            'success': True,
+            'presentation_id': presentation.id,
+            'message': 'Audio uploaded and processed successfully'
+        })
+    else:
+        presentation.status = 'error'
         db.session.commit()
+        publish_status(presentation)
+        if deadline.expired():
+            return jsonify({'error': 'Processing took too long. Please try a shorter recording.'}), 504
+        return jsonify({'error': 'Failed to process audio file'}), 500
+
+def create_deadline():
+    """Start the time budget for one generation or export job"""
+    return Deadline(app.config['JOB_DEADLINE_SECONDS'])
+
+def get_job_queue():
+    return JobQueue(lease_seconds=app.config['JOB_LEASE_SECONDS'])
+
+def queued_response(presentation, job):
+    """Tell the client its presentation will be generated by a background worker"""
+    return jsonify({
+        'success': True,
+        'queued': True,
+        'presentation_id': presentation.id,
+        'job_id': job.id,
+        'status_url': url_for('get_presentation_status', presentation_id=presentation.id),
+        'events_url': url_for('presentation_events', presentation_id=presentation.id)
+    }), 202
+
+def get_event_bus():
+    """Return the process-wide bus for presentation status events"""
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            with app.app_context():
+                _event_bus = EventBus(create_notifier(db.engine, StatusEvent.__table__))
+        return _event_bus
+
+def publish_status(presentation, stage=None):
+    """Tell subscribers about a presentation's status, and optionally which stage it reached"""
+    event = {'status': presentation.status, 'title': presentation.title}
+    if stage:
+        event['stage'] = stage
+    get_event_bus().publish(presentation.id, event)
+
+def get_upload_manager():
+    return ChunkedUploadManager(
+        get_upload_folder(),
+        max_upload_size=app.config['MAX_CHUNKED_UPLOAD_SIZE'],
+        expiry_seconds=app.config['CHUNKED_UPLOAD_EXPIRY_SECONDS']
+    )
+
+def upload_error_response(error):
+    body = {'error': str(error)}
+    if error.offset is not None:
+        body['offset'] = error.offset
+    return jsonify(body), error.status_code
+
+@app.route('/api/uploads', methods=['POST'])
+def init_chunked_upload():
+    """Start a resumable chunked upload"""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename', '')
+
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Please upload a valid audio file.'}), 400
+
+        upload = get_upload_manager().init_upload(filename, int(data.get('size', 0)))
+        upload['chunk_size'] = app.config['UPLOAD_CHUNK_SIZE']
+        return jsonify(upload), 201
+
+    except UploadError as e:
+        return upload_error_response(e)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid upload size'}), 400
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_chunked_upload(upload_id):
+    """Return how many bytes of an upload have been received"""
+    try:
+        return jsonify(get_upload_manager().get_status(upload_id))
+    except UploadError as e:
+        return upload_error_response(e)
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    """Append one chunk; its offset and SHA-256 checksum travel as headers"""
+    try:
+        offset = int(request.headers.get('X-Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Missing or invalid X-Upload-Offset header'}), 400
+
+    try:
+        received = get_upload_manager().write_chunk(
+            upload_id,
+            offset,
+            request.get_data(cache=False),
+            checksum=request.headers.get('X-Chunk-Checksum')
+        )
+        return jsonify({'upload_id': upload_id, 'offset': received})
+    except UploadError as e:
+        return upload_error_response(e)
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Assemble a completed upload and process it like a regular upload"""
+    try:
+        with span('upload.assemble', upload_id=upload_id):
+            filename, filepath = get_upload_manager().finalize(upload_id)
+        return create_presentation_from_audio(filename, filepath)
+    except UploadError as e:
+        return upload_error_response(e)
+    except Exception as e:
+        logger.error(f"Error finalizing upload {upload_id}: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing your request'}), 500
+
+@sock.route('/ws/transcribe')
+def stream_transcription(ws):
+    """
+    Transcribe live audio sent over a WebSocket.
+    
+    The first message is a JSON config such as {"format": "pcm", "sample_rate": 16000};
+    binary messages carry audio frames and {"type": "stop"} ends the stream.
+    Partial results are pushed as they are recognized, followed by the final transcript.
+    """
+    try:
+        message = ws.receive()
+    except ConnectionClosed:
+        logger.info("Client closed transcription stream before configuring it")
+        return
+    
+    try:
+        config = json.loads(message)
+        if not isinstance(config, dict):
+            raise ValueError('expected a JSON object')
+        transcriber = StreamingTranscriber(
+            AudioProcessor(priority=INTERACTIVE, client_id=get_client_id()),
+            encoding=config.get('format', 'pcm'),
+            sample_rate=config.get('sample_rate', 16000)
+        )
+    except (TypeError, ValueError) as e:
+        # Raises ConnectionClosed if the client is gone, which flask-sock expects
+        ws.send(json.dumps({'type': 'error', 'error': f'Invalid stream configuration: {e}'}))
+        return
+    
+    try:
+        while True:
+            message = ws.receive()
+            if isinstance(message, str):
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    continue
+                if isinstance(control, dict) and control.get('type') == 'stop':
+                    break
+                continue
+            
+            for text in transcriber.feed(message):
+                ws.send(json.dumps({
+                    'type': 'partial',
+                    'text': text,
+                    'transcript': transcriber.transcript
+                }))
         
-        # Process audio in background (for now, process immediately)
-        success = process_audio_file(presentation.id, filepath)
+        ws.send(json.dumps({'type': 'final', 'transcript': transcriber.finish()}))
         
-        if success:
-            return jsonify({
-                'success': True,
-                'presentation_id': presentation.id,
-                'message': 'Audio uploaded and processed successfully'
-            })
-        else:
-            presentation.status = 'error'
-            db.session.commit()
-            return jsonify({'error': 'Failed to process audio file'}), 500
-            
+    except ConnectionClosed:
+        logger.info("Client closed transcription stream")
     except Exception as e:
-        logger.error(f"Error uploading audio: {str(e)}")
-        return jsonify({'error': 'An error occurred while processing your request'}), 500
+        logger.error(f"Error streaming transcription: {str(e)}")
+        ws.send(json.dumps({'type': 'error', 'error': 'An error occurred while transcribing audio'}))
+    finally:
+        transcriber.close()
 
 @app.route('/process_transcript', methods=['POST'])
 def process_transcript():
     try:
-        data = request.get_json()
-        transcript = data.get('transcript', '').strip()
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        transcript = data.get('transcript') or ''
+        transcript = transcript.strip() if isinstance(transcript, str) else ''
         
         if not transcript:
             return jsonify({'error': 'No transcript provided', 'success': False}), 400
@@ -81,36 +355,237 @@ def process_transcript():
         if len(transcript.split()) < 10:
             return jsonify({'error': 'Transcript too short. Please provide at least 10 words.', 'success': False}), 400
         
-        # Generate a meaningful title based on transcript content
-        from services.slide_generator import SlideGenerator
-        slide_generator = SlideGenerator()
-        meaningful_title = slide_generator.generate_presentation_title(transcript)
+        # "draft" mode builds the deck locally in milliseconds, without the LLM
+        engine = 'local' if data.get('mode') == 'draft' else None
+        # Repeated submits of the same transcript while the first is still
+        # generating get the first one's presentation
+        payload, status = transcript_flight.do(
+            transcript_key(transcript, engine),
+            lambda: shareable_response(create_presentation_from_transcript(transcript, engine=engine)),
+            deadline=create_deadline()
+        )
+        return jsonify(payload), status
+    
+    except DeadlineExceeded as e:
+        logger.error(f"Gave up waiting for an identical generation: {str(e)}")
+        ERRORS.inc(stage='deadline')
+        return jsonify({'error': 'Generating slides took too long. Please try again with a shorter transcript.', 'success': False}), 504
+    except Exception as e:
+        logger.error(f"Error processing transcript: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing your request', 'success': False}), 500
+
+def transcript_key(transcript, engine=None):
+    """Key under which identical generation requests are coalesced"""
+    return content_key('process_transcript', transcript, engine)
+
+def shareable_response(rv):
+    """Turn a view's return value into the (payload, status) that coalesced callers share"""
+    response = app.make_response(rv)
+    return response.get_json(), response.status_code
+
+def create_slide_generator(engine=None, priority=INTERACTIVE):
+    """Create a SlideGenerator whose titles use term statistics from stored transcripts"""
+    extractor = KeyphraseExtractor(
+        lookup=TermStatistic.lookup,
+        document_count=TermStatistic.total_documents()
+    )
+    return SlideGenerator(
+        engine=engine,
+        keyphrase_extractor=extractor,
+        priority=priority,
+        client_id=get_client_id()
+    )
+
+def get_client_id():
+    """Identify the caller so the scheduler can share upstream capacity fairly between clients"""
+    if not has_request_context():
+        return None
+    return request.remote_addr
+
+def learn_transcript_terms(transcript):
+    """Add a new transcript to the term statistics used for local titles"""
+    try:
+        extractor = KeyphraseExtractor()
+        if TermStatistic.total_documents() == 0:
+            # Seed the statistics from transcripts stored before they were tracked
+            stored = db.session.query(Presentation.transcript).filter(Presentation.transcript.isnot(None))
+            for (text,) in stored:
+                TermStatistic.add_document(extractor.terms(text))
         
-        # Create presentation record
-        presentation = Presentation(
-            title=meaningful_title,
-            transcript=transcript,
-            status='processing'
+        TermStatistic.add_document(extractor.terms(transcript))
+        db.session.commit()
+    except Exception as e:
+        logger.warning(f"Could not update term statistics: {str(e)}")
+        db.session.rollback()
+
+def create_presentation_from_transcript(transcript, title=None, outline=None, engine=None):
+    """Create a presentation record for a transcript and generate its slides"""
+    deadline = create_deadline()
+    
+    # Generate a meaningful title based on transcript content
+    if not title:
+        slide_generator = create_slide_generator(engine=engine)
+        title = slide_generator.generate_presentation_title(transcript, deadline=deadline)
+    
+    learn_transcript_terms(transcript)
+    
+    # Create presentation record
+    presentation = Presentation(
+        title=title,
+        transcript=transcript,
+        status='processing'
+    )
+    db.session.add(presentation)
+    with span('db.commit'):
+        db.session.commit()
+    current_span().set_attribute('presentation_id', presentation.id)
+    bind_log_context(presentation_id=presentation.id)
+    
+    # Local drafts take milliseconds, so only LLM generation is queued
+    if app.config['USE_JOB_QUEUE'] and engine != 'local':
+        job = get_job_queue().enqueue(
+            'generate_slides',
+            {'outline': outline, 'engine': engine},
+            presentation_id=presentation.id,
+            priority=INTERACTIVE
         )
-        db.session.add(presentation)
+        return queued_response(presentation, job)
+    
+    # Generate slides
+    with JOBS_IN_FLIGHT.track(kind='generate_slides'):
+        success = generate_slides_for_presentation(presentation.id, outline=outline, engine=engine, deadline=deadline)
+    
+    if success:
+        return jsonify({
+            'success': True,
+            'presentation_id': presentation.id,
+            'message': 'Slides generated successfully'
+        })
+    else:
+        presentation.status = 'error'
         db.session.commit()
+        publish_status(presentation)
+        if deadline.expired():
+            return jsonify({'error': 'Generating slides took too long. Please try again with a shorter transcript.', 'success': False}), 504
+        return jsonify({'error': 'Failed to generate slides. Please try again with a shorter transcript or check your API key.', 'success': False}), 500
+
+@app.route('/api/drafts', methods=['POST'])
+def create_draft():
+    """Start an incremental draft for a transcript that is still being recorded"""
+    # Drafts of recordings that were abandoned are never finalized
+    TranscriptDraft.prune_expired(app.config['DRAFT_EXPIRY_SECONDS'])
+    draft = TranscriptDraft(
+        id=uuid.uuid4().hex,
+        transcript='',
+    )
+    draft.set_outline(TranscriptDrafter().new_outline())
+    db.session.add(draft)
+    db.session.commit()
+    
+    return jsonify({'draft_id': draft.id, 'offset': 0}), 201
+
+@app.route('/api/drafts/<draft_id>/delta', methods=['POST'])
+def append_draft_delta(draft_id):
+    """
+    Append newly transcribed text to a draft and update its outline.
+    
+    The client sends {"offset": <characters already sent>, "text": <new text>}.
+    Deltas that were already applied are acknowledged without changes, so
+    a resent delta is harmless.
+    """
+    draft = TranscriptDraft.query.get_or_404(draft_id)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid delta'}), 400
+    offset = data.get('offset', 0)
+    text = data.get('text', '')
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0 or not isinstance(text, str):
+        return jsonify({'error': 'Invalid delta'}), 400
+    
+    try:
+        current = len(draft.transcript)
+        if offset > current:
+            return jsonify({'error': 'Delta offset is ahead of the draft', 'offset': current}), 409
         
-        # Generate slides
-        success = generate_slides_for_presentation(presentation.id)
-        
-        if success:
-            return jsonify({
-                'success': True,
-                'presentation_id': presentation.id,
-                'message': 'Slides generated successfully'
-            })
+        new_text = text[current - offset:]
+        if new_text:
+            drafter = TranscriptDrafter()
+            outline = drafter.apply_delta(draft.get_outline(), new_text)
+            draft.set_outline(outline)
+            draft.transcript += new_text
+            
+            # The title only looks at the opening of the talk, so it can be
+            # produced as soon as enough words have arrived
+            if not draft.title and len(draft.transcript.split()) >= TITLE_WORDS:
+                try:
+                    draft.title = create_slide_generator().generate_presentation_title(draft.transcript)
+                except Exception as e:
+                    # Finalize generates the title when the draft has none
+                    logger.warning(f"Could not title draft {draft_id}: {str(e)}")
+            
+            db.session.commit()
+        
+        return jsonify({
+            'draft_id': draft.id,
+            'offset': len(draft.transcript),
+            'title': draft.title,
+            'outline': TranscriptDrafter().outline_summary(draft.get_outline())
+        })
+        
+    except Exception as e:
+        logger.error(f"Error updating draft {draft_id}: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update draft'}), 500
+
+@app.route('/api/drafts/<draft_id>/finalize', methods=['POST'])
+def finalize_draft(draft_id):
+    """
+    Generate slides from a draft, reusing its title and outline.
+    
+    The slides themselves are still generated here in full; the draft only
+    saves the title request and gives the prompt the outline. The draft is
+    kept until generation succeeds, so a failed finalize can be retried.
+    """
+    draft = TranscriptDraft.query.get_or_404(draft_id)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    transcript = data.get('transcript') or ''
+    if not isinstance(transcript, str):
+        return jsonify({'error': 'Transcript must be text', 'success': False}), 400
+    
+    try:
+        drafter = TranscriptDrafter()
+        outline = draft.get_outline()
+        title = draft.title
+
+        if not transcript:
+            transcript = draft.transcript
+        elif transcript.startswith(draft.transcript):
+            # Catch up with any text the client had not sent yet
+            drafter.apply_delta(outline, transcript[len(draft.transcript):])
         else:
-            presentation.status = 'error'
+            # The transcript was edited, so the warm state no longer applies
+            outline = None
+            title = None
+
+        transcript = transcript.strip()
+        if len(transcript.split()) < 10:
+            return jsonify({'error': 'Transcript too short. Please provide at least 10 words.', 'success': False}), 400
+
+        response = app.make_response(create_presentation_from_transcript(
+            transcript,
+            title=title,
+            outline=drafter.outline_summary(drafter.flush(outline)) if outline else None
+        ))
+        if response.status_code < 400:
+            db.session.delete(draft)
             db.session.commit()
-            return jsonify({'error': 'Failed to generate slides. Please try again with a shorter transcript or check your API key.', 'success': False}), 500
-            
+        return response
+        
     except Exception as e:
-        logger.error(f"Error processing transcript: {str(e)}")
+        logger.error(f"Error finalizing draft {draft_id}: {str(e)}")
+        db.session.rollback()
         return jsonify({'error': 'An error occurred while processing your request', 'success': False}), 500
 
 @app.route('/presentation/<int:presentation_id>')
@@ -124,8 +599,14 @@ def view_presentation(presentation_id):
         flash('An error occurred while processing your presentation.', 'error')
         return redirect(url_for('index'))
     
+    etag = presentation_etag(presentation, 'preview', RENDER_VERSION + assets.version())
+    modified = last_modified(presentation)
+    if is_not_modified(etag, modified):
+        return not_modified_response(Response, etag, modified, PRIVATE_REVALIDATE)
+    
     slides = presentation.get_slides()
-    return render_template('slides_preview.html', presentation=presentation, slides=slides)
+    response = app.make_response(render_template('slides_preview.html', presentation=presentation, slides=slides))
+    return set_cache_headers(response, etag, modified, PRIVATE_REVALIDATE)
 
 @app.route('/export/<int:presentation_id>/<format>')
 def export_presentation(presentation_id, format):
@@ -133,23 +614,47 @@ def export_presentation(presentation_id, format):
     
     if presentation.status != 'completed':
         return jsonify({'error': 'Presentation not ready for export'}), 400
+    if format not in ('html', 'pdf'):
+        return jsonify({'error': 'Invalid export format'}), 400
     
-    export_service = ExportService()
+    # Checked before rendering, so a cache revalidating an unchanged
+    # export costs one row lookup
+    etag = presentation_etag(presentation, format, RENDER_VERSION)
+    modified = last_modified(presentation)
+    if is_not_modified(etag, modified):
+        return not_modified_response(Response, etag, modified, SHARED_REVALIDATE)
     
-    try:
+    deadline = create_deadline()
+    
+    def render():
+        export_service = ExportService()
         if format == 'html':
-            file_path = export_service.export_html(presentation)
-            return send_file(file_path, as_attachment=True, download_name=f"{presentation.title}.html")
-        elif format == 'pdf':
-            file_path = export_service.export_pdf(presentation)
-            return send_file(file_path, as_attachment=True, download_name=f"{presentation.title}.pdf")
-        else:
-            return jsonify({'error': 'Invalid export format'}), 400
+            return export_service.export_html(presentation, deadline=deadline)
+        return export_service.export_pdf(presentation, deadline=deadline)
+    
+    try:
+        # Everyone exporting the same version at once shares one render;
+        # the ETag already identifies the content
+        file_path = export_flight.do(etag, render, deadline=deadline)
+        if not os.path.exists(file_path):
+            # A file shared by another process may have been cleaned up since
+            file_path = render()
+        # Validators are set here rather than by send_file, which would
+        # derive them from the temporary file
+        response = send_file(
+            file_path, as_attachment=True, download_name=f"{presentation.title}.{format}",
+            etag=False, conditional=False
+        )
+        return set_cache_headers(response, etag, modified, SHARED_REVALIDATE)
+    except DeadlineExceeded as e:
+        logger.error(f"Gave up exporting presentation {presentation_id}: {str(e)}")
+        ERRORS.inc(stage='deadline')
+        return jsonify({'error': 'Export took too long'}), 504
     except Exception as e:
         logger.error(f"Error exporting presentation: {str(e)}")
         return jsonify({'error': 'Failed to export presentation'}), 500
 
-def process_audio_file(presentation_id, filepath):
+def process_audio_file(presentation_id, filepath, deadline=None):
     """Process audio file and generate slides"""
     try:
         presentation = Presentation.query.get(presentation_id)
@@ -157,48 +662,115 @@ def process_audio_file(presentation_id, filepath):
             return False
         
         # Transcribe audio
-        audio_processor = AudioProcessor()
-        transcript = audio_processor.transcribe_audio(filepath)
+        publish_status(presentation, stage='transcribing')
+        audio_processor = AudioProcessor(priority=BULK, client_id=get_client_id())
+        transcript = audio_processor.transcribe_audio(filepath, deadline=deadline)
         
         if not transcript:
             logger.error("Failed to transcribe audio")
             return False
         
+        learn_transcript_terms(transcript)
+        
+        presentation.title = create_slide_generator(priority=BULK).generate_presentation_title(transcript, deadline=deadline)
         presentation.transcript = transcript
-        db.session.commit()
+        with span('db.commit'):
+            db.session.commit()
         
         # Generate slides
-        return generate_slides_for_presentation(presentation_id)
+        return generate_slides_for_presentation(presentation_id, deadline=deadline, priority=BULK)
         
+    except DeadlineExceeded as e:
+        logger.error(f"Gave up processing audio for presentation {presentation_id}: {str(e)}")
+        ERRORS.inc(stage='deadline')
+        return False
     except Exception as e:
         logger.error(f"Error processing audio file: {str(e)}")
+        ERRORS.inc(stage='process_audio')
         return False
 
-def generate_slides_for_presentation(presentation_id):
-    """Generate slides from transcript"""
+def generate_slides_for_presentation(presentation_id, outline=None, engine=None, deadline=None, priority=INTERACTIVE,
+                                     transcript=None):
+    """
+    Generate slides from the presentation's transcript, or from a new
+    ``transcript`` that is stored only together with the slides made from it
+    """
     try:
         presentation = Presentation.query.get(presentation_id)
-        if not presentation or not presentation.transcript:
+        if not presentation:
+            return False
+        transcript = transcript or presentation.transcript
+        if not transcript:
             return False
         
-        # Generate slides using Anthropic
-        slide_generator = SlideGenerator()
-        slides = slide_generator.generate_slides(presentation.transcript)
+        # Generate slides using the configured engine
+        publish_status(presentation, stage='generating')
+        slide_generator = create_slide_generator(engine=engine, priority=priority)
+        slides = slide_generator.generate_slides(transcript, outline=outline, deadline=deadline)
         
         if not slides:
             logger.error("Failed to generate slides")
             return False
         
+        slide_generator.assign_source_spans(transcript, slides)
+        presentation.transcript = transcript
         presentation.set_slides(slides)
         presentation.status = 'completed'
-        db.session.commit()
+        with span('db.commit'):
+            db.session.commit()
+        publish_status(presentation)
         
+        if deadline:
+            logger.info(f"Presentation {presentation_id} stage timings: {deadline.summary()}")
         return True
         
+    except DeadlineExceeded as e:
+        logger.error(f"Gave up generating slides for presentation {presentation_id}: {str(e)}")
+        ERRORS.inc(stage='deadline')
+        return False
     except Exception as e:
         logger.error(f"Error generating slides: {str(e)}")
+        ERRORS.inc(stage='generate_slides')
         return False
 
+def run_process_audio_job(job):
+    """Worker handler for uploaded audio"""
+    payload = job.get_payload()
+    if not os.path.exists(payload['filepath']):
+        # Retrying on this host cannot make the file appear
+        raise JobAborted(
+            f"Audio file {payload['filepath']} does not exist on worker host {socket.gethostname()}; "
+            f"workers that process uploads must share the web nodes' uploads folder"
+        )
+    if not process_audio_file(job.presentation_id, payload['filepath'], deadline=create_deadline()):
+        raise JobFailed(f"Could not process audio for presentation {job.presentation_id}")
+
+def run_generate_slides_job(job):
+    """Worker handler for slide generation from a stored transcript"""
+    payload = job.get_payload()
+    success = generate_slides_for_presentation(
+        job.presentation_id,
+        outline=payload.get('outline'),
+        engine=payload.get('engine'),
+        deadline=create_deadline(),
+        priority=PRIORITIES[job.priority]
+    )
+    if not success:
+        raise JobFailed(f"Could not generate slides for presentation {job.presentation_id}")
+
+def mark_job_presentation_failed(job):
+    """Flag the presentation once its job has run out of retries"""
+    presentation = db.session.get(Presentation, job.presentation_id) if job.presentation_id else None
+    if presentation:
+        presentation.status = 'error'
+        db.session.commit()
+        publish_status(presentation)
+
+JOB_HANDLERS = {
+    'process_audio': run_process_audio_job,
+    'generate_slides': run_generate_slides_job,
+}
+
 @app.route('/api/presentations/<int:presentation_id>/status')
 def get_presentation_status(presentation_id):
     presentation = Presentation.query.get_or_404(presentation_id)
@@ -207,6 +779,110 @@ def get_presentation_status(presentation_id):
         'title': presentation.title
     })
 
+@app.route('/api/presentations/<int:presentation_id>/events')
+def presentation_events(presentation_id):
+    """
+    Stream status events for a presentation as server-sent events, starting
+    with its current status and ending once it is completed or failed
+    """
+    bus = get_event_bus()
+    # Subscribe before reading the status so no change can slip in between
+    subscription = bus.subscribe(presentation_id)
+    try:
+        presentation = db.session.get(Presentation, presentation_id)
+    except Exception:
+        bus.unsubscribe(subscription)
+        raise
+    if not presentation:
+        bus.unsubscribe(subscription)
+        return jsonify({'error': 'Not found'}), 404
+    current = {'status': presentation.status, 'title': presentation.title}
+    
+    def stream():
+        try:
+            yield format_event(current)
+            if current['status'] in FINAL_STATUSES:
+                return
+            while True:
+                event = subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event(event)
+                if event['status'] in FINAL_STATUSES:
+                    return
+        finally:
+            bus.unsubscribe(subscription)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # The generator's cleanup only runs if it was started; a response that
+    # is closed without being iterated still has to let go of the subscription
+    response.call_on_close(lambda: bus.unsubscribe(subscription))
+    return response
+
+def format_event(event):
+    return f"data: {json.dumps(event)}\n\n"
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this process"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def has_admin_token():
+    """Admin views take a profiling token as a bearer token"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and profiler.verify_token(token)
+
+@app.route('/admin/profiles')
+def list_profiles():
+    """Captured request profiles, newest first"""
+    if not has_admin_token():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify({
+        'sample_rate': profiler.sample_rate,
+        'slow_seconds': profiler.slow_seconds,
+        'profiles': profiler.list_profiles()
+    })
+
+@app.route('/admin/profiles/<name>')
+def show_profile(name):
+    """A profile as pstats text, or the raw file with ?download=1 for snakeviz and friends"""
+    if not has_admin_token():
+        return jsonify({'error': 'Forbidden'}), 403
+    path = profiler.profile_path(name)
+    if not path:
+        return jsonify({'error': 'Not found'}), 404
+    if request.args.get('download'):
+        return send_file(path, as_attachment=True, download_name=f"{name}.prof")
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'calls'):
+        return jsonify({'error': 'Invalid sort'}), 400
+    return Response(profiler.summary(name, sort=sort), mimetype='text/plain')
+
+def count_queued_jobs():
+    # Also scraped from the worker's metrics thread, outside any request
+    with app.app_context():
+        return Job.query.filter_by(status='queued').count()
+
+def upstream_stats(field):
+    """Read one scheduler figure per upstream (and priority, for queues) at scrape time"""
+    values = {}
+    for upstream in ('anthropic', 'speech'):
+        stats = get_scheduler().stats(upstream)
+        if field == 'queued':
+            for priority, queued in stats['queued'].items():
+                values[(upstream, priority)] = queued
+        else:
+            values[(upstream,)] = stats[field]
+    return values
+
+JOB_QUEUE_DEPTH.set_function(count_queued_jobs)
+UPSTREAM_IN_FLIGHT.set_function(lambda: upstream_stats('in_flight'))
+UPSTREAM_QUEUED.set_function(lambda: upstream_stats('queued'))
+
 @app.route('/presentation/<int:presentation_id>/update', methods=['POST'])
 def update_presentation(presentation_id):
     """Update presentation slides content"""
@@ -231,3 +907,93 @@ def update_presentation(presentation_id):
         logger.error(f"Error updating presentation: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Failed to update presentation'}), 500
+
+@app.route('/presentation/<int:presentation_id>/slides/<int:slide_number>/regenerate', methods=['POST'])
+def regenerate_slide(presentation_id, slide_number):
+    """Regenerate one slide and patch it into the deck, keeping the others as edited"""
+    try:
+        presentation = Presentation.query.get_or_404(presentation_id)
+        slides = presentation.get_slides()
+        
+        if not presentation.transcript:
+            return jsonify({'error': 'Presentation has no transcript'}), 400
+        if slide_number < 1 or slide_number > len(slides):
+            return jsonify({'error': 'Slide not found'}), 404
+        
+        data = request.get_json(silent=True) or {}
+        slide_generator = create_slide_generator()
+        slide = slide_generator.regenerate_slide(
+            presentation.transcript,
+            slides,
+            slide_number - 1,
+            instructions=data.get('instructions')
+        )
+        
+        if not slide:
+            return jsonify({'error': 'Failed to regenerate slide'}), 500
+        
+        slides[slide_number - 1] = slide
+        presentation.set_slides(slides)
+        db.session.commit()
+        
+        logger.info(f"Regenerated slide {slide_number} of presentation {presentation_id}")
+        return jsonify({
+            'success': True,
+            'slide': slide
+        })
+        
+    except Exception as e:
+        logger.error(f"Error regenerating slide: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to regenerate slide'}), 500
+
+@app.route('/presentation/<int:presentation_id>/transcript', methods=['POST'])
+def update_transcript(presentation_id):
+    """
+    Replace a presentation's transcript, regenerating only the slides whose
+    source text changed and keeping the rest as they are
+    """
+    presentation = Presentation.query.get_or_404(presentation_id)
+    data = request.get_json(silent=True)
+    transcript = data.get('transcript') if isinstance(data, dict) else None
+    transcript = transcript.strip() if isinstance(transcript, str) else ''
+    
+    if len(transcript.split()) < 10:
+        return jsonify({'error': 'Transcript too short. Please provide at least 10 words.'}), 400
+    
+    try:
+        if transcript == presentation.transcript:
+            return jsonify({'success': True, 'regenerated': [], 'removed': []})
+        
+        slide_generator = create_slide_generator()
+        slides, regenerated, removed = slide_generator.update_slides_for_transcript(
+            presentation.transcript or '',
+            transcript,
+            presentation.get_slides()
+        )
+        
+        if slides is None:
+            # The edit touched most of the deck, so regenerate it in full. The
+            # new transcript is saved with the new slides, or not at all, so
+            # later partial updates compare against the text the slides match
+            if not generate_slides_for_presentation(presentation_id, transcript=transcript):
+                db.session.rollback()
+                return jsonify({'error': 'Failed to regenerate slides'}), 500
+            return jsonify({'success': True, 'regenerated': 'all', 'removed': []})
+        
+        presentation.transcript = transcript
+        presentation.set_slides(slides)
+        db.session.commit()
+        
+        # Slides whose source text was deleted are reported apart: they were
+        # not regenerated, and are left for the user to delete
+        return jsonify({
+            'success': True,
+            'regenerated': [index + 1 for index in regenerated],
+            'removed': [index + 1 for index in removed]
+        })
+        
+    except Exception as e:
+        logger.error(f"Error updating transcript: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update transcript'}), 500
@@ -0,0 +1,111 @@
+"""
+Database schema setup, shared by `flask init-db` and the first request
+each process serves.
+"""
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from sqlalchemy import inspect, literal, text
+from app import app, db
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_schema_lock = threading.Lock()
+_schema_checked = False
+
+class SchemaError(Exception):
+    pass
+
+def add_missing_columns():
+    """
+    Add columns that models gained after their tables were created, which
+    create_all leaves alone. Only plain columns are handled: nullable ones,
+    or ones with a constant default to fill existing rows with.
+    """
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                value = literal(default).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+                ddl += f" DEFAULT {value}"
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+            elif not column.nullable:
+                raise SchemaError(f"Cannot add {table.name}.{column.name}: it is NOT NULL without a constant default")
+            with db.engine.begin() as connection:
+                connection.execute(text(ddl))
+                for index in table.indexes:
+                    if column in index.columns:
+                        index.create(connection, checkfirst=True)
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+def upgrade_schema():
+    """
+    Create missing tables and add missing columns, returning the columns added
+    """
+    db.create_all()
+    return add_missing_columns()
+
+def schema_checked():
+    return _schema_checked
+
+def ensure_schema():
+    """
+    Bring the schema up to date once per process.
+
+    Runs on the first request (and when a worker starts), so a deployment
+    that skipped `flask init-db` still gets its tables and new columns.
+    Processes on the same host take turns through a lock file; a process on
+    another host that races this one retries once. If the upgrade fails,
+    for instance because the database user may not run DDL, the error is
+    logged once and requests go on against the schema as it is.
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+    with _schema_lock:
+        if _schema_checked:
+            return
+        try:
+            with _host_lock():
+                try:
+                    added = upgrade_schema()
+                except Exception as e:
+                    # Another host may have created the same table first
+                    logger.warning(f"Retrying schema upgrade after: {str(e)}")
+                    db.session.rollback()
+                    added = upgrade_schema()
+            if added:
+                logger.info(f"Added database columns: {', '.join(added)}")
+        except Exception as e:
+            logger.error(f"Database schema could not be brought up to date, run `flask init-db`: {str(e)}")
+        _schema_checked = True
+
+@contextmanager
+def _host_lock():
+    """Hold an exclusive lock file in the instance folder; a no-op without fcntl"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'schema.lock'), 'a') as lock_file:
+        # Closing the file releases the lock
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
@@ -0,0 +1,231 @@
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import mimetypes
+from flask import request, send_file, abort, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Source files under the static folder that are built into ``dist``
+ASSET_EXTENSIONS = ('.css', '.js')
+
+BUILD_DIRECTORY = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Built assets are named by their content, so a cached copy never goes stale
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Preferred first when the browser accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/|\s+', re.S)
+_CSS_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+_CSS_SPACE_AFTER = re.compile(r':\s+')
+
+def minify_css(source):
+    """
+    Strip comments and needless whitespace from a stylesheet, leaving
+    strings untouched
+    """
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        return '' if match.group(0).startswith('/*') else ' '
+
+    parts = []
+    # Split on strings so whitespace rules never apply inside them
+    for piece in re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', _CSS_TOKENS.sub(replace, source)):
+        if piece[:1] in ('"', "'"):
+            parts.append(piece)
+        else:
+            piece = _CSS_SPACE_AROUND.sub(r'\1', piece)
+            parts.append(_CSS_SPACE_AFTER.sub(':', piece).replace(';}', '}'))
+    return ''.join(parts).strip()
+
+def minify_js(source):
+    """
+    Drop comment lines, indentation and blank lines from a script.
+
+    Line breaks are kept, so automatic semicolon insertion behaves as
+    before, and lines inside template literals are left as they are.
+    Compression does most of the work; this only removes what is safe to
+    remove without parsing JavaScript.
+    """
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        # An odd number of backticks opens or closes a multi-line template literal
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def find_assets(static_dir):
+    """
+    Return the paths, relative to ``static_dir``, of the files to build
+    """
+    found = []
+    for root, dirs, files in os.walk(static_dir):
+        relative_root = os.path.relpath(root, static_dir)
+        if relative_root.split(os.sep)[0] in (BUILD_DIRECTORY, 'uploads'):
+            dirs[:] = []
+            continue
+        for name in files:
+            if name.endswith(ASSET_EXTENSIONS) and '.min.' not in name:
+                found.append(os.path.normpath(os.path.join(relative_root, name)).replace(os.sep, '/'))
+    return sorted(found)
+
+def build_assets(static_dir):
+    """
+    Minify every asset, name it by a hash of its content and write gzip
+    and (if the brotli package is installed) brotli variants next to it
+    in ``static/dist``, replacing any earlier build. Returns the manifest
+    mapping source paths to built paths.
+    """
+    output_dir = os.path.join(static_dir, BUILD_DIRECTORY)
+    staging_dir = output_dir + '.tmp'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    manifest = {}
+    for relpath in find_assets(static_dir):
+        with open(os.path.join(static_dir, relpath), encoding='utf-8') as f:
+            source = f.read()
+        stem, extension = os.path.splitext(relpath)
+        content = MINIFIERS[extension](source).encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        built = f"{stem}.{digest}{extension}"
+
+        path = os.path.join(staging_dir, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        # mtime=0 keeps the gzip bytes identical between builds of the same content
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+        manifest[relpath] = built
+        logger.info(f"Built {relpath} -> {built} ({len(source.encode())} -> {len(content)} bytes)")
+
+    if not brotli:
+        logger.warning('The brotli package is not installed, only gzip variants were built')
+    _keep_previous_build(output_dir, staging_dir)
+    with open(os.path.join(staging_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    # Swap the finished build in, so a running server never sees half of one
+    previous_dir = output_dir + '.old'
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.rename(output_dir, previous_dir)
+    os.rename(staging_dir, output_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    return manifest
+
+def _keep_previous_build(output_dir, staging_dir):
+    # Pages rendered before a deploy still link the previous build's files,
+    # so they are carried over for one more build
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return
+    for built in previous.values():
+        for suffix in ('', '.gz', '.br'):
+            source = os.path.join(output_dir, built + suffix)
+            target = os.path.join(staging_dir, built + suffix)
+            if os.path.isfile(source) and not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(source, target)
+
+class AssetPipeline:
+    """
+    Serve built assets from ``/assets/`` with immutable caching and the
+    best pre-compressed variant the browser accepts, and give templates
+    ``asset_url('css/style.css')``. Without a build (``flask build-assets``)
+    or for files missing from it, asset_url falls back to the plain
+    static URL, so development works unbuilt.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.build_dir = os.path.join(static_dir, BUILD_DIRECTORY)
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._version = ''
+
+    def init_app(self, app):
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.serve)
+        app.context_processor(lambda: {'asset_url': self.url})
+
+    def manifest(self):
+        # Re-read only when a new build has replaced the file
+        path = os.path.join(self.build_dir, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._manifest, self._manifest_mtime, self._version = {}, None, ''
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                self._manifest = json.loads(content)
+                self._version = hashlib.sha256(content).hexdigest()[:8]
+                self._manifest_mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read asset manifest: {str(e)}")
+        return self._manifest
+
+    def version(self):
+        """
+        Short hash of the current build, or '' without one; pages that link
+        assets use it in their ETags, since a new build changes their HTML
+        """
+        self.manifest()
+        return self._version
+
+    def url(self, relpath):
+        built = self.manifest().get(relpath)
+        if built:
+            return url_for('asset', filename=built)
+        return url_for('static', filename=relpath)
+
+    def serve(self, filename):
+        path = safe_join(self.build_dir, filename)
+        if path is None or filename == MANIFEST_NAME or not os.path.isfile(path):
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if accepted[name] and os.path.isfile(path + suffix):
+                encoding, path = name, path + suffix
+                break
+
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=31536000)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -1,50 +1,117 @@
-import speech_recognition as sr
 import os
 import logging
-from pydub import AudioSegment
 import tempfile
+from services.deadline import DeadlineExceeded, deadline_stage
+from services.scheduler import BULK, get_scheduler
+from services.metrics import AUDIO_DECODE_SECONDS, SPEECH_RECOGNITION_SECONDS, ERRORS
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# speech_recognition and pydub are imported where they are used, so that
+# processes which never transcribe (web workers serving previews, the
+# export path) do not pay for loading them
+
+class GoogleSpeechBackend:
+    """
+    Recognition backend using the Google Web Speech API.
+
+    Backends take an ``sr.AudioData`` and an optional timeout in seconds and
+    return its text. They raise ``sr.UnknownValueError`` when no speech was
+    recognized and ``sr.RequestError`` when the service could not be reached.
+    """
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self.recognizer = recognizer or sr.Recognizer()
+    
+    def recognize(self, audio_data, timeout=None):
+        # operation_timeout bounds the HTTP request to the recognition service
+        self.recognizer.operation_timeout = timeout
+        return self.recognizer.recognize_google(audio_data)
+
 class AudioProcessor:
-    def __init__(self):
+    def __init__(self, backend=None, priority=BULK, client_id=None, scheduler=None):
+        import speech_recognition as sr
         self.recognizer = sr.Recognizer()
+        self.backend = backend or GoogleSpeechBackend(self.recognizer)
+        # Recognition calls queue for the shared 'speech' upstream limit
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.client_id = client_id
     
-    def transcribe_audio(self, audio_file_path):
+    def transcribe_audio(self, audio_file_path, deadline=None):
         """
-        Transcribe audio file to text using Google Speech Recognition
+        Transcribe audio file to text using Google Speech Recognition.
+        With a deadline, recognition gets only the remaining budget and
+        DeadlineExceeded is raised once it runs out.
         """
+        import speech_recognition as sr
         wav_path = None
         try:
             # Convert audio to WAV format if needed
-            wav_path = self._convert_to_wav(audio_file_path)
-            
-            # Use speech recognition
-            with sr.AudioFile(wav_path) as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
-                audio = self.recognizer.record(source)
+            with deadline_stage(deadline, 'convert'), AUDIO_DECODE_SECONDS.time(), span('audio.convert'):
+                wav_path = self._convert_to_wav(audio_file_path)
+                
+                # Use speech recognition
+                with sr.AudioFile(wav_path) as source:
+                    # Adjust for ambient noise
+                    self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                    audio = self.recognizer.record(source)
             
             # Recognize speech using Google Web Speech API
             try:
-                transcript = self.recognizer.recognize_google(audio)
+                with deadline_stage(deadline, 'recognize'):
+                    transcript = self._recognize(audio, deadline)
                 logger.info(f"Transcription successful: {len(transcript)} characters")
                 return transcript
             except sr.UnknownValueError:
                 logger.error("Google Speech Recognition could not understand audio")
+                ERRORS.inc(stage='recognize')
                 return None
             except sr.RequestError as e:
                 logger.error(f"Could not request results from Google Speech Recognition service; {e}")
+                ERRORS.inc(stage='recognize')
                 return None
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error transcribing audio: {str(e)}")
+            ERRORS.inc(stage='transcribe')
             return None
         finally:
             # Clean up temporary WAV file if created
             if wav_path and wav_path != audio_file_path and os.path.exists(wav_path):
                 os.remove(wav_path)
     
+    def transcribe_pcm(self, pcm_data, sample_rate, sample_width=2):
+        """
+        Transcribe a segment of raw mono PCM audio, returning an empty string
+        when the segment contains no recognizable speech
+        """
+        import speech_recognition as sr
+        audio = sr.AudioData(pcm_data, sample_rate, sample_width)
+        try:
+            return self._recognize(audio)
+        except sr.UnknownValueError:
+            return ''
+    
+    def _recognize(self, audio, deadline=None):
+        """
+        Run the backend in a scheduler slot, within the deadline if there is one
+        """
+        timeout = deadline.timeout(stage='recognize') if deadline else None
+        audio_seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        with span('speech.recognize', audio_seconds=round(audio_seconds, 3)) as recognize_span:
+            with self.scheduler.slot('speech', self.priority, self.client_id, timeout=timeout):
+                if deadline:
+                    # Time spent queueing for the slot counts against the deadline
+                    timeout = deadline.timeout(stage='recognize')
+                with SPEECH_RECOGNITION_SECONDS.time():
+                    text = self.backend.recognize(audio, timeout=timeout)
+            recognize_span.set_attribute('characters', len(text))
+            return text
+    
     def _convert_to_wav(self, audio_file_path):
         """
         Convert audio file to WAV format if needed
@@ -57,6 +124,7 @@ class AudioProcessor:
                 return audio_file_path
             
             # Convert to WAV
+            from pydub import AudioSegment
             audio = AudioSegment.from_file(audio_file_path)
             
             # Create temporary WAV file
@@ -69,4 +137,5 @@ class AudioProcessor:
             
         except Exception as e:
             logger.error(f"Error converting audio to WAV: {str(e)}")
+            ERRORS.inc(stage='decode')
             return audio_file_path  # Return original if conversion fails
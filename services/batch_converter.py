@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import shutil
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from models import Presentation
+from services.audio_processor import AudioProcessor
+from services.slide_generator import SlideGenerator
+from services.export_service import ExportService
+from services.deadline import Deadline
+from services.scheduler import BULK
+from services.logging_config import log_context
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.m4a', '.webm')
+
+# Stages reported for every file, in pipeline order
+STAGES = ('convert', 'recognize', 'title', 'slides', 'export')
+
+def find_audio_files(directory):
+    """
+    Return paths of audio files under ``directory``, relative to it and sorted
+    """
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+    return found
+
+def fingerprint(path):
+    """
+    Identify a version of a file, so a checkpoint entry is redone if the file changes
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+def convert_file(source_dir, relpath, output_dir, formats, engine=None, timeout=3600):
+    """
+    Convert one recording to slide exports. Runs in a pool process, so it
+    takes and returns only plain values; failures are reported, not raised.
+    """
+    path = os.path.join(source_dir, relpath)
+    deadline = Deadline(timeout)
+    result = {'file': relpath, 'fingerprint': fingerprint(path), 'outputs': []}
+    start_time = time.time()
+    with log_context(file=relpath):
+        try:
+            transcript = AudioProcessor(priority=BULK).transcribe_audio(path, deadline=deadline)
+            if not transcript:
+                raise ValueError('No speech could be transcribed')
+
+            slide_generator = SlideGenerator(engine=engine, priority=BULK)
+            title = slide_generator.generate_presentation_title(transcript, deadline=deadline)
+            slides = slide_generator.generate_slides(transcript, deadline=deadline)
+            if not slides:
+                raise ValueError('Slide generation failed')
+
+            # A transient record: exports only read the title and slides
+            presentation = Presentation(title=title, transcript=transcript, status='completed')
+            presentation.set_slides(slides)
+
+            export_service = ExportService()
+            base = os.path.join(output_dir, os.path.splitext(relpath)[0])
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            for export_format in formats:
+                export = export_service.export_pdf if export_format == 'pdf' else export_service.export_html
+                exported_path = export(presentation, deadline=deadline)
+                if not exported_path:
+                    raise ValueError(f"{export_format.upper()} export failed")
+                destination = f"{base}.{export_format}"
+                shutil.move(exported_path, destination)
+                result['outputs'].append(os.path.relpath(destination, output_dir))
+
+            result.update(status='completed', title=title, slides=len(slides))
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+    result['timings'] = {stage: round(seconds, 3) for stage, seconds in deadline.timings.items()}
+    result['seconds'] = round(time.time() - start_time, 3)
+    return result
+
+class BatchConverter:
+    """
+    Convert a directory of recordings with a pool of worker processes.
+
+    Progress is checkpointed to a JSON file after every finished file, so
+    an interrupted run picks up where it stopped: files already converted
+    (and unchanged since) are skipped, as are earlier failures unless
+    ``retry_failed`` is set.
+    """
+
+    def __init__(self, source_dir, output_dir, formats=('html',), workers=2, engine=None,
+                 timeout=3600, checkpoint_path=None, retry_failed=False):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.workers = workers
+        self.engine = engine
+        self.timeout = timeout
+        self.checkpoint_path = checkpoint_path or os.path.join(output_dir, 'checkpoint.json')
+        self.retry_failed = retry_failed
+
+    def run(self, on_result=None):
+        """
+        Convert every pending file and return the summary report
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = self._load_checkpoint()
+        files = find_audio_files(self.source_dir)
+        pending = [relpath for relpath in files if self._needs_conversion(relpath, results.get(relpath))]
+        logger.info(f"Converting {len(pending)} of {len(files)} recordings with {self.workers} workers")
+
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(convert_file, self.source_dir, relpath, self.output_dir,
+                            self.formats, self.engine, self.timeout)
+                for relpath in pending
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['file']] = result
+                self._save_checkpoint(results)
+                if on_result:
+                    on_result(result)
+
+        report = self.summarize([results[relpath] for relpath in files if relpath in results])
+        report['elapsed_seconds'] = round(time.time() - start_time, 3)
+        report['converted_this_run'] = len(pending)
+        self._write_json(os.path.join(self.output_dir, 'report.json'), report)
+        return report
+
+    def summarize(self, results):
+        completed = [result for result in results if result['status'] == 'completed']
+        stage_totals = {}
+        for stage in STAGES:
+            seconds = [result['timings'][stage] for result in completed if stage in result.get('timings', {})]
+            if seconds:
+                stage_totals[stage] = {
+                    'total': round(sum(seconds), 3),
+                    'mean': round(sum(seconds) / len(seconds), 3),
+                    'max': round(max(seconds), 3),
+                }
+        return {
+            'files': len(results),
+            'completed': len(completed),
+            'failed': len(results) - len(completed),
+            'stages': stage_totals,
+            'results': results,
+        }
+
+    def _needs_conversion(self, relpath, previous):
+        if not previous:
+            return True
+        if previous.get('fingerprint') != fingerprint(os.path.join(self.source_dir, relpath)):
+            return True
+        return previous['status'] == 'failed' and self.retry_failed
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as f:
+            return json.load(f).get('files', {})
+
+    def _save_checkpoint(self, results):
+        self._write_json(self.checkpoint_path, {'source': os.path.abspath(self.source_dir), 'files': results})
+
+    def _write_json(self, path, data):
+        # Write then rename, so an interruption never leaves a truncated file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
@@ -0,0 +1,92 @@
+import time
+import logging
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a job runs out of time. ``stage`` names the stage that was
+    running when the deadline passed.
+    """
+
+    def __init__(self, stage, deadline):
+        super().__init__(stage)
+        self.stage = stage
+        self.deadline = deadline
+
+    def __str__(self):
+        # Built on demand so it includes the timing of the stage that overran
+        return f"Deadline of {self.deadline.seconds:g}s exceeded during {self.stage} ({self.deadline.summary()})"
+
+class Deadline:
+    """
+    Time budget for one job, passed through every stage of the pipeline.
+
+    Stages ask for ``remaining()`` (or ``timeout(cap)``) to size their own
+    network timeouts, and wrap their work in ``stage(name)`` so the time each
+    one took is recorded. A stage that finishes after the deadline raises
+    ``DeadlineExceeded`` so later stages are not started for a client that
+    has already given up.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.timings = {}
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage):
+        """
+        Raise DeadlineExceeded if the deadline has passed
+        """
+        if self.expired():
+            raise DeadlineExceeded(stage, self)
+
+    def timeout(self, cap=None, stage='request'):
+        """
+        Return a timeout for a single call: the remaining budget, at most ``cap``
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a stage, refusing to start it or to continue past it once the deadline is gone
+        """
+        self.check(name)
+        start_time = time.monotonic()
+        try:
+            yield self
+        except DeadlineExceeded:
+            self._record(name, start_time)
+            raise
+        except Exception as e:
+            self._record(name, start_time)
+            # A call that failed because its timeout was cut short by the
+            # deadline is reported as the deadline, not as its own error
+            if self.expired():
+                raise DeadlineExceeded(name, self) from e
+            raise
+        self._record(name, start_time)
+        self.check(name)
+
+    def _record(self, name, start_time):
+        self.timings[name] = self.timings.get(name, 0.0) + time.monotonic() - start_time
+
+    def summary(self):
+        return ' '.join(f"{name}={seconds:.2f}s" for name, seconds in self.timings.items()) or 'no stages'
+
+def deadline_stage(deadline, name):
+    """
+    Return ``deadline.stage(name)``, or a no-op context when there is no deadline
+    """
+    return deadline.stage(name) if deadline else nullcontext()
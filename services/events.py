@@ -0,0 +1,193 @@
+import json
+import time
+import uuid
+import queue
+import select
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import text, select as sql_select, delete, func
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """
+    Events for one topic, read either from a thread or, when created with
+    an event loop, from a coroutine
+    """
+
+    def __init__(self, topic, loop=None):
+        self.topic = topic
+        self.loop = loop
+        self._queue = asyncio.Queue() if loop else queue.Queue()
+
+    def deliver(self, event):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        else:
+            self._queue.put(event)
+
+    def get(self, timeout=None):
+        """
+        Return the next event, or None if none arrived within ``timeout``
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def get_async(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class EventBus:
+    """
+    Publish/subscribe for presentation status events.
+
+    Subscribers in this process get events directly. With a ``notifier``,
+    events are also broadcast to other processes (web workers, job workers)
+    and events from them are delivered here; each bus ignores its own
+    broadcasts by their origin id. The notifier only starts listening once
+    something subscribes, so processes that only publish never poll.
+    """
+
+    def __init__(self, notifier=None):
+        self.notifier = notifier
+        self.origin = uuid.uuid4().hex
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def subscribe(self, topic, loop=None):
+        subscription = Subscription(str(topic), loop)
+        with self._lock:
+            self._subscribers[subscription.topic].add(subscription)
+            if self.notifier and not self._listening:
+                self.notifier.start(self._receive)
+                self._listening = True
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic, event):
+        topic = str(topic)
+        self._deliver(topic, event)
+        if not self.notifier:
+            return
+        try:
+            self.notifier.send(json.dumps({'origin': self.origin, 'topic': topic, 'event': event}))
+        except Exception as e:
+            logger.warning(f"Could not broadcast event for {topic}: {str(e)}")
+
+    def _receive(self, message):
+        message = json.loads(message)
+        if message.get('origin') != self.origin:
+            self._deliver(message['topic'], message['event'])
+
+    def _deliver(self, topic, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+class PostgresNotifier:
+    """
+    Broadcast events with NOTIFY and receive them on a dedicated LISTEN connection
+    """
+
+    def __init__(self, engine, channel='presentation_events'):
+        self.engine = engine
+        self.channel = channel
+
+    def send(self, message):
+        with self.engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :message)"), {'channel': self.channel, 'message': message})
+
+    def start(self, receive):
+        # Wait until LISTEN is in place so the first subscriber misses nothing
+        ready = threading.Event()
+        threading.Thread(target=self._listen, args=(receive, ready), daemon=True, name='pg-listen').start()
+        ready.wait(5)
+
+    def _listen(self, receive, ready):
+        while True:
+            try:
+                raw = self.engine.raw_connection()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                connection.cursor().execute(f"LISTEN {self.channel}")
+                ready.set()
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        receive(connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Event listener connection failed, reconnecting: {str(e)}")
+                time.sleep(2)
+
+class TablePollingNotifier:
+    """
+    Broadcast events through a table for databases without LISTEN/NOTIFY.
+
+    Each listening process runs one poller thread that reads new rows every
+    ``interval`` seconds, so database load depends on the number of
+    processes, not on the number of connected clients. Old rows are pruned
+    as new ones are written.
+    """
+
+    def __init__(self, engine, table, interval=0.5, retention_seconds=300):
+        self.engine = engine
+        self.table = table
+        self.interval = interval
+        self.retention_seconds = retention_seconds
+
+    def send(self, message):
+        now = datetime.utcnow()
+        with self.engine.begin() as connection:
+            connection.execute(self.table.insert().values(payload=message, created_at=now))
+            connection.execute(delete(self.table).where(
+                self.table.c.created_at < now - timedelta(seconds=self.retention_seconds)
+            ))
+
+    def start(self, receive):
+        # Only events published from now on, read before returning so the
+        # first subscriber misses nothing
+        with self.engine.connect() as connection:
+            last_id = connection.execute(sql_select(func.max(self.table.c.id))).scalar() or 0
+        threading.Thread(target=self._poll, args=(receive, last_id), daemon=True, name='event-poller').start()
+
+    def _poll(self, receive, last_id):
+        while True:
+            try:
+                with self.engine.connect() as connection:
+                    rows = connection.execute(
+                        sql_select(self.table.c.id, self.table.c.payload)
+                        .where(self.table.c.id > last_id)
+                        .order_by(self.table.c.id)
+                    ).all()
+                for row in rows:
+                    last_id = row.id
+                    receive(row.payload)
+            except Exception as e:
+                logger.warning(f"Event poll failed: {str(e)}")
+            time.sleep(self.interval)
+
+def create_notifier(engine, table):
+    """
+    Pick LISTEN/NOTIFY on PostgreSQL and table polling elsewhere
+    """
+    if engine.dialect.name == 'postgresql':
+        return PostgresNotifier(engine)
+    return TablePollingNotifier(engine, table)
@@ -2,8 +2,10 @@ import os
 import tempfile
 import logging
 from flask import render_template_string
-import weasyprint
 from jinja2 import Template
+from services.deadline import DeadlineExceeded, deadline_stage
+from services.metrics import TEMPLATE_RENDER_SECONDS, PDF_WRITE_SECONDS, ERRORS
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -232,41 +234,57 @@ class ExportService:
         }
         """
     
-    def export_html(self, presentation):
+    def export_html(self, presentation, deadline=None):
         """Export presentation as HTML file"""
         try:
-            slides = presentation.get_slides()
-            html_content = self._generate_html_content(presentation, slides)
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as temp_file:
-                temp_file.write(html_content)
-                temp_file_path = temp_file.name
+            with deadline_stage(deadline, 'export'), span('export.html', presentation_id=getattr(presentation, 'id', None)):
+                slides = presentation.get_slides()
+                with TEMPLATE_RENDER_SECONDS.time(format='html'), span('export.render'):
+                    html_content = self._generate_html_content(presentation, slides)
+                
+                # Create temporary file
+                with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as temp_file:
+                    temp_file.write(html_content)
+                    temp_file_path = temp_file.name
             
             logger.info(f"HTML export created: {temp_file_path}")
             return temp_file_path
             
         except Exception as e:
             logger.error(f"Error exporting HTML: {str(e)}")
+            ERRORS.inc(stage='export_html')
             raise
     
-    def export_pdf(self, presentation):
+    def export_pdf(self, presentation, deadline=None):
         """Export presentation as PDF file"""
+        temp_file_path = None
         try:
-            slides = presentation.get_slides()
-            html_content = self._generate_pdf_html_content(presentation, slides)
-            
-            # Generate PDF using WeasyPrint
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file_path = temp_file.name
-            
-            weasyprint.HTML(string=html_content).write_pdf(temp_file_path)
+            with deadline_stage(deadline, 'export'), span('export.pdf', presentation_id=getattr(presentation, 'id', None)):
+                slides = presentation.get_slides()
+                with TEMPLATE_RENDER_SECONDS.time(format='pdf'), span('export.render'):
+                    html_content = self._generate_pdf_html_content(presentation, slides)
+                
+                # Generate PDF using WeasyPrint
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                    temp_file_path = temp_file.name
+                
+                # Rendering cannot be interrupted, so the deadline is checked
+                # before it starts and the result dropped if it finished too late
+                with PDF_WRITE_SECONDS.time(), span('export.pdf_write'):
+                    # Imported on first use: loading WeasyPrint and Pango is slow
+                    import weasyprint
+                    weasyprint.HTML(string=html_content).write_pdf(temp_file_path)
             
             logger.info(f"PDF export created: {temp_file_path}")
             return temp_file_path
             
+        except DeadlineExceeded:
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            raise
         except Exception as e:
             logger.error(f"Error exporting PDF: {str(e)}")
+            ERRORS.inc(stage='export_pdf')
             raise
     
     def _generate_html_content(self, presentation, slides):
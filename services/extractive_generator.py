@@ -0,0 +1,222 @@
+import logging
+import numpy as np
+from services.text_utils import content_words, split_sentences
+from services.keyphrase_extractor import KeyphraseExtractor
+
+logger = logging.getLogger(__name__)
+
+# Phrases that suggest a passage contrasts two things
+CONTRAST_MARKERS = (
+    'versus', ' vs ', 'compared to', 'compared with', 'whereas', 'on the other hand',
+    'in contrast', 'pros', 'cons', 'advantages', 'disadvantages', 'before and after',
+    'instead of', 'unlike',
+)
+
+class ExtractiveSlideGenerator:
+    """
+    Build slides from a transcript without any network calls.
+
+    Sentences are scored with TF-IDF (each sentence is a document) weighted
+    by how close they sit to the centroid of the whole talk. The talk is cut
+    into contiguous sections where adjacent sentences are least similar,
+    each section is headed by its strongest keywords, and its best sentences
+    become the bullets. The output follows the same slide schema as the
+    Anthropic prompt, so it can be passed through the usual validation.
+    """
+
+    def __init__(self, max_bullets=4, max_bullet_words=15, keyphrase_extractor=None):
+        self.keyphrase_extractor = keyphrase_extractor or KeyphraseExtractor()
+        self.max_bullets = max_bullets
+        self.max_bullet_words = max_bullet_words
+
+    def generate_slides(self, transcript):
+        """
+        Generate a list of slide dicts from a transcript
+        """
+        sentences = split_sentences(transcript, max_words=15)
+        if not sentences:
+            return []
+
+        weights, vocabulary = self._tfidf(sentences)
+        scores = self._score_sentences(weights)
+        sections = self._segment(weights, self._section_count(len(sentences)))
+
+        headings = [self._heading(weights, vocabulary, section) for section in sections]
+        talk_terms = self._top_terms(weights.sum(axis=0), vocabulary, 3)
+
+        slides = [{
+            'type': 'title',
+            'title': self.keyphrase_extractor.generate_title(transcript) or 'Overview',
+            'subtitle': self._trim(sentences[int(np.argmax(scores))], 10),
+            'image_prompt': ' '.join(talk_terms),
+            'layout': 'centered',
+            'speaker_notes': 'Welcome and introduce the topic.',
+        }, {
+            'type': 'content',
+            'title': 'Overview',
+            'content': headings,
+            'image_prompt': ' '.join(talk_terms),
+            'layout': 'text_only',
+            'speaker_notes': 'Outline of the main sections.',
+        }]
+
+        comparison = self._find_comparison(sentences, sections)
+        for section, heading in zip(sections, headings):
+            if section is comparison:
+                slides.append(self._comparison_slide(sentences, weights, vocabulary, section, heading))
+            else:
+                slides.append(self._content_slide(sentences, scores, section, heading))
+
+        top = sorted(np.argsort(-scores)[:3])
+        slides.append({
+            'type': 'content',
+            'title': 'Key Takeaways',
+            'content': [self._trim(sentences[i], self.max_bullet_words) for i in top],
+            'image_prompt': ' '.join(talk_terms),
+            'layout': 'text_only',
+            'speaker_notes': ' '.join(sentences[i] for i in top),
+        })
+        slides.append({
+            'type': 'ending',
+            'title': 'Questions?',
+            'subtitle': 'Thank you for your attention',
+            'image_prompt': ' '.join(talk_terms),
+            'layout': 'centered',
+            'speaker_notes': 'Open for questions',
+        })
+
+        for i, slide in enumerate(slides):
+            slide['slide_number'] = i + 1
+
+        logger.info(f"Generated {len(slides)} slides locally from {len(sentences)} sentences")
+        return slides
+
+    def summarize_span(self, text):
+        """
+        Return a heading and bullet points for a single passage
+        """
+        sentences = split_sentences(text, max_words=15)
+        if not sentences:
+            return '', []
+
+        weights, vocabulary = self._tfidf(sentences)
+        scores = self._score_sentences(weights)
+        section = list(range(len(sentences)))
+        heading = self._heading(weights, vocabulary, section)
+        slide = self._content_slide(sentences, scores, section, heading)
+        return heading, slide['content']
+
+    def _tfidf(self, sentences):
+        tokens = [content_words(sentence) for sentence in sentences]
+        vocabulary = sorted({word for words in tokens for word in words})
+        if not vocabulary:
+            return np.zeros((len(sentences), 1)), ['']
+
+        index = {word: i for i, word in enumerate(vocabulary)}
+        counts = np.zeros((len(sentences), len(vocabulary)))
+        for row, words in enumerate(tokens):
+            for word in words:
+                counts[row, index[word]] += 1
+
+        lengths = counts.sum(axis=1, keepdims=True)
+        tf = np.divide(counts, lengths, out=np.zeros_like(counts), where=lengths > 0)
+        df = (counts > 0).sum(axis=0)
+        idf = np.log((1 + len(sentences)) / (1 + df)) + 1
+        weights = tf * idf
+
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0), vocabulary
+
+    def _score_sentences(self, weights):
+        # Favour sentences that are both informative and central to the talk
+        centroid = weights.mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        centrality = weights @ (centroid / norm) if norm > 0 else np.zeros(len(weights))
+        return centrality + 0.1 * (weights > 0).sum(axis=1) / max(weights.shape[1], 1)
+
+    def _section_count(self, sentence_count):
+        if sentence_count < 6:
+            return 1
+        if sentence_count < 12:
+            return 2
+        return 3
+
+    def _segment(self, weights, count):
+        """
+        Split sentence indices into ``count`` contiguous sections, cutting
+        at the gaps where neighbouring sentences are least similar
+        """
+        n = len(weights)
+        if count <= 1 or n < count * 2:
+            return [list(range(n))]
+
+        similarity = np.einsum('ij,ij->i', weights[:-1], weights[1:])
+        min_size = max(1, n // (count * 2))
+        cuts = []
+        for gap in np.argsort(similarity):
+            cut = int(gap) + 1
+            if cut < min_size or n - cut < min_size:
+                continue
+            if all(abs(cut - other) >= min_size for other in cuts):
+                cuts.append(cut)
+            if len(cuts) == count - 1:
+                break
+
+        bounds = [0] + sorted(cuts) + [n]
+        return [list(range(bounds[i], bounds[i + 1])) for i in range(len(bounds) - 1)]
+
+    def _top_terms(self, totals, vocabulary, count):
+        order = np.argsort(-totals)
+        return [vocabulary[i] for i in order[:count] if totals[i] > 0 and vocabulary[i]]
+
+    def _heading(self, weights, vocabulary, section):
+        terms = self._top_terms(weights[section].sum(axis=0), vocabulary, 3)
+        return ' '.join(terms).title() or 'Key Points'
+
+    def _content_slide(self, sentences, scores, section, heading):
+        best = sorted(sorted(section, key=lambda i: -scores[i])[:self.max_bullets])
+        return {
+            'type': 'content',
+            'title': heading,
+            'content': [self._trim(sentences[i], self.max_bullet_words) for i in best],
+            'image_prompt': heading.lower(),
+            'layout': 'text_with_image',
+            'speaker_notes': ' '.join(sentences[i] for i in section[:3]),
+        }
+
+    def _find_comparison(self, sentences, sections):
+        """
+        Return the section with the most contrast markers, if any has them
+        """
+        best, best_hits = None, 0
+        for section in sections:
+            if len(section) < 4:
+                continue
+            text = ' '.join(sentences[i] for i in section).lower()
+            hits = sum(text.count(marker) for marker in CONTRAST_MARKERS)
+            if hits > best_hits:
+                best, best_hits = section, hits
+        return best
+
+    def _comparison_slide(self, sentences, weights, vocabulary, section, heading):
+        middle = len(section) // 2
+        columns = []
+        for half in (section[:middle], section[middle:]):
+            columns.append({
+                'title': self._heading(weights, vocabulary, half),
+                'content': [self._trim(sentences[i], self.max_bullet_words) for i in half[:3]],
+            })
+
+        return {
+            'type': 'comparison',
+            'title': heading,
+            'left_column': columns[0],
+            'right_column': columns[1],
+            'layout': 'two_column',
+            'speaker_notes': 'Compare and contrast',
+        }
+
+    def _trim(self, sentence, max_words):
+        words = sentence.rstrip('.!?').split()
+        text = ' '.join(words[:max_words]) + ('...' if len(words) > max_words else '')
+        return text[:1].upper() + text[1:]
@@ -0,0 +1,89 @@
+import os
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from flask import request
+from werkzeug.http import is_resource_modified
+
+logger = logging.getLogger(__name__)
+
+# The preview page can carry flashed messages from the visitor's session,
+# so only the browser may keep it, and it checks back on every view
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+# Exports are the same for everyone: a CDN or reverse proxy may store them,
+# and revalidates with the ETag before serving, so an edit shows up at once
+# while unchanged exports cost the app a header check instead of a render
+SHARED_REVALIDATE = 'public, no-cache'
+
+def render_version(paths):
+    """
+    Return a short hash of the files that shape rendered output, so ETags
+    change when a deploy changes the templates or export code, not only
+    when a presentation changes. Directories are hashed file by file.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file_path in files:
+            try:
+                with open(file_path, 'rb') as f:
+                    digest.update(os.path.relpath(file_path, os.path.dirname(path)).encode())
+                    digest.update(f.read())
+            except OSError as e:
+                logger.debug(f"Skipping {file_path} in render version: {str(e)}")
+    return digest.hexdigest()[:10]
+
+def presentation_etag(presentation, variant, version):
+    """
+    Strong ETag for one representation (``variant``) of a presentation,
+    from its content version and the render ``version`` of the code
+    """
+    return f"p{presentation.id}-v{presentation.version}-{variant}-{version}"
+
+def last_modified(presentation):
+    """
+    The presentation's Last-Modified time, or None while the second it
+    was last changed in has not ended yet.
+
+    HTTP dates have one-second resolution. Had a response sent during that
+    second carried the date, an edit later in the same second would give the
+    same date, and If-Modified-Since would then confirm stale content. Once
+    the second is over, any later edit falls in a later second.
+    """
+    modified = presentation.last_modified
+    if modified is None:
+        return None
+    truncated = modified.replace(microsecond=0)
+    if datetime.utcnow() < truncated + timedelta(seconds=1):
+        return None
+    # Stored as naive UTC; HTTP dates are compared as aware datetimes
+    return truncated.replace(tzinfo=timezone.utc)
+
+def is_not_modified(etag, modified=None):
+    """
+    True when the request's If-None-Match (or, without one,
+    If-Modified-Since) shows the client already has this representation
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return not is_resource_modified(request.environ, etag=etag, last_modified=modified)
+
+def set_cache_headers(response, etag, modified=None, cache_control=SHARED_REVALIDATE):
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    else:
+        # Also drops the date send_file took from the file
+        response.headers.pop('Last-Modified', None)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def not_modified_response(response_class, etag, modified=None, cache_control=SHARED_REVALIDATE):
+    """
+    An empty 304 carrying the validators and caching rules a full response would
+    """
+    return set_cache_headers(response_class(status=304), etag, modified, cache_control)
@@ -0,0 +1,332 @@
+import os
+import time
+import socket
+import signal
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update
+from app import app, db
+from models import Job
+from services.scheduler import PRIORITIES, BULK
+from services.metrics import JOBS_IN_FLIGHT, ERRORS, RETRIES
+from services.tracing import span, current_span
+from services.logging_config import log_context
+
+logger = logging.getLogger(__name__)
+
+class JobFailed(Exception):
+    """
+    Raised by a job handler when the job did not succeed and may be retried
+    """
+
+class JobAborted(JobFailed):
+    """
+    Raised by a job handler when retrying cannot help, so the job fails at once
+    """
+
+class JobQueue:
+    """
+    Durable job queue stored in the ``job`` table.
+
+    A job is claimed by taking a lease: its status becomes ``running`` and
+    ``lease_expires_at`` is set a visibility timeout ahead. The worker keeps
+    the lease alive with heartbeats; if the worker dies, the lease runs out
+    and the job becomes claimable again. Failed jobs are requeued with
+    exponential backoff until ``max_attempts`` is reached. A job whose
+    lease expired after its last attempt (its worker crashed or was
+    killed) is not claimed again but marked failed by ``reap_exhausted``,
+    so a job that kills its worker cannot take down every worker in turn.
+
+    On PostgreSQL claims use ``SELECT ... FOR UPDATE SKIP LOCKED`` so
+    concurrent workers never wait on each other. SQLite has no row locks, so
+    there a candidate is claimed with an UPDATE that repeats the claim
+    conditions and only succeeds for one worker.
+    """
+
+    def __init__(self, lease_seconds=60, retry_delay=5):
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+
+    def enqueue(self, kind, payload=None, presentation_id=None, priority=BULK, max_attempts=3):
+        job = Job(
+            kind=kind,
+            presentation_id=presentation_id,
+            priority=PRIORITIES.index(priority),
+            max_attempts=max_attempts
+        )
+        payload = dict(payload or {})
+        # The worker continues the trace of the request that queued the job
+        trace = current_span().context()
+        if trace:
+            payload['trace'] = trace
+        job.set_payload(payload)
+        db.session.add(job)
+        db.session.commit()
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def claim(self, worker_id):
+        """
+        Lease the next runnable job to ``worker_id``, or return None
+        """
+        if db.engine.dialect.name == 'postgresql':
+            return self._claim_locked(worker_id)
+        return self._claim_conditional(worker_id)
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Extend a lease. Returns False if the lease was lost to another worker.
+        """
+        now = datetime.utcnow()
+        renewed = self._update_owned(job_id, worker_id, {
+            'heartbeat_at': now,
+            'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+        })
+        if not renewed:
+            logger.warning(f"Worker {worker_id} lost the lease on job {job_id}")
+        return renewed
+
+    def complete(self, job_id, worker_id):
+        return self._update_owned(job_id, worker_id, {
+            'status': 'completed',
+            'lease_owner': None,
+            'lease_expires_at': None,
+        })
+
+    def fail(self, job_id, worker_id, error, retryable=True):
+        """
+        Requeue a failed job with backoff, or mark it failed for good once it
+        has used up its attempts or is not ``retryable``.
+        Returns True when the job will be retried, False when it failed for
+        good, and None when the lease was lost to another worker, in which
+        case the job is left to that worker.
+        """
+        job = db.session.get(Job, job_id, populate_existing=True)
+        retry = retryable and job.attempts < job.max_attempts
+        values = {'last_error': str(error)[:2000], 'lease_owner': None, 'lease_expires_at': None}
+        if retry:
+            values['status'] = 'queued'
+            values['run_after'] = datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (job.attempts - 1))
+        else:
+            values['status'] = 'failed'
+        if not self._update_owned(job_id, worker_id, values):
+            return None
+        return retry
+
+    def reap_exhausted(self):
+        """
+        Mark failed the running jobs whose lease expired after their last
+        attempt, and return them so the caller can clean up after them
+        """
+        now = datetime.utcnow()
+        candidates = (
+            Job.query
+            .filter(self._exhausted(now))
+            .order_by(Job.id)
+            .all()
+        )
+        reaped = []
+        for job in candidates:
+            # Conditional, so only one worker reaps each job
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job.id, self._exhausted(now))
+                .values(
+                    status='failed',
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    last_error=f"Lease expired after attempt {job.attempts} of {job.max_attempts}"
+                )
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                logger.error(f"Job {job.id} used up its attempts without finishing, marking it failed")
+                reaped.append(db.session.get(Job, job.id, populate_existing=True))
+        return reaped
+
+    def _claimable(self, now):
+        # Queued jobs whose delay has passed, and running jobs whose lease
+        # expired with attempts left
+        return or_(
+            and_(Job.status == 'queued', Job.run_after <= now),
+            and_(Job.status == 'running', Job.lease_expires_at < now, Job.attempts < Job.max_attempts),
+        )
+
+    def _exhausted(self, now):
+        return and_(Job.status == 'running', Job.lease_expires_at < now, Job.attempts >= Job.max_attempts)
+
+    def _lease_values(self, worker_id, now):
+        return {
+            'status': 'running',
+            'lease_owner': worker_id,
+            'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+            'heartbeat_at': now,
+            'attempts': Job.attempts + 1,
+        }
+
+    def _claim_locked(self, worker_id):
+        now = datetime.utcnow()
+        job = (
+            Job.query
+            .filter(self._claimable(now))
+            .order_by(Job.priority, Job.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if not job:
+            db.session.rollback()
+            return None
+        db.session.execute(update(Job).where(Job.id == job.id).values(**self._lease_values(worker_id, now)))
+        db.session.commit()
+        db.session.refresh(job)
+        return job
+
+    def _claim_conditional(self, worker_id, attempts=5):
+        for _ in range(attempts):
+            now = datetime.utcnow()
+            job_id = (
+                db.session.query(Job.id)
+                .filter(self._claimable(now))
+                .order_by(Job.priority, Job.id)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                db.session.rollback()
+                return None
+            result = db.session.execute(
+                update(Job)
+                .where(Job.id == job_id, self._claimable(now))
+                .values(**self._lease_values(worker_id, now))
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return db.session.get(Job, job_id, populate_existing=True)
+            # Another worker claimed it first; try the next candidate
+        return None
+
+    def _update_owned(self, job_id, worker_id, values):
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == 'running')
+            .values(**values)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+class Worker:
+    """
+    Claim and run jobs until stopped. Each process runs one job at a time;
+    throughput scales by starting more worker processes, on any node that
+    shares the database and the uploads folder, since audio jobs read the
+    file the web node saved. ``handlers`` maps job kinds to functions taking
+    the job; ``on_failure`` is called with a job that will not be retried.
+    """
+
+    def __init__(self, queue, handlers, on_failure=None, worker_id=None, poll_interval=1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.on_failure = on_failure
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self._next_reap = 0.0
+
+    def run(self, once=False):
+        """
+        Process jobs until SIGTERM/SIGINT, or until the queue is empty when ``once`` is set
+        """
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"Worker {self.worker_id} started")
+
+        while not self.stopping.is_set():
+            self._reap_exhausted()
+            job = self.queue.claim(self.worker_id)
+            if job:
+                self.run_job(job)
+            elif once:
+                break
+            else:
+                self.stopping.wait(self.poll_interval)
+
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def run_job(self, job):
+        with log_context(job_id=job.id, presentation_id=job.presentation_id):
+            self._run_job(job)
+
+    def _run_job(self, job):
+        handler = self.handlers.get(job.kind)
+        logger.info(f"Worker {self.worker_id} running {job.kind} job {job.id} (attempt {job.attempts})")
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job.id, done), daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise JobFailed(f"No handler for job kind {job.kind}")
+            with JOBS_IN_FLIGHT.track(kind=job.kind), self._job_span(job):
+                handler(job)
+        except Exception as e:
+            db.session.rollback()
+            done.set()
+            heartbeat.join()
+            retry = self.queue.fail(job.id, self.worker_id, e, retryable=not isinstance(e, JobAborted))
+            if retry is None:
+                logger.warning(f"Job {job.id} failed after its lease was lost, leaving it to its new owner: {str(e)}")
+                return
+            logger.error(f"Job {job.id} failed{', will retry' if retry else ''}: {str(e)}")
+            if retry:
+                RETRIES.inc(operation='job')
+            else:
+                ERRORS.inc(stage='job')
+                if self.on_failure:
+                    self.on_failure(job)
+            return
+        done.set()
+        heartbeat.join()
+        if not self.queue.complete(job.id, self.worker_id):
+            logger.warning(f"Job {job.id} finished after its lease was lost")
+
+    def _reap_exhausted(self):
+        # Checked about once per lease length; expired leases cannot be noticed sooner
+        now = time.monotonic()
+        if now < self._next_reap:
+            return
+        self._next_reap = now + self.queue.lease_seconds
+        try:
+            for job in self.queue.reap_exhausted():
+                ERRORS.inc(stage='job')
+                if self.on_failure:
+                    self.on_failure(job)
+        except Exception as e:
+            logger.warning(f"Could not reap exhausted jobs: {str(e)}")
+            db.session.rollback()
+
+    def _job_span(self, job):
+        waited = round((datetime.utcnow() - job.created_at).total_seconds(), 3) if job.created_at else None
+        return span(
+            f"job.{job.kind}",
+            parent=job.get_payload().get('trace'),
+            job_id=job.id,
+            presentation_id=job.presentation_id,
+            attempt=job.attempts,
+            worker=self.worker_id,
+            queued_seconds=waited
+        )
+
+    def _heartbeat(self, job_id, done):
+        # Renew the lease at a third of its length, in a separate session
+        with app.app_context():
+            while not done.wait(self.queue.lease_seconds / 3):
+                try:
+                    self.queue.heartbeat(job_id, self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {job_id} failed: {str(e)}")
+                    db.session.rollback()
+
+    def _stop(self, signum, frame):
+        logger.info(f"Worker {self.worker_id} finishing current job before stopping")
+        self.stopping.set()
@@ -0,0 +1,251 @@
+import re
+import math
+import logging
+from collections import Counter
+from services.text_utils import STOP_WORDS, WORD_PATTERN
+
+TOKEN_PATTERN = re.compile(WORD_PATTERN.pattern + r"|\d[\d.,]*|[.,;:!?]")
+
+logger = logging.getLogger(__name__)
+
+def _verb_forms(bases):
+    """
+    Return the given verbs with their third-person and past forms
+    """
+    forms = set()
+    for base in bases:
+        forms.add(base)
+        if base.endswith('y') and base[-2] not in 'aeiou':
+            forms.update({base[:-1] + 'ies', base[:-1] + 'ied'})
+            continue
+        forms.add(base + ('es' if base.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')) else 's'))
+        forms.add(base + ('d' if base.endswith('e') else 'ed'))
+    return forms
+
+# Verbs that are not stop words and are rarely used as nouns, with their
+# inflections and common irregular past forms. None of them belongs in a
+# topic phrase, so they end one. Verbs that double as common nouns (plan,
+# report, increase, cost) are left out, and -ing forms are not listed since
+# most that occur in talks are nouns (training, marketing, onboarding).
+COMMON_VERBS = frozenset(_verb_forms("""
+accept achieve adapt affect agree allow appear apply argue arrive assume avoid become believe
+belong bring choose compare consider contain continue create decide deliver depend describe
+develop disappear discover discuss enable encourage ensure explain expect feel find follow
+forget grow happen imagine improve include involve join learn leave lose mention notice obtain
+occur prefer prepare prevent produce protect prove provide reach realize receive reduce rely
+remain remember remove renew replace require respond reveal seem serve solve speak spend stay
+suggest survive tend understand wait win wonder worry write
+""".split()) | frozenset("""
+ate began bought broke brought built caught chose came did drew drove fell felt found gave got
+grew grown held kept knew led left lost met paid ran rose risen sank sent shrank spent stood
+struck taught thought threw told understood went won wore wrote
+""".split()))
+
+# Number words; digits are matched as tokens of their own
+NUMBER_WORDS = frozenset("""
+zero three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen
+seventeen eighteen nineteen twenty thirty forty fifty sixty seventy eighty ninety hundred
+hundreds thousand thousands million millions billion billions trillion half third quarter
+percent dozen
+""".split())
+
+# Common adjectives without a telltale suffix. Adjectives may start a topic
+# phrase ("renewable energy") but never end one.
+COMMON_ADJECTIVES = frozenset("""
+average bad big bright broad busy cheap clean clear close cold common cool current dark dead
+deep difficult direct dry easy eastern empty entire equal exact extra fair fast final fine flat
+foreign free fresh full general happy hard healthy heavy high hot huge key large late latest
+likely long loud low main major minor modern narrow natural near nice normal northern old open
+poor popular possible present previous private proper public quick quiet rare ready real recent
+regular rich rough safe short simple single slow smart soft solid southern special specific
+steady strong sudden tall thick thin tiny total tough true typical upper usual various warm weak
+western wide wild wrong young daily weekly monthly quarterly yearly early
+""".split())
+
+ADJECTIVE_SUFFIXES = ('ous', 'ful', 'less', 'able', 'ible', 'ive')
+
+# Nouns with an adjective, adverb or verb suffix
+SUFFIX_NOUNS = frozenset("""
+alternative archive executive incentive initiative motive narrative objective perspective
+representative table cable capable vegetable variable label fable
+ally anomaly assembly family italy july monopoly rally reply supply
+sales news earnings savings operations services analytics economics logistics goods
+""".split())
+
+# Adverbs without the -ly suffix
+COMMON_ADVERBS = frozenset("""
+ahead alone apart backward forward later nearly twice fast
+""".split())
+
+# Words that open talks rather than name their topic
+OPENING_WORDS = frozenset({'morning', 'afternoon', 'evening', 'everyone', 'everybody', 'folks', 'guys'})
+
+# Words kept lowercase inside titles
+TITLE_SMALL_WORDS = frozenset({'a', 'an', 'and', 'as', 'at', 'but', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'vs'})
+
+class KeyphraseExtractor:
+    """
+    Extract topic phrases from a transcript without calling an LLM.
+
+    Candidate phrases are runs of up to three content words between stop
+    words, punctuation, numbers, verbs and adverbs, a cheap stand-in for
+    noun phrases in unpunctuated speech. A phrase must end on a noun-like
+    word, so trailing adjectives are trimmed. Words are classed by small
+    lexicons and suffixes rather than a tagger, so words outside them count
+    as nouns. Phrases are ranked by the TF-IDF weight of their words, where
+    document frequencies come from the corpus of previously stored
+    transcripts when ``lookup`` and ``document_count`` are supplied.
+    """
+
+    def __init__(self, lookup=None, document_count=0, max_phrase_words=3):
+        self.lookup = lookup
+        self.document_count = document_count
+        self.max_phrase_words = max_phrase_words
+
+    def terms(self, text):
+        """
+        Return the set of candidate words in a text, used to learn corpus statistics
+        """
+        return {word for phrase in self.candidates(text) for word in phrase}
+
+    def candidates(self, text):
+        """
+        Split text into candidate phrases as tuples of words
+        """
+        phrases = []
+        run = []
+        for token in TOKEN_PATTERN.findall(text.lower()) + ['.']:
+            if token in STOP_WORDS or len(token) < 3 or self._breaks_phrase(token):
+                # Stop words, punctuation, very short words, numbers, verbs
+                # and adverbs end a phrase
+                phrases.extend(self._split_run(run))
+                run = []
+            else:
+                run.append(token)
+        return phrases
+
+    def extract(self, text, top_n=5):
+        """
+        Return the top keyphrases of a text, best first
+        """
+        candidates = self.candidates(text)
+        if not candidates:
+            return []
+
+        counts = Counter(word for phrase in candidates for word in phrase)
+        idf = self._idf(counts.keys())
+        first_seen = {}
+        for position, phrase in enumerate(candidates):
+            first_seen.setdefault(phrase, position)
+
+        phrase_counts = Counter(candidates)
+        scores = {}
+        for phrase, frequency in phrase_counts.items():
+            word_score = sum(counts[word] * idf[word] for word in phrase) / len(phrase)
+            # Repeated multi-word phrases are strong topic signals; earlier
+            # phrases are slightly preferred since talks open with their topic
+            scores[phrase] = (
+                word_score
+                * (1 + 0.2 * (len(phrase) - 1))
+                * frequency
+                * (1 + 0.5 / (1 + first_seen[phrase]))
+            )
+
+        ranked = sorted(scores, key=lambda phrase: -scores[phrase])
+        selected = []
+        for phrase in ranked:
+            # Skip phrases overlapping one already chosen
+            if any(set(phrase) & set(other) for other in selected):
+                continue
+            selected.append(phrase)
+            if len(selected) == top_n:
+                break
+
+        return [' '.join(phrase) for phrase in selected]
+
+    def generate_title(self, text, max_words=6):
+        """
+        Build a short title from the strongest keyphrases
+        """
+        phrases = self.extract(text, top_n=2)
+        if not phrases:
+            return None
+
+        title = phrases[0]
+        if len(phrases) > 1 and len(title.split()) < 2:
+            combined = f"{title} and {phrases[1]}"
+            if len(combined.split()) <= max_words:
+                title = combined
+
+        words = title.split()[:max_words]
+        return ' '.join(
+            word if i and word in TITLE_SMALL_WORDS else word.capitalize()
+            for i, word in enumerate(words)
+        )
+
+    def _split_run(self, run):
+        # Topic phrases are noun-headed, so they cannot end on an adjective
+        while run and self._is_adjective(run[-1]):
+            run = run[:-1]
+        if not run:
+            return []
+
+        if len(run) <= self.max_phrase_words:
+            return [tuple(run)]
+
+        # In a run too long for one phrase, a word ending in a single "s"
+        # with more words after it is most likely a verb joining two
+        # phrases ("solar power provides steady income")
+        for i, word in enumerate(run[1:-1], start=1):
+            if word.endswith('s') and not word.endswith('ss') and word not in SUFFIX_NOUNS:
+                return self._split_run(run[:i]) + self._split_run(run[i + 1:])
+
+        # Long runs usually span several phrases in unpunctuated speech, so
+        # offer the pairs and triples that end on a noun and let frequency
+        # pick the real ones
+        return [
+            tuple(run[i:i + size])
+            for size in range(2, self.max_phrase_words + 1)
+            for i in range(len(run) - size + 1)
+            if not self._is_adjective(run[i + size - 1])
+        ]
+
+    def _breaks_phrase(self, word):
+        return (
+            word[0].isdigit()
+            or word in NUMBER_WORDS
+            or word in COMMON_VERBS
+            or word in OPENING_WORDS
+            # Contractions such as "we're" and "don't", but not possessives
+            or ("'" in word and not word.endswith("'s"))
+            or self._is_adverb(word)
+            or self._is_past_tense(word)
+        )
+
+    def _is_adverb(self, word):
+        if word in COMMON_ADVERBS:
+            return True
+        return word.endswith('ly') and word not in SUFFIX_NOUNS and word not in COMMON_ADJECTIVES
+
+    def _is_past_tense(self, word):
+        # Not "need", "speed", "bed"
+        return word.endswith('ed') and not word.endswith('eed') and len(word) > 4
+
+    def _is_adjective(self, word):
+        if word in COMMON_ADJECTIVES:
+            return True
+        return word.endswith(ADJECTIVE_SUFFIXES) and word not in SUFFIX_NOUNS
+
+    def _idf(self, words):
+        frequencies = {}
+        if self.lookup and self.document_count:
+            try:
+                frequencies = self.lookup(list(words))
+            except Exception as e:
+                logger.warning(f"Could not load term statistics: {str(e)}")
+
+        total = self.document_count if frequencies else 0
+        return {
+            word: math.log((1 + total) / (1 + frequencies.get(word, 0))) + 1
+            for word in words
+        }
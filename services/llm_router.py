@@ -0,0 +1,294 @@
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services.scheduler import BULK
+from services.metrics import LLM_REQUEST_SECONDS, ERRORS, RETRIES
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+class LatencyHistogram:
+    """
+    Rolling window of recent call latencies for one model
+    """
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p):
+        """
+        Return the p-th percentile latency, or None when there are no samples
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(p / 100 * (len(samples) - 1)))))
+        return samples[rank]
+
+# Latency histograms are shared by every router in the process
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+def get_histogram(model):
+    with _histograms_lock:
+        if model not in _histograms:
+            _histograms[model] = LatencyHistogram()
+        return _histograms[model]
+
+# Pool size for routers without a scheduler to take the concurrency cap from
+DEFAULT_EXECUTOR_WORKERS = 16
+
+# Shared pool for primary and hedged requests, sized on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(max_workers):
+    """
+    Return the process-wide pool for LLM calls, created with ``max_workers`` threads
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-hedge')
+        return _executor
+
+class _Slot:
+    """
+    A scheduler slot released exactly once, by the call holding it or by
+    the router abandoning that call, whichever comes first
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        if self.scheduler is None:
+            return
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.scheduler.release('anthropic')
+
+class ModelRouter:
+    """
+    Route Anthropic requests by input size and hedge slow ones.
+
+    Short inputs go to ``small_model`` when one is configured. Each request
+    is sent once; if it has not returned by the model's ``hedge_percentile``
+    latency (after ``min_samples`` calls have been observed), an identical
+    second request is sent and whichever finishes first wins. The sync
+    client cannot abort an in-flight call, so the loser is abandoned: its
+    scheduler slot is released as soon as the winner returns, and the call
+    finishes in the background, still feeding the latency histogram.
+
+    With a ``scheduler``, every request waits for an ``anthropic`` slot
+    first. Hedges only go out when a slot is free right away, so hedging
+    never adds load once the upstream limit is reached. The thread pool
+    for sync calls gets two threads per slot, one for each call holding a
+    slot and one for an abandoned call.
+
+    ``create_async`` does the same with ``async_client`` on the event loop,
+    where the losing request of a hedged pair is cancelled.
+    """
+
+    def __init__(self, client, default_model, small_model=None, small_input_tokens=400,
+                 hedge_percentile=95, min_samples=20, min_hedge_delay=1.0, scheduler=None,
+                 async_client=None):
+        self.client = client
+        self.async_client = async_client
+        self.scheduler = scheduler
+        self.default_model = default_model
+        self.small_model = small_model
+        self.small_input_tokens = small_input_tokens
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+
+    def choose_model(self, input_tokens):
+        if self.small_model and input_tokens <= self.small_input_tokens:
+            return self.small_model
+        return self.default_model
+
+    def hedge_delay(self, model):
+        """
+        Return how long to wait before hedging, or None to never hedge
+        """
+        histogram = get_histogram(model)
+        if histogram.count() < self.min_samples:
+            return None
+        return max(self.min_hedge_delay, histogram.percentile(self.hedge_percentile))
+
+    def create(self, input_tokens, max_retries=None, priority=BULK, client_id=None, **request):
+        """
+        Send a messages.create request through the router and return the
+        response. ``max_retries`` overrides the client's retry count;
+        ``priority`` and ``client_id`` place the request in the scheduler.
+        """
+        model = self.choose_model(input_tokens)
+        request['model'] = model
+        with span('llm.request', model=model, estimated_input_tokens=input_tokens) as request_span:
+            response = self._create(model, request, max_retries, priority, client_id)
+            request_span.set_attributes(**usage_attributes(response))
+            return response
+
+    def _create(self, model, request, max_retries, priority, client_id):
+        client = self.client if max_retries is None else self.client.with_options(max_retries=max_retries)
+
+        if self.scheduler:
+            # Time spent queueing comes out of the request's own timeout
+            queued_at = time.time()
+            self.scheduler.acquire('anthropic', priority, client_id, timeout=request.get('timeout'))
+            if request.get('timeout') is not None:
+                request['timeout'] = max(0.1, request['timeout'] - (time.time() - queued_at))
+
+        primary_slot = _Slot(self.scheduler)
+        primary = self._submit(client, model, request, primary_slot)
+        delay = self.hedge_delay(model)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        if self.scheduler and not self.scheduler.try_acquire('anthropic', priority):
+            logger.info(f"{model} request is slow but the upstream is at capacity, not hedging")
+            return primary.result()
+
+        logger.warning(f"{model} request exceeded p{self.hedge_percentile} ({delay:.2f}s), sending hedged request")
+        RETRIES.inc(operation='llm_hedge')
+        hedge_slot = _Slot(self.scheduler)
+        hedge = self._submit(client, model, request, hedge_slot, hedged=True)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    logger.info(f"{'Hedged' if future is hedge else 'Primary'} request won")
+                    # Abandon the loser, so it no longer holds a slot
+                    (primary_slot if future is hedge else hedge_slot).release()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def create_async(self, input_tokens, max_retries=None, priority=BULK, client_id=None, **request):
+        """
+        Async version of create, using ``async_client``
+        """
+        model = self.choose_model(input_tokens)
+        request['model'] = model
+        with span('llm.request', model=model, estimated_input_tokens=input_tokens) as request_span:
+            response = await self._create_async(model, request, max_retries, priority, client_id)
+            request_span.set_attributes(**usage_attributes(response))
+            return response
+
+    async def _create_async(self, model, request, max_retries, priority, client_id):
+        client = self.async_client if max_retries is None else self.async_client.with_options(max_retries=max_retries)
+
+        if self.scheduler:
+            queued_at = time.time()
+            await self.scheduler.acquire_async('anthropic', priority, client_id, timeout=request.get('timeout'))
+            if request.get('timeout') is not None:
+                request['timeout'] = max(0.1, request['timeout'] - (time.time() - queued_at))
+
+        tasks = [asyncio.create_task(self._scheduled_call_async(client, model, request, hedged=False))]
+        try:
+            delay = self.hedge_delay(model)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            if self.scheduler and not self.scheduler.try_acquire('anthropic', priority):
+                logger.info(f"{model} request is slow but the upstream is at capacity, not hedging")
+                return await tasks[0]
+
+            logger.warning(f"{model} request exceeded p{self.hedge_percentile} ({delay:.2f}s), sending hedged request")
+            RETRIES.inc(operation='llm_hedge')
+            tasks.append(asyncio.create_task(self._scheduled_call_async(client, model, request, hedged=True)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        logger.info(f"{'Hedged' if task is tasks[1] else 'Primary'} request won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Unlike a thread, a losing coroutine can be stopped, freeing its slot
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _scheduled_call_async(self, client, model, request, hedged):
+        try:
+            with span('llm.call', model=model, hedged=hedged) as call_span:
+                start_time = time.time()
+                response = await client.messages.create(**request)
+                self._record_latency(model, time.time() - start_time)
+                call_span.set_attributes(**usage_attributes(response))
+            return response
+        except Exception:
+            ERRORS.inc(stage='llm')
+            raise
+        finally:
+            if self.scheduler:
+                self.scheduler.release('anthropic')
+
+    def _submit(self, client, model, request, slot, hedged=False):
+        # Run in the caller's context so the call's span joins its trace
+        context = contextvars.copy_context()
+        executor = get_executor(
+            2 * self.scheduler.max_concurrency('anthropic') if self.scheduler else DEFAULT_EXECUTOR_WORKERS
+        )
+        return executor.submit(context.run, self._scheduled_call, client, model, request, slot, hedged)
+
+    def _scheduled_call(self, client, model, request, slot, hedged):
+        # The slot was acquired by the caller and is released here, unless
+        # the caller abandoned this call and released it first
+        try:
+            with span('llm.call', model=model, hedged=hedged) as call_span:
+                start_time = time.time()
+                response = client.messages.create(**request)
+                self._record_latency(model, time.time() - start_time)
+                call_span.set_attributes(**usage_attributes(response))
+            return response
+        except Exception:
+            ERRORS.inc(stage='llm')
+            raise
+        finally:
+            slot.release()
+
+    def _record_latency(self, model, seconds):
+        get_histogram(model).record(seconds)
+        LLM_REQUEST_SECONDS.observe(seconds, model=model)
+
+def usage_attributes(response):
+    """
+    Token counts of a messages response, as span attributes
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return {}
+    return {
+        'input_tokens': getattr(usage, 'input_tokens', None) or 0,
+        'output_tokens': getattr(usage, 'output_tokens', None) or 0,
+        'cache_read_input_tokens': getattr(usage, 'cache_read_input_tokens', None) or 0,
+        'cache_creation_input_tokens': getattr(usage, 'cache_creation_input_tokens', None) or 0,
+    }
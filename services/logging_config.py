@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextvars
+import logging.handlers
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from services.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Fields attached to every record logged in the current request or job
+_log_context = contextvars.ContextVar('log_context', default={})
+
+# Chatty libraries that log every query or HTTP request at INFO or DEBUG
+DEFAULT_LEVELS = {
+    'sqlalchemy.engine': logging.WARNING,
+    'sqlalchemy.pool': logging.WARNING,
+    'urllib3': logging.WARNING,
+    'httpx': logging.WARNING,
+    'httpcore': logging.WARNING,
+    'anthropic': logging.WARNING,
+    'weasyprint': logging.WARNING,
+    'fontTools': logging.WARNING,
+    'PIL': logging.WARNING,
+}
+
+# Records waiting for the listener thread; past this, new records are dropped
+QUEUE_SIZE = 10000
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+@contextmanager
+def log_context(**fields):
+    """
+    Attach ``fields`` (such as job_id or presentation_id) to every record
+    logged inside the block
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+def bind_log_context(**fields):
+    """
+    Attach ``fields`` to the records logged for the rest of the current
+    request, which starts with an empty context
+    """
+    _log_context.set({**_log_context.get(), **fields})
+
+def clear_log_context():
+    _log_context.set({})
+
+class ContextFilter(logging.Filter):
+    """
+    Copy the log context and the current trace onto each record. Runs in
+    the thread that logged, before the record is queued.
+    """
+
+    def filter(self, record):
+        record.context = dict(_log_context.get())
+        span = current_span()
+        if span.trace_id:
+            record.context.setdefault('trace_id', span.trace_id)
+            record.context.setdefault('span_id', span.span_id)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records. ``rates`` maps logger name
+    prefixes to the fraction kept; the longest matching prefix wins.
+    """
+
+    def __init__(self, default_rate=1.0, rates=None):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+
+    def rate(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return self.default_rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for the listener thread without ever blocking the caller.
+    When the queue is full the record is dropped and counted; the count is
+    reported once the listener catches up.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        # Records are queued from many threads at once
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Interpolate the message and render the traceback now, while the
+        # arguments are still valid; JSON formatting is left to the listener.
+        # The queue is the only handler, so the record is changed in place.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            return
+        # Checked without the lock first, so the common case stays lock-free
+        if self.dropped and self.queue.qsize() < QUEUE_SIZE // 2:
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if not dropped:
+                return
+            warning = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Dropped {dropped} log records while the log queue was full",
+                'context': {},
+            })
+            try:
+                self.queue.put_nowait(warning)
+            except queue.Full:
+                with self._dropped_lock:
+                    self.dropped += dropped
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, with the log context as top-level fields
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """
+    The classic one-line format, with the log context appended
+    """
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record):
+        text = super().format(record)
+        context = getattr(record, 'context', None)
+        if context:
+            text += ' [' + ' '.join(f"{key}={value}" for key, value in context.items()) + ']'
+        return text
+
+class LoggingPipeline:
+    """
+    Route all logging through a bounded queue to a background listener
+    thread, which formats records and writes them to stderr. Code on the
+    request path only pays for building the record.
+    """
+
+    def __init__(self, formatter, filters=()):
+        self.formatter = formatter
+        self.output = logging.StreamHandler(sys.stderr)
+        self.output.setFormatter(formatter)
+        self.handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+        for log_filter in filters:
+            self.handler.addFilter(log_filter)
+        self.listener = None
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        # Flushes what is queued; called at exit
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self):
+        # The listener thread does not survive a fork (gunicorn --preload,
+        # process pools), and the old queue's lock may be held; start over
+        self.handler.queue = queue.Queue(QUEUE_SIZE)
+        self.handler._dropped_lock = threading.Lock()
+        self.listener = None
+        self.start()
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def parse_levels(spec):
+    """
+    Parse "name=LEVEL,name=LEVEL" into a dict of logger names to levels
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, level = item.partition('=')
+        level = level.strip().upper()
+        if not name or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid logger level setting: {item}")
+        levels[name.strip()] = logging.getLevelName(level)
+    return levels
+
+def parse_rates(spec):
+    """
+    Parse "name=0.1,name=0.5" into a dict of logger names to sample rates
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+def configure_logging(level=None, log_format=None, levels=None, debug_sample_rate=None, sample_rates=None):
+    """
+    Replace any existing root handlers with the queued pipeline. Settings
+    default to the environment: LOG_LEVEL, LOG_FORMAT (json or text),
+    LOG_LEVELS ("sqlalchemy.engine=INFO,services.events=DEBUG"),
+    LOG_DEBUG_SAMPLE_RATE and LOG_SAMPLE_RATES ("services.events=0.01").
+    """
+    global _pipeline
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_format = log_format or os.environ.get('LOG_FORMAT', 'json').lower()
+    if levels is None:
+        levels = parse_levels(os.environ.get('LOG_LEVELS'))
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+    if sample_rates is None:
+        sample_rates = parse_rates(os.environ.get('LOG_SAMPLE_RATES'))
+
+    formatter = JsonFormatter() if log_format == 'json' else TextFormatter()
+    with _pipeline_lock:
+        if _pipeline:
+            _pipeline.stop()
+        _pipeline = LoggingPipeline(formatter, [SamplingFilter(debug_sample_rate, sample_rates), ContextFilter()])
+        _pipeline.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_pipeline.handler)
+        root.setLevel(level)
+        for name, logger_level in {**DEFAULT_LEVELS, **levels}.items():
+            logging.getLogger(name).setLevel(logger_level)
+    return _pipeline
+
+def _stop_pipeline():
+    if _pipeline:
+        _pipeline.stop()
+
+def _restart_pipeline():
+    if _pipeline:
+        _pipeline.restart_after_fork()
+
+atexit.register(_stop_pipeline)
+os.register_at_fork(after_in_child=_restart_pipeline)
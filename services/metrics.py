@@ -0,0 +1,253 @@
+import time
+import math
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a fast template render up to a slow LLM call or long recording
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+PREFIX = 'easyslides_'
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.label_names, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{self._label_text(key)} {_format(value)}")
+        return lines
+
+class Counter(_Metric):
+    """
+    A count that only goes up, such as errors or cache hits
+    """
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. Either set directly, or read from a
+    function at scrape time with ``set_function``; the function returns a
+    number, or for labelled gauges a dict of label value tuples to numbers.
+    """
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """
+        Count the block as in progress while it runs
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def set_function(self, function):
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            return super().samples()
+        values = self._function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return sorted((tuple(str(part) for part in key), value) for key, value in values.items())
+
+class Histogram(_Metric):
+    """
+    Distribution of durations in seconds, in cumulative buckets
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe how long the block takes, whether or not it raises
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def samples(self):
+        with self._lock:
+            return sorted((key, {'counts': list(state['counts']), 'sum': state['sum']}) for key, state in self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, state in self.samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _format(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format(state['sum'])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+class Registry:
+    """
+    The metrics of one process, rendered in the Prometheus text format.
+
+    Values live in process memory, so with several web workers each scrape
+    sees the worker that answered it; scrape each process (or run one) to
+    get totals.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A gauge read at scrape time failed; report everything else
+                logger.warning(f"Could not collect {metric.name}: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+def start_http_server(port, registry=None, host='0.0.0.0'):
+    """
+    Serve ``registry`` on ``port`` from a background thread, for processes
+    without a web server of their own such as job workers
+    """
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+    logger.info(f"Serving metrics on port {port}")
+    return server
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+REGISTRY = Registry()
+
+# Pipeline stages
+AUDIO_DECODE_SECONDS = REGISTRY.register(Histogram(
+    'audio_decode_seconds', 'Time to convert an upload to WAV and load its samples'))
+SPEECH_RECOGNITION_SECONDS = REGISTRY.register(Histogram(
+    'speech_recognition_seconds', 'Time spent in the speech recognition backend'))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'llm_request_seconds', 'Duration of Anthropic API calls', labels=('model',)))
+SLIDES_PARSE_SECONDS = REGISTRY.register(Histogram(
+    'slides_parse_seconds', 'Time to parse and validate slides from a model response'))
+TEMPLATE_RENDER_SECONDS = REGISTRY.register(Histogram(
+    'template_render_seconds', 'Time to render an export template', labels=('format',)))
+PDF_WRITE_SECONDS = REGISTRY.register(Histogram(
+    'pdf_write_seconds', 'Time WeasyPrint takes to lay out and write a PDF'))
+
+# Outcomes
+ERRORS = REGISTRY.register(Counter(
+    'errors_total', 'Failed operations by stage', labels=('stage',)))
+RETRIES = REGISTRY.register(Counter(
+    'retries_total', 'Repeated attempts: hedged LLM requests and retried jobs', labels=('operation',)))
+CACHE_HITS = REGISTRY.register(Counter(
+    'cache_hits_total', 'Requests served partly from a cache', labels=('cache',)))
+CACHE_MISSES = REGISTRY.register(Counter(
+    'cache_misses_total', 'Requests that had to fill a cache', labels=('cache',)))
+COALESCED = REGISTRY.register(Counter(
+    'coalesced_total', 'Requests that shared work already in flight for an identical request', labels=('operation', 'scope')))
+
+# Load
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'jobs_in_flight', 'Generation jobs running in this process', labels=('kind',)))
+JOB_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'job_queue_depth', 'Jobs in the job table waiting to run'))
+UPSTREAM_IN_FLIGHT = REGISTRY.register(Gauge(
+    'upstream_in_flight', 'Calls holding an upstream scheduler slot', labels=('upstream',)))
+UPSTREAM_QUEUED = REGISTRY.register(Gauge(
+    'upstream_queued', 'Calls waiting for an upstream scheduler slot', labels=('upstream', 'priority')))
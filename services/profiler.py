@@ -0,0 +1,177 @@
+import os
+import io
+import hmac
+import json
+import time
+import uuid
+import pstats
+import random
+import hashlib
+import logging
+import cProfile
+from datetime import datetime
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+class RequestProfiler:
+    """
+    Opt-in cProfile capture of individual requests.
+
+    A request is profiled when it is picked by ``sample_rate`` or carries a
+    valid signed token in the ``X-Profile`` header. A sampled profile is
+    kept only if the request took at least ``slow_seconds``; a requested
+    one is always kept. Profiles are written to ``directory`` as pstats
+    files with a JSON sidecar, keeping the newest ``max_profiles``.
+
+    ``init_app`` registers request hooks only when sampling or a secret is
+    configured, so a disabled profiler adds no work to any request.
+    Profiling covers the Flask app; requests served natively by the ASGI
+    entry point are not profiled.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, slow_seconds=2.0, max_profiles=50, secret=None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_profiles = max_profiles
+        self.secret = secret
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or bool(self.secret)
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+        logger.info(f"Request profiling on: sample rate {self.sample_rate}, slow threshold {self.slow_seconds}s")
+
+    def create_token(self, ttl_seconds=3600):
+        """
+        Return a token for the X-Profile header, valid for ``ttl_seconds``
+        """
+        if not self.secret:
+            raise ValueError('PROFILE_SECRET is not configured')
+        expires = int(time.time() + ttl_seconds)
+        return f"{expires}.{self._sign(expires)}"
+
+    def verify_token(self, token):
+        if not self.secret or not token or '.' not in token:
+            return False
+        expires, signature = token.split('.', 1)
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(signature, self._sign(int(expires)))
+
+    def _sign(self, expires):
+        return hmac.new(self.secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+
+    def _start(self):
+        if self.verify_token(request.headers.get(PROFILE_HEADER)):
+            trigger = 'header'
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = 'sample'
+        else:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process
+            logger.debug(f"Skipping profile of {request.path}: another request is being profiled")
+            return
+        g._profile = (profile, trigger, time.perf_counter())
+
+    def _finish(self, response):
+        self._stop(response.status_code)
+        return response
+
+    def _abandon(self, error=None):
+        # Requests that raised never reach after_request
+        if getattr(g, '_profile', None):
+            self._stop(500)
+
+    def _stop(self, status_code):
+        captured = g.pop('_profile', None)
+        if not captured:
+            return
+        profile, trigger, start_time = captured
+        profile.disable()
+        duration = time.perf_counter() - start_time
+        if trigger == 'sample' and duration < self.slow_seconds:
+            return
+        try:
+            self._save(profile, {
+                'method': request.method,
+                'path': request.path,
+                'status': status_code,
+                'duration_seconds': round(duration, 4),
+                'trigger': trigger,
+                'captured_at': datetime.utcnow().isoformat(timespec='seconds'),
+            })
+        except OSError as e:
+            logger.warning(f"Could not save profile for {request.path}: {str(e)}")
+
+    def _save(self, profile, info):
+        name = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:8]}"
+        profile.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+        with open(os.path.join(self.directory, f"{name}.json"), 'w') as f:
+            json.dump(info, f)
+        logger.info(f"Saved profile {name} for {info['method']} {info['path']} ({info['duration_seconds']}s)")
+        self._prune()
+
+    def _prune(self):
+        # Names start with the capture time, so sorting puts the oldest first
+        names = sorted(entry[:-5] for entry in os.listdir(self.directory) if entry.endswith('.json'))
+        for name in names[:max(0, len(names) - self.max_profiles)]:
+            for suffix in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        """
+        Return the captured profiles, newest first
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in sorted(os.listdir(self.directory), reverse=True):
+            if not entry.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, entry)) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            info['name'] = entry[:-5]
+            profiles.append(info)
+        return profiles
+
+    def profile_path(self, name):
+        """
+        Return the pstats file for a profile name, or None if there is none
+        """
+        if not name or os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.directory, f"{name}.prof")
+        return path if os.path.exists(path) else None
+
+    def summary(self, name, sort='cumulative', limit=40):
+        """
+        Return the top ``limit`` functions of a profile as pstats text
+        """
+        path = self.profile_path(name)
+        if not path:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
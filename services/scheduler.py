@@ -0,0 +1,285 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first. Interactive work is someone waiting
+# on a typed or spoken transcript; bulk work is uploaded audio.
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+PRIORITIES = (INTERACTIVE, BULK)
+
+class SchedulerTimeout(Exception):
+    """
+    Raised when a call could not get a slot before its timeout
+    """
+
+class TokenBucket:
+    """
+    Allow ``rate`` calls per second on average with bursts of up to ``capacity``
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """
+        Seconds until the next token is available
+        """
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class _Waiter:
+    def __init__(self, client_id, future=None):
+        self.client_id = client_id
+        self.granted = False
+        # Set for coroutines waiting on an event loop instead of the condition
+        self.future = future
+
+    def wake(self):
+        if self.future is not None:
+            self.future.get_loop().call_soon_threadsafe(_resolve, self.future)
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class _Upstream:
+    def __init__(self, rate, burst, max_concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        # priority -> client id -> queued waiters, clients in round-robin order
+        self.queues = {priority: OrderedDict() for priority in PRIORITIES}
+
+    def has_waiters(self):
+        return any(self.queues.values())
+
+class Scheduler:
+    """
+    Shared admission control for calls to rate-limited upstream services.
+
+    Each upstream has a token bucket for its request rate and a cap on calls
+    in flight. Callers that cannot go straight away queue by priority class,
+    and within a class by client, taking one call from each client in turn
+    so a single bulk job cannot starve everyone else. There is no background
+    thread: waiters wake up when a slot is released or when the bucket will
+    have refilled, and hand out whatever capacity is free.
+
+    Limits are per process, so with several workers each should be given
+    its share of the upstream limit.
+    """
+
+    def __init__(self):
+        self._upstreams = {}
+        self._condition = threading.Condition()
+
+    def configure(self, upstream, rate_per_minute, max_concurrency, burst=None):
+        with self._condition:
+            self._upstreams[upstream] = _Upstream(
+                rate_per_minute / 60.0,
+                burst or max(1, max_concurrency),
+                max_concurrency
+            )
+
+    def acquire(self, upstream, priority=BULK, client_id=None, timeout=None):
+        """
+        Block until a call to ``upstream`` may start. Raise SchedulerTimeout
+        if that does not happen within ``timeout`` seconds.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            state = self._upstreams[upstream]
+            waiter = _Waiter(client_id)
+            state.queues[priority].setdefault(client_id, deque()).append(waiter)
+            try:
+                while True:
+                    self._dispatch(state)
+                    if waiter.granted:
+                        return
+                    wait = state.bucket.wait_time() if state.in_flight < state.max_concurrency else None
+                    if expires_at is not None:
+                        left = expires_at - time.monotonic()
+                        if left <= 0:
+                            raise SchedulerTimeout(f"No {upstream} slot within {timeout:.1f}s")
+                        wait = left if wait is None else min(wait, left)
+                    self._condition.wait(wait)
+            except BaseException:
+                if waiter.granted:
+                    self._release(state)
+                else:
+                    self._remove(state, priority, waiter)
+                raise
+
+    async def acquire_async(self, upstream, priority=BULK, client_id=None, timeout=None):
+        """
+        Like acquire, but waits on the event loop instead of blocking a thread
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(client_id, loop.create_future())
+        with self._condition:
+            state = self._upstreams[upstream]
+            state.queues[priority].setdefault(client_id, deque()).append(waiter)
+        try:
+            while True:
+                with self._condition:
+                    # A fresh future for each wait, resolved by the next grant or release
+                    waiter.future = loop.create_future()
+                    self._dispatch(state)
+                    if waiter.granted:
+                        return
+                    wait = state.bucket.wait_time() if state.in_flight < state.max_concurrency else None
+                if expires_at is not None:
+                    left = expires_at - time.monotonic()
+                    if left <= 0:
+                        raise SchedulerTimeout(f"No {upstream} slot within {timeout:.1f}s")
+                    wait = left if wait is None else min(wait, left)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._condition:
+                if waiter.granted:
+                    self._release(state)
+                else:
+                    self._remove(state, priority, waiter)
+            raise
+
+    def try_acquire(self, upstream, priority=BULK):
+        """
+        Take a slot only if one is free right now and nobody is queued for it
+        """
+        with self._condition:
+            state = self._upstreams[upstream]
+            if state.has_waiters() or state.in_flight >= state.max_concurrency:
+                return False
+            if not state.bucket.try_take():
+                return False
+            state.in_flight += 1
+            return True
+
+    def release(self, upstream):
+        with self._condition:
+            self._release(self._upstreams[upstream])
+
+    @contextmanager
+    def slot(self, upstream, priority=BULK, client_id=None, timeout=None):
+        """
+        Hold a slot for ``upstream`` for the duration of the block
+        """
+        self.acquire(upstream, priority, client_id, timeout)
+        try:
+            yield
+        finally:
+            self.release(upstream)
+
+    @asynccontextmanager
+    async def slot_async(self, upstream, priority=BULK, client_id=None, timeout=None):
+        await self.acquire_async(upstream, priority, client_id, timeout)
+        try:
+            yield
+        finally:
+            self.release(upstream)
+
+    def max_concurrency(self, upstream):
+        with self._condition:
+            return self._upstreams[upstream].max_concurrency
+
+    def stats(self, upstream):
+        with self._condition:
+            state = self._upstreams[upstream]
+            return {
+                'in_flight': state.in_flight,
+                'queued': {
+                    priority: sum(len(waiters) for waiters in queue.values())
+                    for priority, queue in state.queues.items()
+                },
+            }
+
+    def _dispatch(self, state):
+        # Grant free capacity to queued callers: highest priority class
+        # first, then the next client in round-robin order
+        granted = False
+        while state.in_flight < state.max_concurrency:
+            queue = next((state.queues[p] for p in PRIORITIES if state.queues[p]), None)
+            if queue is None or not state.bucket.try_take():
+                break
+            client_id, waiters = queue.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                queue[client_id] = waiters
+            waiter.granted = True
+            waiter.wake()
+            state.in_flight += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def _release(self, state):
+        state.in_flight -= 1
+        self._dispatch(state)
+        # Let every waiter recompute how long to wait now that a slot is free
+        self._condition.notify_all()
+        for queue in state.queues.values():
+            for waiters in queue.values():
+                for waiter in waiters:
+                    waiter.wake()
+
+    def _remove(self, state, priority, waiter):
+        waiters = state.queues[priority].get(waiter.client_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del state.queues[priority][waiter.client_id]
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """
+    Return the process-wide scheduler, configured from the environment
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            scheduler = Scheduler()
+            scheduler.configure(
+                'anthropic',
+                rate_per_minute=float(os.environ.get('ANTHROPIC_REQUESTS_PER_MINUTE', 50)),
+                max_concurrency=int(os.environ.get('ANTHROPIC_MAX_CONCURRENCY', 4))
+            )
+            scheduler.configure(
+                'speech',
+                rate_per_minute=float(os.environ.get('SPEECH_REQUESTS_PER_MINUTE', 60)),
+                max_concurrency=int(os.environ.get('SPEECH_MAX_CONCURRENCY', 4))
+            )
+            _scheduler = scheduler
+        return _scheduler
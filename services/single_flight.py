@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import concurrent.futures
+from services.deadline import DeadlineExceeded
+from services.metrics import COALESCED
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Backoff while polling for another process's lock
+POLL_SECONDS = 0.02
+MAX_POLL_SECONDS = 0.25
+
+# Lock files idle this long are removed, checked every PRUNE_EVERY flights
+STALE_LOCK_SECONDS = 3600
+PRUNE_EVERY = 500
+
+def content_key(*parts):
+    """
+    Hash JSON-serializable ``parts`` into a key, so identical requests
+    get the same one
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class SingleFlight:
+    """
+    Run one computation per key at a time, and share its result with every
+    caller that asks for the same key while it runs.
+
+    Within a process, the first caller (the leader) does the work and the
+    others wait on its future. With ``lock_dir``, the leader also holds an
+    exclusive lock on a file named by the key, so a leader in another
+    process waits for it instead of repeating the work, and then takes the
+    result the first one wrote into the file. Results must be
+    JSON-serializable for that, and lock files only coordinate processes on
+    the same host.
+
+    Nothing is cached: a result is shared only with callers that were
+    waiting while it was computed. A failure is raised to the callers
+    waiting in the same process; a waiting process finds no new result and
+    runs the work itself. Work that reports failure in its return value
+    rather than raising passes ``shareable``, which says whether a result
+    may be handed to other processes; results it rejects are treated as
+    failures there.
+    """
+
+    def __init__(self, name, lock_dir=None, shareable=None):
+        self.name = name
+        self.shareable = shareable
+        self.lock_dir = lock_dir if fcntl else None
+        if lock_dir and not fcntl:
+            logger.warning(f"File locks are not available, {name} requests are only coalesced within a process")
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._led = 0
+
+    def do(self, key, func, deadline=None):
+        """
+        Return ``func()``, or the result of the call already running for ``key``
+        """
+        future, leader = self._join(key)
+        if not leader:
+            COALESCED.inc(operation=self.name, scope='process')
+            with span('single_flight.wait', operation=self.name, scope='process'):
+                try:
+                    return future.result(timeout=deadline.remaining() if deadline else None)
+                except concurrent.futures.TimeoutError:
+                    raise DeadlineExceeded(self.name, deadline)
+        try:
+            result = self._lead(key, func, deadline)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key, func, deadline=None):
+        """
+        Like ``do`` for a coroutine function, without blocking the event loop
+        """
+        future, leader = self._join(key)
+        if not leader:
+            COALESCED.inc(operation=self.name, scope='process')
+            with span('single_flight.wait', operation=self.name, scope='process'):
+                try:
+                    # Shielded so a caller that gives up does not cancel the shared future
+                    return await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(future)),
+                        deadline.remaining() if deadline else None
+                    )
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(self.name, deadline)
+        try:
+            result = await self._lead_async(key, func, deadline)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def _join(self, key):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = self._flights[key] = concurrent.futures.Future()
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        # Later callers start a new flight rather than joining a finished one
+        with self._lock:
+            self._flights.pop(key, None)
+            self._led += 1
+            prune = self.lock_dir and self._led % PRUNE_EVERY == 0
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        if prune:
+            self.prune()
+
+    def _lead(self, key, func, deadline):
+        if not self.lock_dir:
+            return func()
+        waiting_since = time.time()
+        fd = self._open(key)
+        try:
+            if not self._try_lock(fd):
+                COALESCED.inc(operation=self.name, scope='host')
+                with span('single_flight.wait', operation=self.name, scope='host'):
+                    delay = POLL_SECONDS
+                    while not self._try_lock(fd):
+                        self._check_deadline(deadline)
+                        time.sleep(delay)
+                        delay = min(delay * 2, MAX_POLL_SECONDS)
+                shared = self._read_shared(fd, waiting_since)
+                if shared is not None:
+                    return shared['result']
+            result = func()
+            if self.shareable is None or self.shareable(result):
+                self._write_shared(fd, result)
+            return result
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    async def _lead_async(self, key, func, deadline):
+        if not self.lock_dir:
+            return await func()
+        waiting_since = time.time()
+        fd = self._open(key)
+        try:
+            if not self._try_lock(fd):
+                COALESCED.inc(operation=self.name, scope='host')
+                with span('single_flight.wait', operation=self.name, scope='host'):
+                    delay = POLL_SECONDS
+                    while not self._try_lock(fd):
+                        self._check_deadline(deadline)
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, MAX_POLL_SECONDS)
+                shared = self._read_shared(fd, waiting_since)
+                if shared is not None:
+                    return shared['result']
+            result = await func()
+            if self.shareable is None or self.shareable(result):
+                self._write_shared(fd, result)
+            return result
+        finally:
+            os.close(fd)
+
+    def prune(self, max_age=STALE_LOCK_SECONDS):
+        """
+        Remove lock files that have not been used for ``max_age`` seconds.
+        A process opening one just as it is removed may run its work
+        alongside another; that costs a duplicate computation, nothing more.
+        """
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in os.scandir(self.lock_dir):
+            if not entry.name.startswith(f"{self.name}-") or not entry.name.endswith('.lock'):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Removed {removed} stale {self.name} lock files")
+        return removed
+
+    def _open(self, key):
+        return os.open(os.path.join(self.lock_dir, f"{self.name}-{key}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _try_lock(self, fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _check_deadline(self, deadline):
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(self.name, deadline)
+
+    def _read_shared(self, fd, waiting_since):
+        # A result counts only if it was finished while this caller waited;
+        # anything older belongs to an earlier, unrelated flight
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            content = b''
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                content += chunk
+            shared = json.loads(content) if content else None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the shared {self.name} result: {str(e)}")
+            return None
+        if not shared or shared.get('finished_at', 0) < waiting_since:
+            return None
+        return shared
+
+    def _write_shared(self, fd, result):
+        try:
+            content = json.dumps({'finished_at': time.time(), 'result': result}).encode('utf-8')
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, content)
+        except (OSError, TypeError, ValueError) as e:
+            # Waiting processes then run the work themselves
+            logger.warning(f"Could not share the {self.name} result with other processes: {str(e)}")
@@ -1,9 +1,18 @@
 import os
 import sys
+import asyncio
 import logging
-from anthropic import Anthropic
 import json
 import time
+import hashlib
+from services.text_utils import split_source_spans
+from services.keyphrase_extractor import KeyphraseExtractor
+from services.token_budget import TokenBudget
+from services.llm_router import ModelRouter
+from services.deadline import deadline_stage
+from services.scheduler import BULK, get_scheduler
+from services.metrics import SLIDES_PARSE_SECONDS, CACHE_HITS, CACHE_MISSES, ERRORS
+from services.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -17,92 +26,16 @@ logger = logging.getLogger(__name__)
 DEFAULT_MODEL_STR = "claude-sonnet-4-20250514"
 # </important_do_not_delete>
 
-class SlideGenerator:
-    def __init__(self):
-        # Initialize the Anthropic client
-        anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
-        if not anthropic_key:
-            logger.error('ANTHROPIC_API_KEY environment variable must be set')
-            raise ValueError('ANTHROPIC_API_KEY environment variable must be set')
-        
-        self.client = Anthropic(
-            api_key=anthropic_key,
-            timeout=30.0,  # 30 second timeout
-            max_retries=2
-        )
-        self.model = DEFAULT_MODEL_STR
-    
-    def generate_slides(self, transcript):
-        """
-        Generate structured slide content from transcript using Anthropic AI
-        """
-        try:
-            prompt = self._create_slide_generation_prompt(transcript)
-            
-            logger.info("Calling Anthropic API to generate slides...")
-            start_time = time.time()
-            
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2000,  # Reduced for faster response
-                temperature=0.5,  # Lower temperature for more consistent output
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                timeout=20.0  # Individual request timeout
-            )
-            
-            elapsed = time.time() - start_time
-            logger.info(f"Anthropic API responded in {elapsed:.2f} seconds")
-            
-            # Handle different response types from Anthropic API
-            if hasattr(response.content[0], 'text'):
-                content = response.content[0].text
-            else:
-                content = str(response.content[0])
-            
-            # Parse the JSON response
-            slides_data = self._parse_slides_response(content)
-            
-            if not slides_data or len(slides_data) < 5:
-                logger.error("Generated slides do not meet minimum requirement of 5 slides")
-                return None
-            
-            logger.info(f"Successfully generated {len(slides_data)} slides")
-            return slides_data
-            
-        except Exception as e:
-            logger.error(f"Error generating slides with Anthropic: {str(e)}")
-            # Try to provide more specific error messages
-            if "timeout" in str(e).lower():
-                logger.error("API request timed out - transcript might be too long")
-            elif "api_key" in str(e).lower():
-                logger.error("API key issue - please check ANTHROPIC_API_KEY")
-            return None
-    
-    def _create_slide_generation_prompt(self, transcript):
-        """
-        Create a detailed prompt for slide generation
-        """
-        # Truncate very long transcripts to avoid timeouts
-        max_words = 500
-        words = transcript.split()
-        if len(words) > max_words:
-            transcript = ' '.join(words[:max_words]) + '...'
-            logger.warning(f"Truncated transcript from {len(words)} to {max_words} words")
-        
-        return f"""
-Convert this transcript into 5-6 presentation slides with enhanced visual design and organization.
-
-TRANSCRIPT: {transcript}
+# Static instructions for slide generation, sent as a system block ahead of
+# the transcript. At about 530 tokens they are below every model's minimum
+# cacheable prefix, so they are not marked for prompt caching; see
+# prompt_cache_control.
+SLIDE_SYSTEM_PROMPT = """You convert talk transcripts into 5-6 presentation slides with enhanced visual design and organization.
 
 Return JSON with this exact structure:
-{{
+{
   "slides": [
-    {{
+    {
       "slide_number": 1,
       "type": "title",
       "title": "Main Title",
@@ -110,8 +43,8 @@ Return JSON with this exact structure:
       "image_prompt": "Professional image description for title slide",
       "layout": "centered",
       "speaker_notes": "Welcome notes"
-    }},
-    {{
+    },
+    {
       "slide_number": 2,
       "type": "content",
       "title": "Topic",
@@ -119,23 +52,23 @@ Return JSON with this exact structure:
       "image_prompt": "Relevant image description for this topic",
       "layout": "text_with_image",
       "speaker_notes": "Explanation"
-    }},
-    {{
+    },
+    {
       "slide_number": 3,
       "type": "comparison",
       "title": "Comparison Title",
-      "left_column": {{
+      "left_column": {
         "title": "Left Side Title",
         "content": ["Point 1", "Point 2", "Point 3"]
-      }},
-      "right_column": {{
+      },
+      "right_column": {
         "title": "Right Side Title", 
         "content": ["Point 1", "Point 2", "Point 3"]
-      }},
+      },
       "layout": "two_column",
       "speaker_notes": "Compare and contrast"
-    }},
-    {{
+    },
+    {
       "slide_number": 6,
       "type": "ending",
       "title": "Questions?",
@@ -143,9 +76,9 @@ Return JSON with this exact structure:
       "image_prompt": "Professional closing image",
       "layout": "centered",
       "speaker_notes": "Open for questions"
-    }}
+    }
   ]
-}}
+}
 
 SLIDE TYPES & LAYOUTS:
 - "title": Opening slide (layout: "centered")
@@ -162,6 +95,573 @@ LAYOUT GUIDELINES:
 - Use "text_only" for content-heavy slides
 
 Generate 5-6 slides total with appropriate layouts and visual elements. Return only JSON.
+"""
+
+# Smaller model used for short transcripts, where it is fast and good enough
+SMALL_MODEL_STR = "claude-3-5-haiku-20241022"
+
+# Shortest prompt prefix, in tokens, the API will cache for a model family
+MIN_CACHEABLE_TOKENS = {'haiku': 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+# Slide engines: "anthropic" calls Claude and falls back to the local
+# extractive engine if the call fails; "local" never touches the network
+SLIDE_ENGINES = ('anthropic', 'local')
+
+_clients = {}
+_async_clients = {}
+
+# The anthropic package takes over a second to import, so it is loaded
+# when the first client is created rather than when this module is
+
+def get_client(api_key):
+    """
+    Return a shared Anthropic client. Building one takes tens of
+    milliseconds, and the client is safe to share between threads.
+    """
+    if api_key not in _clients:
+        from anthropic import Anthropic
+        _clients[api_key] = Anthropic(
+            api_key=api_key,
+            base_url=os.environ.get('ANTHROPIC_BASE_URL') or None,
+            timeout=30.0,  # 30 second timeout
+            max_retries=2
+        )
+    return _clients[api_key]
+
+def get_async_client(api_key):
+    """
+    Return a shared AsyncAnthropic client, so concurrent async generations
+    reuse one connection pool instead of opening one per request
+    """
+    if api_key not in _async_clients:
+        from anthropic import AsyncAnthropic
+        _async_clients[api_key] = AsyncAnthropic(
+            api_key=api_key,
+            base_url=os.environ.get('ANTHROPIC_BASE_URL') or None,
+            timeout=30.0,
+            max_retries=2
+        )
+    return _async_clients[api_key]
+
+class SlideGenerator:
+    def __init__(self, engine=None, keyphrase_extractor=None, priority=BULK, client_id=None):
+        self.engine = engine or os.environ.get('SLIDE_ENGINE', 'anthropic')
+        if self.engine not in SLIDE_ENGINES:
+            raise ValueError(f"Unknown slide engine: {self.engine}")
+        
+        self.keyphrase_extractor = keyphrase_extractor or KeyphraseExtractor()
+        self._local_generator = None
+        self.local_fallback = os.environ.get('SLIDE_LOCAL_FALLBACK', 'true').lower() != 'false'
+        # Titles come from the local keyphrase extractor unless LLM titles are enabled
+        self.llm_titles = os.environ.get('LLM_TITLES', 'false').lower() == 'true'
+        self.token_budget = TokenBudget(
+            max_input_tokens=int(os.environ.get('SLIDE_MAX_INPUT_TOKENS', 6000))
+        )
+        self.model = DEFAULT_MODEL_STR
+        self.client = None
+        self.router = None
+        # API calls queue for the shared 'anthropic' upstream limit
+        self.priority = priority
+        self.client_id = client_id
+        
+        if self.engine == 'local':
+            return
+        
+        # Initialize the Anthropic client
+        anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
+        if not anthropic_key:
+            logger.error('ANTHROPIC_API_KEY environment variable must be set')
+            raise ValueError('ANTHROPIC_API_KEY environment variable must be set')
+        
+        # ANTHROPIC_BASE_URL points the client at another server, e.g. a local fake
+        self.client = get_client(anthropic_key)
+        
+        # Route short transcripts to a smaller model and hedge slow requests
+        self.router = ModelRouter(
+            self.client,
+            async_client=get_async_client(anthropic_key),
+            default_model=self.model,
+            small_model=os.environ.get('SLIDE_SMALL_MODEL', SMALL_MODEL_STR) or None,
+            small_input_tokens=int(os.environ.get('SLIDE_SMALL_MODEL_MAX_TOKENS', 400)),
+            hedge_percentile=float(os.environ.get('SLIDE_HEDGE_PERCENTILE', 95)),
+            scheduler=get_scheduler()
+        )
+    
+    @property
+    def local_generator(self):
+        # The extractive engine needs numpy, so it is loaded on first use
+        if self._local_generator is None:
+            from services.extractive_generator import ExtractiveSlideGenerator
+            self._local_generator = ExtractiveSlideGenerator(keyphrase_extractor=self.keyphrase_extractor)
+        return self._local_generator
+    
+    def generate_slides(self, transcript, outline=None, deadline=None):
+        """
+        Generate structured slide content from transcript using the
+        configured engine. An optional outline of section headings, built
+        while the transcript was being drafted, guides the slide structure.
+        With a deadline, the API request gets only the remaining budget and
+        DeadlineExceeded is raised instead of falling back once it runs out.
+        """
+        with deadline_stage(deadline, 'slides'), span('slides.generate', engine=self.engine) as slides_span:
+            slides = self._generate_slides(transcript, outline, deadline)
+            slides_span.set_attribute('slides', len(slides or ()))
+            return slides
+    
+    def _generate_slides(self, transcript, outline=None, deadline=None):
+        if self.engine == 'local':
+            return self.generate_local_slides(transcript)
+        
+        slides = self._generate_slides_with_anthropic(transcript, outline, deadline)
+        if deadline:
+            deadline.check('slides')
+        if not slides and self.local_fallback:
+            logger.warning("Falling back to local slide generation")
+            slides = self.generate_local_slides(transcript)
+        return slides
+    
+    def generate_local_slides(self, transcript):
+        """
+        Generate slides with the offline extractive engine
+        """
+        try:
+            with span('slides.local'):
+                slides = self.local_generator.generate_slides(transcript)
+            for i, slide in enumerate(slides):
+                if not self._normalize_slide(slide, i):
+                    return None
+            return slides or None
+        except Exception as e:
+            logger.error(f"Error generating slides locally: {str(e)}")
+            return None
+    
+    def _generate_slides_with_anthropic(self, transcript, outline=None, deadline=None):
+        """
+        Generate structured slide content from transcript using Anthropic AI
+        """
+        try:
+            input_tokens, request = self._slide_generation_request(transcript, outline, deadline)
+            start_time = time.time()
+            response = self.router.create(input_tokens, **request)
+            return self._slides_from_response(response, start_time)
+        except Exception as e:
+            self._log_generation_error(e)
+            return None
+    
+    async def generate_slides_async(self, transcript, outline=None, deadline=None):
+        """
+        Async version of generate_slides for the ASGI request path. The API
+        call awaits AsyncAnthropic, so one process can hold many generations
+        in flight; the local engine runs in a thread.
+        """
+        with deadline_stage(deadline, 'slides'), span('slides.generate', engine=self.engine):
+            if self.engine == 'local':
+                return await asyncio.to_thread(self.generate_local_slides, transcript)
+            
+            slides = None
+            try:
+                input_tokens, request = self._slide_generation_request(transcript, outline, deadline)
+                start_time = time.time()
+                response = await self.router.create_async(input_tokens, **request)
+                slides = self._slides_from_response(response, start_time)
+            except Exception as e:
+                self._log_generation_error(e)
+            
+            if deadline:
+                deadline.check('slides')
+            if not slides and self.local_fallback:
+                logger.warning("Falling back to local slide generation")
+                slides = await asyncio.to_thread(self.generate_local_slides, transcript)
+            return slides
+    
+    def _slide_generation_request(self, transcript, outline=None, deadline=None):
+        """
+        Return the input size used for routing and the messages.create
+        arguments for generating a deck
+        """
+        prompt = self._create_slide_generation_prompt(transcript, outline)
+        prompt_tokens = self.token_budget.estimate_tokens(SLIDE_SYSTEM_PROMPT + prompt)
+        max_tokens = self.token_budget.output_tokens(prompt_tokens)
+        input_tokens = self.token_budget.estimate_tokens(transcript)
+        
+        system_block = {"type": "text", "text": SLIDE_SYSTEM_PROMPT}
+        cache_control = self.prompt_cache_control(self.router.choose_model(input_tokens), SLIDE_SYSTEM_PROMPT)
+        if cache_control:
+            system_block["cache_control"] = cache_control
+        
+        logger.info(f"Calling Anthropic API to generate slides (~{prompt_tokens} input tokens, max_tokens={max_tokens})...")
+        return input_tokens, dict(
+            max_tokens=max_tokens,
+            temperature=0.5,  # Lower temperature for more consistent output
+            system=[system_block],
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            **self._request_options(deadline, 20.0)  # Individual request timeout
+        )
+    
+    def prompt_cache_control(self, model, prefix):
+        """
+        Return the cache marker for a prompt prefix, or None when the prefix
+        is shorter than the model will cache. The API ignores markers on
+        shorter prefixes, so sending one would only suggest caching that
+        never happens.
+        """
+        minimum = next(
+            (tokens for family, tokens in MIN_CACHEABLE_TOKENS.items() if family in model),
+            DEFAULT_MIN_CACHEABLE_TOKENS
+        )
+        if self.token_budget.estimate_tokens(prefix) < minimum:
+            return None
+        return {"type": "ephemeral"}
+    
+    def _slides_from_response(self, response, start_time):
+        elapsed = time.time() - start_time
+        logger.info(f"Anthropic API ({response.model}) responded in {elapsed:.2f} seconds")
+        self._log_usage(response)
+        
+        # Handle different response types from Anthropic API
+        if hasattr(response.content[0], 'text'):
+            content = response.content[0].text
+        else:
+            content = str(response.content[0])
+        
+        # Parse the JSON response
+        with SLIDES_PARSE_SECONDS.time(), span('slides.parse', characters=len(content)) as parse_span:
+            slides_data = self._parse_slides_response(content)
+            parse_span.set_attribute('slides', len(slides_data or ()))
+        
+        if not slides_data or len(slides_data) < 5:
+            logger.error("Generated slides do not meet minimum requirement of 5 slides")
+            ERRORS.inc(stage='parse')
+            return None
+        
+        logger.info(f"Successfully generated {len(slides_data)} slides")
+        return slides_data
+    
+    def _log_generation_error(self, e):
+        logger.error(f"Error generating slides with Anthropic: {str(e)}")
+        ERRORS.inc(stage='slides')
+        # Try to provide more specific error messages
+        if "timeout" in str(e).lower():
+            logger.error("API request timed out - transcript might be too long")
+        elif "api_key" in str(e).lower():
+            logger.error("API key issue - please check ANTHROPIC_API_KEY")
+    
+    def _request_options(self, deadline, timeout):
+        """
+        Return the timeout, retry and scheduling options for one API
+        request. Under a deadline the request gets at most the remaining
+        budget and is not retried, since a retry could only finish after
+        the deadline.
+        """
+        options = {'timeout': timeout, 'priority': self.priority, 'client_id': self.client_id}
+        if deadline:
+            options.update(timeout=deadline.timeout(timeout), max_retries=0)
+        return options
+    
+    def _log_usage(self, response):
+        """
+        Log input, output and cached token counts for a response
+        """
+        usage = getattr(response, 'usage', None)
+        if not usage:
+            return
+        # Only counted once a prefix is long enough to carry a cache marker:
+        # read on a hit, written on a miss
+        if getattr(usage, 'cache_read_input_tokens', 0):
+            CACHE_HITS.inc(cache='prompt')
+        elif getattr(usage, 'cache_creation_input_tokens', 0):
+            CACHE_MISSES.inc(cache='prompt')
+        logger.info(
+            f"Token usage: input={getattr(usage, 'input_tokens', 0)} "
+            f"output={getattr(usage, 'output_tokens', 0)} "
+            f"cache_read={getattr(usage, 'cache_read_input_tokens', 0) or 0} "
+            f"cache_write={getattr(usage, 'cache_creation_input_tokens', 0) or 0}"
+        )
+    
+    def regenerate_slide(self, transcript, slides, index, instructions=None):
+        """
+        Regenerate a single slide from the part of the transcript it covers,
+        without touching the rest of the deck
+        """
+        if self.engine == 'local':
+            return self._regenerate_slide_locally(transcript, slides, index)
+        
+        new_slide = self._regenerate_slide_with_anthropic(transcript, slides, index, instructions)
+        if not new_slide and self.local_fallback:
+            logger.warning("Falling back to local slide regeneration")
+            new_slide = self._regenerate_slide_locally(transcript, slides, index)
+        return new_slide
+    
+    def _regenerate_slide_locally(self, transcript, slides, index):
+        slide = slides[index]
+        if slide.get('type') in ('title', 'ending'):
+            # Nothing to extract for these; keep the slide as it is
+            return dict(slide)
+        
+        heading, bullets = self.local_generator.summarize_span(
+            self._transcript_span_for_slide(transcript, slides, index)
+        )
+        if not bullets:
+            return None
+        
+        new_slide = {
+            'slide_number': slide.get('slide_number', index + 1),
+            'type': 'content',
+            'title': heading,
+            'content': bullets,
+            'image_prompt': heading.lower(),
+            'layout': 'text_with_image',
+            'speaker_notes': slide.get('speaker_notes', ''),
+        }
+        if 'source_hashes' in slide:
+            new_slide['source_hashes'] = slide['source_hashes']
+        self._normalize_slide(new_slide, index)
+        return new_slide
+    
+    def _regenerate_slide_with_anthropic(self, transcript, slides, index, instructions=None):
+        try:
+            slide = slides[index]
+            prompt = self._create_slide_regeneration_prompt(transcript, slides, index, instructions)
+
+            logger.info(f"Calling Anthropic API to regenerate slide {index + 1}...")
+            start_time = time.time()
+
+            response = self.router.create(
+                self.token_budget.estimate_tokens(prompt),
+                max_tokens=500,  # A single slide needs far less than a deck
+                temperature=0.5,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                **self._request_options(None, 20.0)
+            )
+
+            elapsed = time.time() - start_time
+            logger.info(f"Anthropic API responded in {elapsed:.2f} seconds")
+            self._log_usage(response)
+
+            content = response.content[0].text if hasattr(response.content[0], 'text') else str(response.content[0])
+            start_idx = content.find('{')
+            end_idx = content.rfind('}') + 1
+            if start_idx == -1 or end_idx == 0:
+                logger.error("No JSON found in Anthropic response")
+                return None
+
+            new_slide = json.loads(content[start_idx:end_idx])
+            new_slide = new_slide.get('slide', new_slide)
+
+            # The slide keeps its place, role and source span in the deck
+            new_slide['slide_number'] = slide.get('slide_number', index + 1)
+            new_slide['type'] = slide.get('type', new_slide.get('type'))
+            if 'source_hashes' in slide:
+                new_slide['source_hashes'] = slide['source_hashes']
+            if not self._normalize_slide(new_slide, index):
+                return None
+
+            return new_slide
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse regenerated slide: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error regenerating slide with Anthropic: {str(e)}")
+            return None
+
+    def assign_source_spans(self, transcript, slides):
+        """
+        Record which transcript sentences each body slide was built from.
+
+        Body slides (everything but title and ending slides) split the
+        transcript's sentences evenly and in order. Each slide stores the
+        hashes of its sentences as ``source_hashes`` so later transcript
+        edits can be traced back to the slides they affect.
+        """
+        hashes = [self._sentence_hash(sentence) for sentence in split_source_spans(transcript)]
+        body = self._body_slide_indices(slides)
+        if not body:
+            return slides
+
+        for position, index in enumerate(body):
+            start = position * len(hashes) // len(body)
+            end = (position + 1) * len(hashes) // len(body)
+            slides[index]['source_hashes'] = hashes[start:end]
+        return slides
+
+    def update_slides_for_transcript(self, old_transcript, new_transcript, slides):
+        """
+        Bring slides in line with an edited transcript by regenerating only
+        the slides whose source sentences changed.
+
+        Returns the updated slides, the indices that were regenerated and the
+        indices of slides whose source sentences were all deleted (kept as
+        they were, for the user to remove), or ``(None, None, None)`` when
+        the edit is too large for a partial update and the deck should be
+        regenerated in full.
+        """
+        body = self._body_slide_indices(slides)
+        if not body:
+            return None, None, None
+
+        # Slides saved before spans were tracked are mapped against the old text
+        if any('source_hashes' not in slides[i] for i in body):
+            self.assign_source_spans(old_transcript, slides)
+
+        new_hashes = [self._sentence_hash(sentence) for sentence in split_source_spans(new_transcript)]
+
+        # Sentences that survived the edit stay with the slide that owned them
+        owner = [None] * len(new_hashes)
+        positions = {}
+        for i, sentence_hash in enumerate(new_hashes):
+            positions.setdefault(sentence_hash, []).append(i)
+        for index in body:
+            for sentence_hash in slides[index]['source_hashes']:
+                for i in positions.get(sentence_hash, []):
+                    if owner[i] is None:
+                        owner[i] = index
+                        break
+
+        if all(o is None for o in owner):
+            return None, None, None
+
+        # New or edited sentences go to a neighbouring slide, preferring the
+        # one that lost sentences since that is most likely where the edit was
+        matched = {index: owner.count(index) for index in body}
+        lost = {index for index in body if matched[index] < len(slides[index]['source_hashes'])}
+        known = [i for i in range(len(owner)) if owner[i] is not None]
+        for i in range(len(owner)):
+            if owner[i] is not None:
+                continue
+            before = [owner[k] for k in known if k < i]
+            after = [owner[k] for k in known if k > i]
+            previous = before[-1] if before else None
+            following = after[0] if after else None
+            if previous is None or (following in lost and previous not in lost):
+                owner[i] = following
+            else:
+                owner[i] = previous
+
+        changed = []
+        for index in body:
+            assigned = [new_hashes[i] for i in range(len(owner)) if owner[i] == index]
+            if assigned != slides[index]['source_hashes']:
+                slides[index]['source_hashes'] = assigned
+                changed.append(index)
+
+        if len(changed) * 2 > len(body):
+            logger.info(f"{len(changed)} of {len(body)} slides affected by transcript edit, regenerating deck")
+            return None, None, None
+
+        regenerated, removed = [], []
+        for index in changed:
+            if not slides[index]['source_hashes']:
+                # Everything this slide covered was deleted; leave it for the user
+                removed.append(index)
+                continue
+            new_slide = self.regenerate_slide(new_transcript, slides, index)
+            if not new_slide:
+                return None, None, None
+            slides[index] = new_slide
+            regenerated.append(index)
+
+        logger.info(
+            f"Transcript edit regenerated {len(regenerated)} slide(s), left {len(removed)} without source text, "
+            f"reused {len(body) - len(changed)}"
+        )
+        return slides, regenerated, removed
+
+    def _body_slide_indices(self, slides):
+        return [i for i, slide in enumerate(slides) if slide.get('type') not in ('title', 'ending')]
+
+    def _sentence_hash(self, sentence):
+        normalized = ' '.join(sentence.lower().split())
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+    def _transcript_span_for_slide(self, transcript, slides, index):
+        """
+        Return the portion of the transcript a slide covers, using its
+        recorded source sentences when available. Otherwise body slides split
+        the transcript evenly in order, and title and ending slides cover the
+        opening and closing sections.
+        """
+        slide = slides[index]
+        if slide.get('source_hashes'):
+            wanted = set(slide['source_hashes'])
+            span = [s for s in split_source_spans(transcript) if self._sentence_hash(s) in wanted]
+            if span:
+                return ' '.join(span)
+
+        words = transcript.split()
+        body = self._body_slide_indices(slides)
+        if not body or not words:
+            return transcript
+
+        if index in body:
+            position = body.index(index)
+        elif index < body[0]:
+            position = 0
+        else:
+            position = len(body) - 1
+
+        size = max(1, -(-len(words) // len(body)))
+        return ' '.join(words[position * size:(position + 1) * size])
+
+    def _create_slide_regeneration_prompt(self, transcript, slides, index, instructions=None):
+        """
+        Create a compact prompt for regenerating one slide
+        """
+        slide = slides[index]
+        span = self._transcript_span_for_slide(transcript, slides, index)
+        previous_title = slides[index - 1].get('title', '') if index > 0 else '(none)'
+        next_title = slides[index + 1].get('title', '') if index + 1 < len(slides) else '(none)'
+        extra = f"\nUSER REQUEST: {instructions}" if instructions else ''
+
+        return f"""
+Rewrite slide {index + 1} of a presentation. Return only JSON for this one slide.
+
+TRANSCRIPT EXCERPT: {span}
+
+PREVIOUS SLIDE: {previous_title}
+NEXT SLIDE: {next_title}
+CURRENT SLIDE: {json.dumps({k: v for k, v in slide.items() if k not in ('svg_icon', 'source_hashes')})}{extra}
+
+Keep "type": "{slide.get('type', 'content')}". Use the same fields as the current slide:
+"title", "subtitle" or "content" (3-5 bullet strings) or "left_column"/"right_column"
+({{"title", "content"}}), "image_prompt", "layout", "speaker_notes".
+"""
+
+    def _create_slide_generation_prompt(self, transcript, outline=None):
+        """
+        Create the per-request part of the slide generation prompt. The
+        schema and guidelines live in SLIDE_SYSTEM_PROMPT.
+        """
+        # Fit the transcript to the input budget left after the instructions
+        reserved = self.token_budget.estimate_tokens(SLIDE_SYSTEM_PROMPT)
+        transcript = self.token_budget.fit_transcript(transcript, reserved_tokens=reserved)
+        
+        outline_text = ''
+        if outline:
+            # The outline covers the whole talk, including any truncated part
+            sections = '\n'.join(
+                f"- {section['heading']} ({section['word_count']} words)"
+                for section in outline if section.get('heading')
+            )
+            outline_text = f"\nOUTLINE OF THE FULL TALK (use it to structure the slides):\n{sections}\n"
+        
+        return f"""
+Convert this transcript into 5-6 presentation slides.
+
+TRANSCRIPT: {transcript}
+{outline_text}
+Return only JSON.
 """
     
     def _parse_slides_response(self, content):
@@ -187,46 +687,8 @@ Generate 5-6 slides total with appropriate layouts and visual elements. Return o
             # Validate slide structure and auto-detect ending slides
             slides = slides_data['slides']
             for i, slide in enumerate(slides):
-                if 'title' not in slide:
-                    logger.error(f"Slide {i+1} missing title")
+                if not self._normalize_slide(slide, i):
                     return None
-                if 'speaker_notes' not in slide:
-                    slide['speaker_notes'] = ""
-                if 'slide_number' not in slide:
-                    slide['slide_number'] = i + 1
-                if 'type' not in slide:
-                    # Auto-detect slide type based on content
-                    title = slide.get('title', '').lower()
-                    if i == 0:
-                        slide['type'] = 'title'
-                    elif self._is_ending_slide(title):
-                        slide['type'] = 'ending'
-                    else:
-                        slide['type'] = 'content'
-                elif slide['type'] not in ['title', 'content', 'ending', 'comparison']:
-                    # Fix any invalid types
-                    title = slide.get('title', '').lower()
-                    if i == 0:
-                        slide['type'] = 'title'
-                    elif self._is_ending_slide(title):
-                        slide['type'] = 'ending'
-                    else:
-                        slide['type'] = 'content'
-                
-                # Set default layout if not provided
-                if 'layout' not in slide:
-                    if slide['type'] in ['title', 'ending']:
-                        slide['layout'] = 'centered'
-                    elif slide['type'] == 'comparison':
-                        slide['layout'] = 'two_column'
-                    else:
-                        slide['layout'] = 'text_only'
-                
-                # Generate SVG icon if image_prompt is provided
-                if 'image_prompt' in slide and slide['image_prompt']:
-                    slide['svg_icon'] = self._generate_svg_icon(slide['image_prompt'])
-                else:
-                    slide['svg_icon'] = None
             
             return slides
             
@@ -237,6 +699,53 @@ Generate 5-6 slides total with appropriate layouts and visual elements. Return o
             logger.error(f"Error parsing slides response: {str(e)}")
             return None
     
+    def _normalize_slide(self, slide, index):
+        """
+        Validate a single slide in place, filling in defaults for missing fields
+        """
+        if 'title' not in slide:
+            logger.error(f"Slide {index+1} missing title")
+            return False
+        if 'speaker_notes' not in slide:
+            slide['speaker_notes'] = ""
+        if 'slide_number' not in slide:
+            slide['slide_number'] = index + 1
+        if 'type' not in slide:
+            # Auto-detect slide type based on content
+            title = slide.get('title', '').lower()
+            if index == 0:
+                slide['type'] = 'title'
+            elif self._is_ending_slide(title):
+                slide['type'] = 'ending'
+            else:
+                slide['type'] = 'content'
+        elif slide['type'] not in ['title', 'content', 'ending', 'comparison']:
+            # Fix any invalid types
+            title = slide.get('title', '').lower()
+            if index == 0:
+                slide['type'] = 'title'
+            elif self._is_ending_slide(title):
+                slide['type'] = 'ending'
+            else:
+                slide['type'] = 'content'
+
+        # Set default layout if not provided
+        if 'layout' not in slide:
+            if slide['type'] in ['title', 'ending']:
+                slide['layout'] = 'centered'
+            elif slide['type'] == 'comparison':
+                slide['layout'] = 'two_column'
+            else:
+                slide['layout'] = 'text_only'
+
+        # Generate SVG icon if image_prompt is provided
+        if 'image_prompt' in slide and slide['image_prompt']:
+            slide['svg_icon'] = self._generate_svg_icon(slide['image_prompt'])
+        else:
+            slide['svg_icon'] = None
+
+        return True
+    
     def _is_ending_slide(self, title):
         """
         Determine if a slide title indicates an ending slide
@@ -330,19 +839,28 @@ Generate 5-6 slides total with appropriate layouts and visual elements. Return o
                 <rect x="25" y="67" width="35" height="3" fill="#FFF"/>
             </svg>'''
     
-    def generate_presentation_title(self, transcript):
+    def generate_presentation_title(self, transcript, deadline=None):
         """
         Generate a meaningful presentation title based on the transcript content
         """
+        with deadline_stage(deadline, 'title'), span('slides.title', engine=self.engine):
+            return self._generate_presentation_title(transcript, deadline)
+    
+    def _generate_presentation_title(self, transcript, deadline=None):
+        # Truncate transcript for title generation
+        max_words = 100
+        words = transcript.split()
+        if len(words) > max_words:
+            transcript_excerpt = ' '.join(words[:max_words])
+        else:
+            transcript_excerpt = transcript
+        
+        if self.client is None or not self.llm_titles:
+            title = self._generate_local_title(transcript_excerpt)
+            logger.info(f"Generated presentation title locally: {title}")
+            return title
+        
         try:
-            # Truncate transcript for title generation
-            max_words = 100
-            words = transcript.split()
-            if len(words) > max_words:
-                transcript_excerpt = ' '.join(words[:max_words])
-            else:
-                transcript_excerpt = transcript
-            
             prompt = f"""
             Based on this transcript excerpt, create a concise, professional presentation title (maximum 6 words):
 
@@ -357,14 +875,15 @@ Generate 5-6 slides total with appropriate layouts and visual elements. Return o
             Return only the title, nothing else.
             """
             
-            response = self.client.messages.create(
-                model=self.model,
+            response = self.router.create(
+                self.token_budget.estimate_tokens(prompt),
                 max_tokens=50,
                 temperature=0.3,
                 messages=[{
                     "role": "user",
                     "content": prompt
-                }]
+                }],
+                **self._request_options(deadline, 30.0)
             )
             
             title = response.content[0].text.strip()
@@ -373,32 +892,17 @@ Generate 5-6 slides total with appropriate layouts and visual elements. Return o
             
             # Fallback if title is too long or generic
             if len(title.split()) > 6 or any(word in title.lower() for word in ['presentation', 'slideshow', 'slides']):
-                # Extract key topics from transcript
-                key_words = self._extract_key_topics(transcript_excerpt)
-                if key_words:
-                    title = ' '.join(key_words[:3]).title()
-                else:
-                    title = "Voice Recording Presentation"
+                title = self._generate_local_title(transcript_excerpt)
             
             logger.info(f"Generated presentation title: {title}")
             return title
             
         except Exception as e:
             logger.error(f"Error generating presentation title: {str(e)}")
-            return "Voice Recording Presentation"
+            return self._generate_local_title(transcript_excerpt)
     
-    def _extract_key_topics(self, text):
+    def _generate_local_title(self, text):
         """
-        Extract key topics from text as a fallback for title generation
+        Build a title from the transcript's keyphrases without calling the API
         """
-        # Simple keyword extraction - look for common important words
-        words = text.lower().split()
-        
-        # Filter out common words
-        stop_words = {'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those', 'a', 'an'}
-        
-        # Get meaningful words
-        meaningful_words = [word for word in words if len(word) > 3 and word not in stop_words]
-        
-        # Return first few meaningful words
-        return meaningful_words[:3] if meaningful_words else []
+        return self.keyphrase_extractor.generate_title(text) or "Voice Recording Presentation"
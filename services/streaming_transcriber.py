@@ -0,0 +1,221 @@
+import shutil
+import logging
+import threading
+import subprocess
+from array import array
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ENCODINGS = {'pcm', 'opus'}
+
+# Sample rates accepted from clients, from narrowband telephony to 48 kHz
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+# Decoded PCM held for the transcriber at most, in seconds of audio; it is
+# normally taken after every frame, so this only bounds a stalled session
+MAX_PENDING_SECONDS = 60
+
+class ContainerDecoder:
+    """
+    Decode a WebM/Ogg Opus stream to PCM through one ffmpeg process per
+    session. Encoded bytes are written to ffmpeg's stdin as they arrive and
+    a reader thread collects the PCM it produces, so every byte is decoded
+    once and only PCM not yet taken by ``read`` is kept in memory.
+    """
+
+    def __init__(self, sample_rate, sample_width=2):
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg:
+            raise RuntimeError('ffmpeg is needed to decode Opus streams')
+        self.max_pending_bytes = MAX_PENDING_SECONDS * sample_rate * sample_width
+        self.dropped_bytes = 0
+        self.process = subprocess.Popen(
+            [
+                ffmpeg, '-hide_banner', '-loglevel', 'error',
+                # Start decoding after the first few KB rather than probing megabytes
+                '-probesize', '32768', '-analyzeduration', '0', '-fflags', 'nobuffer',
+                '-i', 'pipe:0',
+                '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_output, daemon=True, name='opus-decoder')
+        self._reader.start()
+
+    def write(self, data):
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            raise RuntimeError('The audio decoder stopped; the stream is probably not valid Opus')
+
+    def read(self):
+        """
+        Return the PCM decoded since the last call
+        """
+        with self._lock:
+            pcm = bytes(self._pcm)
+            self._pcm.clear()
+        return pcm
+
+    def close(self, timeout=10):
+        """
+        End the input, wait for ffmpeg to decode what it has and return the
+        remaining PCM
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning('Audio decoder did not finish in time, stopping it')
+            self.process.kill()
+            self.process.wait()
+        self._reader.join(timeout)
+        if self.dropped_bytes:
+            logger.warning(f"Dropped {self.dropped_bytes} bytes of decoded audio that were not read in time")
+        return self.read()
+
+    def _read_output(self):
+        while True:
+            chunk = self.process.stdout.read1(65536)
+            if not chunk:
+                break
+            with self._lock:
+                self._pcm.extend(chunk)
+                overflow = len(self._pcm) - self.max_pending_bytes
+                if overflow > 0:
+                    # Keep whole samples when trimming
+                    overflow += overflow % 2
+                    del self._pcm[:overflow]
+                    self.dropped_bytes += overflow
+
+class StreamingTranscriber:
+    """
+    Incrementally transcribe a live audio stream.
+
+    Audio arrives as small frames, either raw 16-bit little-endian mono PCM or
+    an Opus stream in a WebM/Ogg container as produced by MediaRecorder. PCM is
+    buffered until a segment is long enough, then cut at the quietest point
+    near its end so words are not split, and handed to the AudioProcessor
+    backend. The recognized text accumulates in a rolling transcript.
+    """
+
+    def __init__(self, audio_processor, encoding='pcm', sample_rate=16000,
+                 segment_seconds=5.0, max_segment_seconds=15.0):
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"Unsupported audio encoding: {encoding}")
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, int) \
+                or not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Sample rate must be an integer from {MIN_SAMPLE_RATE} to {MAX_SAMPLE_RATE}")
+
+        self.audio_processor = audio_processor
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.segment_bytes = int(segment_seconds * sample_rate) * self.sample_width
+        self.max_segment_bytes = int(max_segment_seconds * sample_rate) * self.sample_width
+        self.segments = []
+
+        self._pcm_buffer = bytearray()
+        # Started with the first frame, so a session that sends none costs no process
+        self._decoder = None
+
+    @property
+    def transcript(self):
+        return ' '.join(segment for segment in self.segments if segment)
+
+    def feed(self, frame):
+        """
+        Add a frame of audio and return any newly recognized text segments
+        """
+        if self.encoding == 'opus':
+            if self._decoder is None:
+                self._decoder = ContainerDecoder(self.sample_rate, self.sample_width)
+            self._decoder.write(frame)
+            pcm = self._decoder.read()
+        else:
+            pcm = frame
+
+        self._pcm_buffer.extend(pcm)
+
+        new_segments = []
+        while len(self._pcm_buffer) >= self.segment_bytes:
+            cut = self._find_cut_point()
+            segment = bytes(self._pcm_buffer[:cut])
+            del self._pcm_buffer[:cut]
+
+            text = self._transcribe_segment(segment)
+            if text:
+                new_segments.append(text)
+
+        return new_segments
+
+    def finish(self):
+        """
+        Transcribe any buffered audio and return the complete transcript
+        """
+        if self._decoder is not None:
+            self._pcm_buffer.extend(self._decoder.close())
+            self._decoder = None
+
+        if self._pcm_buffer:
+            self._transcribe_segment(bytes(self._pcm_buffer))
+            self._pcm_buffer.clear()
+
+        return self.transcript
+
+    def close(self):
+        """
+        Stop decoding without transcribing what is left, for streams that
+        end early
+        """
+        if self._decoder is not None:
+            self._decoder.process.kill()
+            self._decoder.close()
+            self._decoder = None
+
+    def _transcribe_segment(self, segment):
+        # Segments shorter than a quarter second are noise for the recognizer
+        if len(segment) < self.sample_rate // 4 * self.sample_width:
+            return ''
+        import speech_recognition as sr
+        try:
+            text = self.audio_processor.transcribe_pcm(segment, self.sample_rate, self.sample_width)
+        except sr.RequestError as e:
+            logger.error(f"Streaming recognition request failed: {e}")
+            text = ''
+
+        self.segments.append(text)
+        return text
+
+    def _find_cut_point(self):
+        """
+        Return the byte offset of the quietest 20 ms window in the last
+        40% of the buffer, or the maximum segment length if it is exceeded
+        """
+        limit = min(len(self._pcm_buffer), self.max_segment_bytes)
+        window = int(self.sample_rate * 0.02) * self.sample_width
+        start = int(limit * 0.6) // window * window
+
+        samples = array('h')
+        samples.frombytes(bytes(self._pcm_buffer[start:limit - (limit - start) % window]))
+        if not samples:
+            return limit
+
+        per_window = window // self.sample_width
+        best_offset, best_energy = limit, None
+        for i in range(0, len(samples) - per_window + 1, per_window):
+            energy = sum(abs(s) for s in samples[i:i + per_window])
+            if best_energy is None or energy < best_energy:
+                best_energy = energy
+                best_offset = start + (i + per_window // 2) * self.sample_width
+
+        return best_offset
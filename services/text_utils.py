@@ -0,0 +1,84 @@
+import re
+import zlib
+
+# Precomputed stop words: English function words, auxiliaries and the
+# fillers that show up in speech transcripts
+STOP_WORDS = frozenset("""
+a about above across actually after again against ago all almost along already also although
+always am among an and another any anybody anyone anything anyway anywhere are around as ask
+asked at away back basically be became because become becomes been before began behind being
+below beside besides best better between beyond both bring but by came can cannot certainly
+come comes could did do does doing done down during each either else enough especially etc even
+ever every everybody everyone everything exactly example far few first for from further gave
+get gets getting give given gives go goes going gone gonna good got gotta great had has have
+having he hello her here hers herself hey hi him himself his how however i if im in indeed
+instead into is it its itself just keep kind know known last least less let lets like likely
+little look looking lot lots made make makes making many may maybe me mean means meanwhile might
+mine more moreover most mostly much must my myself namely need needs neither never nevertheless
+new next no nobody none nor not nothing now nowhere of off often oh ok okay on once one ones
+only onto or other others otherwise ought our ours ourselves out over own perhaps please pretty
+probably put quite rather really right said same saw say saying says second see seem seemed
+seems seen several shall she should show since so some somebody someone something sometimes
+somewhat somewhere soon sort start still such sure take talk talked talking tell than thank
+thanks that thats the their theirs them themselves then there therefore these they thing things
+think this those though thought through thus today together told too took toward towards try
+trying two uh um under unless until up upon us use used uses using usually very via want wanted
+wants was way ways we well went were what whatever when whenever where whereas wherever whether
+welcome which while who whoever whole whom whose why will with within without wonder would yeah
+yes yet
+you your yours yourself yourselves
+""".split())
+
+WORD_PATTERN = re.compile(r"[a-z][a-z'\-]*[a-z]|[a-z]")
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+
+def content_words(text):
+    """
+    Return the tokens of a text that are not stop words
+    """
+    return [word for word in tokenize(text) if word not in STOP_WORDS and len(word) > 2]
+
+
+def split_sentences(text, max_words=30):
+    """
+    Split text into sentences.
+
+    Speech transcripts often carry no punctuation at all, so runs longer than
+    ``max_words`` are broken into pseudo-sentences of that many words.
+    """
+    sentences = []
+    for piece in SENTENCE_BOUNDARY.split(text.strip()):
+        words = piece.split()
+        for i in range(0, len(words), max_words):
+            sentences.append(' '.join(words[i:i + max_words]))
+    return [sentence for sentence in sentences if sentence]
+
+
+def split_source_spans(text, target_words=20, min_words=8, max_words=40):
+    """
+    Split text into short spans that stay stable when the text is edited.
+
+    Sentences are used where the text is punctuated. Unpunctuated runs are
+    cut after words whose hash hits a fixed residue, so boundaries depend
+    only on nearby words and an edit only changes the spans around it.
+    """
+    spans = []
+    for piece in SENTENCE_BOUNDARY.split(text.strip()):
+        current = []
+        for word in piece.split():
+            current.append(word)
+            at_boundary = zlib.crc32(word.lower().encode('utf-8')) % target_words == 0
+            if len(current) >= max_words or (len(current) >= min_words and at_boundary):
+                spans.append(' '.join(current))
+                current = []
+        if current:
+            spans.append(' '.join(current))
+    return spans
@@ -0,0 +1,52 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBudget:
+    """
+    Size the transcript portion and ``max_tokens`` of a generation request
+    from its actual input instead of fixed limits.
+
+    Token counts are estimated at four characters per token, which is close
+    for English prose and needs no extra request to the API. The input
+    budget keeps requests well inside the latency the request timeout
+    allows; the output budget grows with the transcript, because longer
+    talks produce fuller bullets and speaker notes.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, max_input_tokens=6000, min_output_tokens=1200,
+                 max_output_tokens=3000, output_per_input=0.25, base_output_tokens=900):
+        self.max_input_tokens = max_input_tokens
+        self.min_output_tokens = min_output_tokens
+        self.max_output_tokens = max_output_tokens
+        self.output_per_input = output_per_input
+        self.base_output_tokens = base_output_tokens
+
+    def estimate_tokens(self, text):
+        return -(-len(text) // self.CHARS_PER_TOKEN)
+
+    def fit_transcript(self, transcript, reserved_tokens=0):
+        """
+        Return the transcript cut at a word boundary to fit the input budget
+        left after ``reserved_tokens`` of instructions
+        """
+        available = max(self.max_input_tokens - reserved_tokens, 0)
+        if self.estimate_tokens(transcript) <= available:
+            return transcript
+
+        limit = available * self.CHARS_PER_TOKEN
+        cut = transcript.rfind(' ', 0, limit)
+        fitted = transcript[:cut if cut > 0 else limit] + '...'
+        logger.warning(
+            f"Truncated transcript from ~{self.estimate_tokens(transcript)} to ~{available} tokens"
+        )
+        return fitted
+
+    def output_tokens(self, prompt_tokens):
+        """
+        Return ``max_tokens`` for a response to a prompt of the given size
+        """
+        wanted = self.base_output_tokens + int(prompt_tokens * self.output_per_input)
+        return max(self.min_output_tokens, min(self.max_output_tokens, wanted))
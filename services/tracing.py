@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import queue
+import logging
+import secrets
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """
+    One timed operation in a trace. Spans started while another is current
+    in the same context become its children.
+    """
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def context(self):
+        """
+        Return what a background job needs to continue this trace
+        """
+        return {'trace_id': self.trace_id, 'span_id': self.span_id}
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+class _NoopSpan:
+    """
+    Stands in for a span when tracing is off, so call sites need no checks
+    """
+    trace_id = span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def context(self):
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """
+    Create spans and hand finished ones to an exporter. Without an exporter
+    every span is the shared no-op span.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def span(self, name, parent=None, **attributes):
+        """
+        Time a block as a span. ``parent`` is a context from Span.context(),
+        used to continue a trace started in another process.
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        return self._span(name, parent, attributes)
+
+    @contextmanager
+    def _span(self, name, parent, attributes):
+        current = _current_span.get()
+        if parent:
+            span = Span(name, parent['trace_id'], parent['span_id'], attributes)
+        elif current:
+            span = Span(name, current.trace_id, current.span_id, attributes)
+        else:
+            span = Span(name, secrets.token_hex(16), None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"[:500]
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._export(span)
+
+    def start(self, name, **attributes):
+        """
+        Start a span that is ended with ``end``, for code where one block
+        cannot contain it (such as request hooks). Returns None when off.
+        """
+        if self.exporter is None:
+            return None
+        span_context = self._span(name, None, attributes)
+        span = span_context.__enter__()
+        return span_context, span
+
+    def end(self, started, error=None):
+        if started is None:
+            return
+        span_context, span = started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {str(error)}"[:500]
+        span_context.__exit__(None, None, None)
+
+    def _export(self, span):
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Could not export span {span.name}: {str(e)}")
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+class JsonlExporter:
+    """
+    Append each finished span to a JSON Lines file. Spans of one trace share
+    a trace_id; ``flask trace-report`` puts them back together.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+class OtlpHttpExporter:
+    """
+    Send spans to an OpenTelemetry collector over OTLP/HTTP with JSON
+    encoding, batched from a background thread. Needs no OpenTelemetry
+    packages; any collector, Jaeger or Tempo with OTLP/HTTP enabled accepts it.
+    """
+
+    def __init__(self, endpoint, service_name='easyslides', batch_size=256, interval=2.0):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self._run, daemon=True, name='otlp-exporter').start()
+
+    def export(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            logger.warning('Trace export queue is full, dropping span')
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.warning(f"Could not send {len(batch)} spans to {self.url}: {str(e)}")
+
+    def _send(self, spans):
+        body = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'easyslides'},
+                'spans': [_otlp_span(span) for span in spans],
+            }],
+        }]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+def _otlp_span(span):
+    otlp = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [_otlp_attribute(key, value) for key, value in span.attributes.items() if value is not None],
+        'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+    }
+    if span.parent_id:
+        otlp['parentSpanId'] = span.parent_id
+    return otlp
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+def default_trace_file():
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'traces.jsonl')
+
+def create_exporter():
+    """
+    Pick the exporter named by TRACE_EXPORTER: "jsonl", "otlp", or none
+    """
+    kind = os.environ.get('TRACE_EXPORTER', 'off').lower()
+    if kind == 'jsonl':
+        return JsonlExporter(os.environ.get('TRACE_FILE') or default_trace_file())
+    if kind == 'otlp':
+        return OtlpHttpExporter(
+            os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318'),
+            service_name=os.environ.get('OTEL_SERVICE_NAME', 'easyslides')
+        )
+    if kind not in ('off', 'none', ''):
+        logger.warning(f"Unknown TRACE_EXPORTER '{kind}', tracing is off")
+    return None
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer():
+    """
+    Return the process-wide tracer, configured from the environment
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(create_exporter())
+    return _tracer
+
+def span(name, parent=None, **attributes):
+    return get_tracer().span(name, parent=parent, **attributes)
+
+def trace_requests(app):
+    """
+    Open a root span for each Flask request, so the spans of the work it
+    does share one trace. Registers nothing when tracing is off.
+    """
+    from flask import g, request
+
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return
+
+    def start():
+        route = request.url_rule.rule if request.url_rule else request.path
+        g._trace_span = tracer.start(f"{request.method} {route}", path=request.path)
+
+    def record_status(response):
+        current_span().set_attribute('status', response.status_code)
+        return response
+
+    def finish(error=None):
+        tracer.end(g.pop('_trace_span', None), error)
+
+    app.before_request(start)
+    app.after_request(record_status)
+    app.teardown_request(finish)
+    logger.info(f"Request tracing on, exporting with {type(tracer.exporter).__name__}")
+
+def load_traces(path, presentation_id=None, trace_id=None):
+    """
+    Read spans from a JSONL trace file, grouped by trace id. With
+    ``presentation_id``, keep the traces with a span about that presentation.
+    """
+    traces = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            traces.setdefault(record['trace_id'], []).append(record)
+    if trace_id:
+        return {trace_id: traces[trace_id]} if trace_id in traces else {}
+    if presentation_id is not None:
+        return {
+            key: spans for key, spans in traces.items()
+            if any(str(record['attributes'].get('presentation_id')) == str(presentation_id) for record in spans)
+        }
+    return traces
+
+def trace_rows(spans):
+    """
+    Order the spans of one trace as a tree. Returns (depth, span, self_ms)
+    rows, where self_ms is the span's time not covered by its children.
+    Spans whose parent is missing (for example still running, or written
+    by another process to another file) are shown as roots.
+    """
+    by_id = {record['span_id']: record for record in spans}
+    children = {}
+    for record in spans:
+        parent = record['parent_id'] if record['parent_id'] in by_id else None
+        children.setdefault(parent, []).append(record)
+    for siblings in children.values():
+        siblings.sort(key=lambda record: record['start_ns'])
+
+    rows = []
+    def visit(record, depth):
+        child_ms = sum(child['duration_ms'] for child in children.get(record['span_id'], ()))
+        rows.append((depth, record, max(0.0, record['duration_ms'] - child_ms)))
+        for child in children.get(record['span_id'], ()):
+            visit(child, depth + 1)
+    for root in children.get(None, ()):
+        visit(root, 0)
+    return rows
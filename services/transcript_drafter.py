@@ -0,0 +1,75 @@
+import logging
+from collections import Counter
+from services.text_utils import content_words, split_sentences
+
+logger = logging.getLogger(__name__)
+
+class TranscriptDrafter:
+    """
+    Maintain a draft outline of a transcript while it is still being spoken.
+
+    The outline is a plain dict so it can be stored as JSON on the draft
+    record. Each delta only touches the new text: complete sentences are
+    appended to the open section, a new section starts once the open one
+    reaches ``section_words``, and the trailing partial sentence is kept
+    as ``pending`` until more text arrives.
+    """
+
+    def __init__(self, section_words=80, heading_terms=3):
+        self.section_words = section_words
+        self.heading_terms = heading_terms
+
+    def new_outline(self):
+        return {'sections': [], 'pending': ''}
+
+    def apply_delta(self, outline, text):
+        """
+        Update the outline in place with newly transcribed text
+        """
+        pending = f"{outline['pending']} {text}".strip()
+        sentences = split_sentences(pending)
+
+        # The last sentence may still be growing unless it is punctuated
+        if sentences and not pending.endswith(('.', '!', '?')) and len(sentences[-1].split()) < 30:
+            outline['pending'] = sentences.pop()
+        else:
+            outline['pending'] = ''
+
+        for sentence in sentences:
+            self._add_sentence(outline, sentence)
+
+        return outline
+
+    def flush(self, outline):
+        """
+        Close the outline by adding any pending partial sentence
+        """
+        if outline['pending']:
+            self._add_sentence(outline, outline['pending'])
+            outline['pending'] = ''
+        return outline
+
+    def _add_sentence(self, outline, sentence):
+        sections = outline['sections']
+        if not sections or sections[-1]['word_count'] >= self.section_words:
+            sections.append({'heading': '', 'sentences': [], 'word_count': 0, 'terms': {}})
+
+        section = sections[-1]
+        section['sentences'].append(sentence)
+        section['word_count'] += len(sentence.split())
+
+        terms = Counter(section['terms'])
+        terms.update(content_words(sentence))
+        section['terms'] = dict(terms)
+        section['heading'] = ' '.join(
+            term for term, _ in terms.most_common(self.heading_terms)
+        ).title()
+
+    def outline_summary(self, outline):
+        """
+        Return a compact list of section headings and sizes for prompting
+        """
+        return [
+            {'heading': section['heading'], 'word_count': section['word_count']}
+            for section in outline['sections']
+        ]
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Uploads not written to for this long are treated as abandoned
+DEFAULT_EXPIRY_SECONDS = 24 * 3600
+
+UPLOAD_FILE = re.compile(r'([0-9a-f]{32})\.(part|json)')
+
+# Without file locks, uploads are at least serialized within the process
+_fallback_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Raised when a chunked upload request cannot be applied"""
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class ChunkedUploadManager:
+    """
+    Resumable chunked uploads stored on disk.
+
+    Each upload is a ``<upload_id>.part`` file that chunks are appended to as
+    they arrive, plus a ``<upload_id>.json`` sidecar holding its metadata. The
+    size of the part file is the authoritative received offset, so a client
+    that lost its connection can ask for the offset and resume from there.
+
+    Writes to one upload are serialized by an exclusive lock on its sidecar,
+    held from the offset check to the end of the append, so a retried chunk
+    racing the original is stored once. Uploads left untouched for
+    ``expiry_seconds`` are removed when a new upload starts, or by
+    ``flask prune-uploads``.
+    """
+
+    def __init__(self, upload_folder, max_upload_size=500 * 1024 * 1024, expiry_seconds=DEFAULT_EXPIRY_SECONDS):
+        self.upload_folder = upload_folder
+        self.max_upload_size = max_upload_size
+        self.expiry_seconds = expiry_seconds
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+    def init_upload(self, filename, total_size):
+        """
+        Start a new upload and return its metadata
+        """
+        if not filename:
+            raise UploadError('No filename provided')
+        if total_size <= 0:
+            raise UploadError('Invalid upload size')
+        if total_size > self.max_upload_size:
+            raise UploadError('File too large', status_code=413)
+
+        self.prune_expired()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            'upload_id': upload_id,
+            'filename': secure_filename(filename),
+            'total_size': total_size,
+        }
+        self._write_meta(upload_id, meta)
+        open(self._part_path(upload_id), 'wb').close()
+
+        logger.info(f"Started chunked upload {upload_id} for {meta['filename']} ({total_size} bytes)")
+        return dict(meta, offset=0)
+
+    def get_status(self, upload_id):
+        """
+        Return upload metadata including the number of bytes received so far
+        """
+        meta = self._read_meta(upload_id)
+        return dict(meta, offset=os.path.getsize(self._part_path(upload_id)))
+
+    def write_chunk(self, upload_id, offset, data, checksum):
+        """
+        Append a chunk at ``offset`` after verifying its SHA-256 checksum.
+
+        Chunks must arrive in order. A chunk that starts before the current
+        offset and was already stored is acknowledged without rewriting it,
+        which makes retries after a lost response idempotent.
+        """
+        if not checksum:
+            raise UploadError('Missing chunk checksum')
+        with self._locked(upload_id):
+            return self._append(upload_id, offset, data, checksum)
+
+    def _append(self, upload_id, offset, data, checksum):
+        meta = self._read_meta(upload_id)
+        part_path = self._part_path(upload_id)
+        current = os.path.getsize(part_path)
+
+        if hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise UploadError('Chunk checksum mismatch', status_code=422, offset=current)
+
+        if offset + len(data) <= current:
+            return current
+        if offset != current:
+            raise UploadError('Chunk offset does not match received data', status_code=409, offset=current)
+        if current + len(data) > meta['total_size']:
+            raise UploadError('Chunk exceeds declared upload size', status_code=413, offset=current)
+
+        with open(part_path, 'ab') as part_file:
+            part_file.write(data)
+            part_file.flush()
+            os.fsync(part_file.fileno())
+
+        return current + len(data)
+
+    def finalize(self, upload_id):
+        """
+        Move a fully received upload into place and return its final path
+        """
+        with self._locked(upload_id):
+            return self._finalize(upload_id)
+
+    def _finalize(self, upload_id):
+        meta = self._read_meta(upload_id)
+        part_path = self._part_path(upload_id)
+        received = os.path.getsize(part_path)
+
+        if received != meta['total_size']:
+            raise UploadError('Upload is incomplete', status_code=409, offset=received)
+
+        filename = secure_filename(f"{uuid.uuid4()}_{meta['filename']}")
+        filepath = os.path.join(self.upload_folder, filename)
+        os.replace(part_path, filepath)
+        os.remove(self._meta_path(upload_id))
+
+        logger.info(f"Finalized chunked upload {upload_id} as {filename}")
+        return filename, filepath
+
+    def prune_expired(self):
+        """
+        Remove uploads that have not received data for ``expiry_seconds``
+        and return how many were removed. Uploads being written are skipped.
+        """
+        cutoff = time.time() - self.expiry_seconds
+        upload_ids = set()
+        for name in os.listdir(self.upload_folder):
+            match = UPLOAD_FILE.fullmatch(name)
+            if match:
+                upload_ids.add(match.group(1))
+
+        removed = 0
+        for upload_id in upload_ids:
+            try:
+                # The part file changes with every chunk; the sidecar only at the start
+                paths = [self._part_path(upload_id), self._meta_path(upload_id)]
+                last_write = max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+                if last_write >= cutoff:
+                    continue
+                if not os.path.exists(self._meta_path(upload_id)):
+                    # A part without its sidecar cannot be resumed or locked
+                    os.remove(self._part_path(upload_id))
+                    removed += 1
+                    continue
+                with self._locked(upload_id, blocking=False) as locked:
+                    if not locked:
+                        continue
+                    for path in paths:
+                        if os.path.exists(path):
+                            os.remove(path)
+                removed += 1
+            except (OSError, ValueError, UploadError) as e:
+                logger.warning(f"Could not remove expired upload {upload_id}: {str(e)}")
+        if removed:
+            logger.info(f"Removed {removed} expired chunked uploads")
+        return removed
+
+    @contextmanager
+    def _locked(self, upload_id, blocking=True):
+        """
+        Hold the upload's lock for the block, shared with other processes
+        through the sidecar. Yields False if ``blocking`` is off and the lock
+        is taken.
+        """
+        self._read_meta(upload_id)
+        if fcntl is None:
+            if not _fallback_lock.acquire(blocking):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                _fallback_lock.release()
+            return
+        try:
+            lock_file = open(self._meta_path(upload_id), 'r')
+        except FileNotFoundError:
+            raise UploadError('Unknown upload', status_code=404)
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            # Finalized or pruned while this caller waited for the lock
+            if not os.path.exists(self._meta_path(upload_id)):
+                raise UploadError('Unknown upload', status_code=404)
+            yield True
+        finally:
+            # Closing the file releases the lock
+            lock_file.close()
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.upload_folder, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.upload_folder, f"{upload_id}.json")
+
+    def _read_meta(self, upload_id):
+        # Upload ids are generated hex strings; reject anything else so the id
+        # can never be used to address files outside the upload folder
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError('Unknown upload', status_code=404)
+        try:
+            with open(self._meta_path(upload_id), 'r', encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            raise UploadError('Unknown upload', status_code=404)
+
+    def _write_meta(self, upload_id, meta):
+        with open(self._meta_path(upload_id), 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
@@ -14,8 +14,11 @@ class VoiceToSlidesApp {
     initializeApp() {
         // Check for Web Speech API support
         if (!('webkitSpeechRecognition' in window) && !('SpeechRecognition' in window)) {
-            console.warn('Web Speech API not supported');
-            this.showNotification('Voice recording is not supported in your browser. Please upload an audio file instead.', 'warning');
+            console.warn('Web Speech API not supported, falling back to server-side streaming');
+            this.streamingSupported = 'WebSocket' in window && navigator.mediaDevices && navigator.mediaDevices.getUserMedia;
+            if (!this.streamingSupported) {
+                this.showNotification('Voice recording is not supported in your browser. Please upload an audio file instead.', 'warning');
+            }
         } else {
             this.initializeSpeechRecognition();
         }
@@ -115,12 +118,18 @@ class VoiceToSlidesApp {
     }
     
     startRecording() {
+        if (!this.recognition && this.streamingSupported) {
+            this.startStreamingRecording();
+            return;
+        }
+        
         if (!this.recognition) {
             this.showNotification('Speech recognition not available', 'error');
             return;
         }
         
         this.finalTranscript = '';
+        this.startDraft();
         this.recognition.start();
         
         // Update UI
@@ -133,6 +142,10 @@ class VoiceToSlidesApp {
             this.recognition.stop();
         }
         
+        if (this.streamSocket) {
+            this.stopStreamingRecording();
+        }
+        
         this.isRecording = false;
         this.hideRecordingStatus();
         
@@ -145,6 +158,113 @@ class VoiceToSlidesApp {
         }
     }
     
+    async startStreamingRecording() {
+        // Stream 16 kHz PCM to the server, which transcribes it incrementally
+        const targetRate = 16000;
+        
+        try {
+            this.mediaStream = await navigator.mediaDevices.getUserMedia({ audio: true });
+        } catch (error) {
+            this.showNotification('Microphone access was denied', 'error');
+            return;
+        }
+        
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.streamSocket = new WebSocket(`${protocol}//${window.location.host}/ws/transcribe`);
+        this.streamSocket.binaryType = 'arraybuffer';
+        this.finalTranscript = '';
+        this.startDraft();
+        
+        this.streamSocket.onopen = () => {
+            this.streamSocket.send(JSON.stringify({ format: 'pcm', sample_rate: targetRate }));
+            
+            this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+            const source = this.audioContext.createMediaStreamSource(this.mediaStream);
+            this.audioNode = this.audioContext.createScriptProcessor(4096, 1, 1);
+            
+            this.audioNode.onaudioprocess = (event) => {
+                if (this.streamSocket && this.streamSocket.readyState === WebSocket.OPEN) {
+                    const input = event.inputBuffer.getChannelData(0);
+                    this.streamSocket.send(this.downsampleToPCM(input, this.audioContext.sampleRate, targetRate));
+                }
+            };
+            
+            source.connect(this.audioNode);
+            this.audioNode.connect(this.audioContext.destination);
+            
+            this.isRecording = true;
+            this.recordingStartTime = Date.now();
+            this.showRecordingStatus();
+            this.startRecordingTimer();
+            document.getElementById('recordBtn').classList.add('d-none');
+            document.getElementById('stopBtn').classList.remove('d-none');
+        };
+        
+        this.streamSocket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            
+            if (message.type === 'partial' || message.type === 'final') {
+                this.finalTranscript = message.transcript + ' ';
+                this.updateTranscriptDisplay(this.finalTranscript);
+            }
+            
+            if (message.type === 'final') {
+                this.closeStreamSocket();
+                if (this.finalTranscript.trim()) {
+                    this.showTranscriptArea();
+                }
+            } else if (message.type === 'error') {
+                this.showNotification(message.error, 'error');
+                this.closeStreamSocket();
+            }
+        };
+        
+        this.streamSocket.onerror = () => {
+            this.showNotification('Lost connection to the transcription server', 'error');
+            this.stopRecording();
+        };
+    }
+    
+    stopStreamingRecording() {
+        if (this.audioNode) {
+            this.audioNode.disconnect();
+            this.audioNode = null;
+        }
+        if (this.audioContext) {
+            this.audioContext.close();
+            this.audioContext = null;
+        }
+        if (this.mediaStream) {
+            this.mediaStream.getTracks().forEach(track => track.stop());
+            this.mediaStream = null;
+        }
+        
+        // Ask the server to flush the remaining audio; it replies with the final transcript
+        if (this.streamSocket.readyState === WebSocket.OPEN) {
+            this.streamSocket.send(JSON.stringify({ type: 'stop' }));
+        }
+    }
+    
+    closeStreamSocket() {
+        if (this.streamSocket) {
+            this.streamSocket.close();
+            this.streamSocket = null;
+        }
+    }
+    
+    downsampleToPCM(input, inputRate, targetRate) {
+        const ratio = inputRate / targetRate;
+        const length = Math.floor(input.length / ratio);
+        const output = new Int16Array(length);
+        
+        for (let i = 0; i < length; i++) {
+            const sample = Math.max(-1, Math.min(1, input[Math.floor(i * ratio)]));
+            output[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+        }
+        
+        return output.buffer;
+    }
+    
     showRecordingStatus() {
         document.getElementById('recordingStatus').classList.remove('d-none');
     }
@@ -191,6 +311,59 @@ class VoiceToSlidesApp {
         document.getElementById('transcriptArea').classList.remove('d-none');
     }
     
+    async startDraft() {
+        // Send transcript deltas periodically so the server can build the
+        // title and outline while the user is still talking
+        this.stopDraftSync();
+        this.draft = null;
+        
+        try {
+            const response = await fetch('/api/drafts', { method: 'POST' });
+            if (!response.ok) return;
+            
+            const result = await response.json();
+            this.draft = { id: result.draft_id, offset: 0 };
+            this.draftTimer = setInterval(() => this.sendDraftDelta(), 5000);
+        } catch (error) {
+            console.warn('Incremental drafting unavailable:', error);
+        }
+    }
+    
+    async sendDraftDelta() {
+        const draft = this.draft;
+        if (!draft || draft.sending || this.finalTranscript.length <= draft.offset) return;
+        
+        draft.sending = true;
+        try {
+            const response = await fetch(`/api/drafts/${draft.id}/delta`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    offset: draft.offset,
+                    text: this.finalTranscript.slice(draft.offset)
+                })
+            });
+            
+            const result = await response.json();
+            if (result.offset !== undefined) {
+                draft.offset = result.offset;
+            }
+        } catch (error) {
+            console.warn('Failed to send transcript delta:', error);
+        } finally {
+            draft.sending = false;
+        }
+    }
+    
+    stopDraftSync() {
+        if (this.draftTimer) {
+            clearInterval(this.draftTimer);
+            this.draftTimer = null;
+        }
+    }
+    
     async generateSlidesFromTranscript() {
         const transcript = this.finalTranscript.trim();
         
@@ -207,15 +380,21 @@ class VoiceToSlidesApp {
         this.showProcessingStatus();
         
         try {
-            const response = await fetch('/process_transcript', {
+            // Finalize from the warm draft when one exists
+            const draftId = this.draft ? this.draft.id : null;
+            this.stopDraftSync();
+            this.draft = null;
+            
+            const url = draftId ? `/api/drafts/${draftId}/finalize` : '/process_transcript';
+            const response = await fetch(url, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ transcript })
+                body: JSON.stringify({ transcript: this.finalTranscript })
             });
             
-            const result = await response.json();
+            const result = await this.waitIfQueued(await response.json());
             
             if (result.success) {
                 this.showNotification('Slides generated successfully!', 'success');
@@ -244,24 +423,23 @@ class VoiceToSlidesApp {
             return;
         }
         
-        // Check file size (50MB limit)
-        if (file.size > 50 * 1024 * 1024) {
-            this.showNotification('File too large. Please upload a file smaller than 50MB', 'error');
+        // Check file size (500MB limit for resumable uploads)
+        if (file.size > 500 * 1024 * 1024) {
+            this.showNotification('File too large. Please upload a file smaller than 500MB', 'error');
             return;
         }
-        
+
         this.showUploadProgress();
-        
-        const formData = new FormData();
-        formData.append('audio_file', file);
-        
+
         try {
-            const response = await fetch('/upload_audio', {
-                method: 'POST',
-                body: formData
+            const uploadId = await this.uploadInChunks(file);
+
+            const response = await fetch(`/api/uploads/${uploadId}/finalize`, {
+                method: 'POST'
             });
-            
-            const result = await response.json();
+
+            localStorage.removeItem(this.uploadStorageKey(file));
+            const result = await this.waitIfQueued(await response.json());
             
             if (result.success) {
                 this.showNotification('Audio uploaded and processed successfully!', 'success');
@@ -280,6 +458,100 @@ class VoiceToSlidesApp {
         }
     }
     
+    uploadStorageKey(file) {
+        return `upload:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
+    async startOrResumeUpload(file) {
+        // Resume a previous upload of the same file if the server still has it
+        const storageKey = this.uploadStorageKey(file);
+        const savedId = localStorage.getItem(storageKey);
+
+        if (savedId) {
+            const response = await fetch(`/api/uploads/${savedId}`);
+            if (response.ok) {
+                const status = await response.json();
+                return { uploadId: savedId, offset: status.offset, chunkSize: this.uploadChunkSize || 2 * 1024 * 1024 };
+            }
+            localStorage.removeItem(storageKey);
+        }
+
+        const response = await fetch('/api/uploads', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Failed to start upload');
+        }
+
+        localStorage.setItem(storageKey, result.upload_id);
+        this.uploadChunkSize = result.chunk_size;
+        return { uploadId: result.upload_id, offset: 0, chunkSize: result.chunk_size };
+    }
+
+    async uploadInChunks(file) {
+        let { uploadId, offset, chunkSize } = await this.startOrResumeUpload(file);
+        let retries = 0;
+
+        while (offset < file.size) {
+            const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer();
+            const digest = await crypto.subtle.digest('SHA-256', chunk);
+            const checksum = Array.from(new Uint8Array(digest))
+                .map(b => b.toString(16).padStart(2, '0'))
+                .join('');
+
+            try {
+                const response = await fetch(`/api/uploads/${uploadId}`, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Type': 'application/octet-stream',
+                        'X-Upload-Offset': String(offset),
+                        'X-Chunk-Checksum': checksum,
+                    },
+                    body: chunk
+                });
+
+                const result = await response.json();
+
+                // The server reports its received offset on success and on
+                // offset or checksum conflicts, so we always continue from it
+                if (result.offset === undefined) {
+                    throw new Error(result.error || 'Upload failed');
+                }
+                offset = result.offset;
+                this.updateUploadProgress(offset / file.size);
+
+                if (response.ok) {
+                    retries = 0;
+                } else if (++retries > 5) {
+                    throw new Error(result.error || 'Upload failed');
+                }
+
+            } catch (error) {
+                // Back off and retry the same chunk on network errors
+                if (error instanceof TypeError && ++retries <= 5) {
+                    await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+                    continue;
+                }
+                throw error;
+            }
+        }
+
+        return uploadId;
+    }
+
+    updateUploadProgress(fraction) {
+        const progressBar = document.querySelector('#uploadProgress .progress-bar');
+        if (progressBar) {
+            progressBar.style.width = `${Math.round(fraction * 100)}%`;
+        }
+    }
+
     showUploadProgress() {
         document.getElementById('uploadProgress').classList.remove('d-none');
     }
@@ -288,6 +560,60 @@ class VoiceToSlidesApp {
         document.getElementById('uploadProgress').classList.add('d-none');
     }
     
+    async waitIfQueued(result) {
+        // Queued jobs run on a background worker; wait until the presentation is ready
+        if (!result.queued) {
+            return result;
+        }
+        
+        const status = window.EventSource && result.events_url
+            ? await this.waitForEvents(result)
+            : await this.pollStatus(result.status_url);
+        
+        if (status === 'completed') {
+            return result;
+        }
+        return { success: false, error: 'Failed to generate slides. Please try again.' };
+    }
+    
+    waitForEvents(result) {
+        // The server pushes each status change, so nothing is polled while the job runs
+        return new Promise(resolve => {
+            const source = new EventSource(result.events_url);
+            source.onmessage = (message) => {
+                const event = JSON.parse(message.data);
+                if (event.status === 'completed' || event.status === 'error') {
+                    source.close();
+                    resolve(event.status);
+                }
+            };
+            source.onerror = () => {
+                // EventSource reconnects on its own unless the stream was refused
+                if (source.readyState === EventSource.CLOSED) {
+                    this.pollStatus(result.status_url).then(resolve);
+                }
+            };
+        });
+    }
+    
+    async pollStatus(statusUrl) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            try {
+                const response = await fetch(statusUrl);
+                if (response.ok) {
+                    const status = await response.json();
+                    if (status.status === 'completed' || status.status === 'error') {
+                        return status.status;
+                    }
+                }
+            } catch (error) {
+                // Keep polling through brief network errors
+                console.error('Error checking presentation status:', error);
+            }
+        }
+    }
+    
     showProcessingStatus() {
         document.getElementById('processingStatus').classList.remove('d-none');
         // Scroll to processing status
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Point the app at a throwaway database and lock directory before it is imported
+_scratch = tempfile.mkdtemp(prefix='easyslides-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ['SINGLE_FLIGHT_DIR'] = os.path.join(_scratch, 'single_flight')
+os.environ.setdefault('LOG_FORMAT', 'text')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config['TESTING'] = True
+    result = flask_app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
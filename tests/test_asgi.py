@@ -0,0 +1,61 @@
+import json
+import time
+import asyncio
+import pytest
+import asgi
+
+def http_scope(method, path, body=b''):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+async def call(method, path, body=b''):
+    """Run one request through the ASGI app and return (status, body)"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(http_scope(method, path, body), receive, send)
+    status = next(m['status'] for m in sent if m['type'] == 'http.response.start')
+    content = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+    return status, content
+
+def test_flask_routes_are_served_concurrently(app, monkeypatch):
+    def slow_wsgi_app(environ, start_response):
+        time.sleep(1)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'done']
+
+    monkeypatch.setattr(app, 'wsgi_app', slow_wsgi_app)
+
+    async def run():
+        started = time.monotonic()
+        results = await asyncio.gather(*(call('GET', '/slow') for _ in range(4)))
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(run())
+    assert results == [(200, b'done')] * 4
+    # One shared thread would take four seconds
+    assert elapsed < 2
+
+@pytest.mark.parametrize('payload', [{'transcript': 5}, {'transcript': ['a'] * 20}, [1, 2], 'text'])
+def test_process_transcript_rejects_non_string_transcripts(app, payload):
+    status, content = asyncio.run(call('POST', '/process_transcript', json.dumps(payload).encode()))
+    assert status == 400
+    assert json.loads(content) == {'error': 'No transcript provided', 'success': False}
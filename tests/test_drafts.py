@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import routes
+from app import db
+from models import Presentation, TranscriptDraft
+
+TRANSCRIPT = (
+    "today we look at the quarterly sales results for the enterprise segment and the small "
+    "business segment, and at the plan for next quarter"
+)
+
+def create_draft(client):
+    return client.post('/api/drafts').get_json()['draft_id']
+
+def test_unknown_draft_is_not_found(client):
+    assert client.post('/api/drafts/missing/delta', json={'offset': 0, 'text': 'hello'}).status_code == 404
+    assert client.post('/api/drafts/missing/finalize', json={}).status_code == 404
+
+def test_invalid_delta_is_rejected(client):
+    draft_id = create_draft(client)
+    for payload in ({'offset': 'x', 'text': 'hi'}, {'offset': 0, 'text': 5}, {'offset': -1, 'text': 'hi'}, [1]):
+        assert client.post(f'/api/drafts/{draft_id}/delta', json=payload).status_code == 400
+
+def test_delta_without_api_key_still_updates_the_draft(client, monkeypatch):
+    monkeypatch.delenv('ANTHROPIC_API_KEY', raising=False)
+    monkeypatch.setenv('LLM_TITLES', 'true')
+    draft_id = create_draft(client)
+    text = ' '.join([TRANSCRIPT] * 5)
+    response = client.post(f'/api/drafts/{draft_id}/delta', json={'offset': 0, 'text': text})
+    assert response.status_code == 200
+    assert response.get_json()['offset'] == len(text)
+
+def test_non_string_transcript_is_rejected(client):
+    draft_id = create_draft(client)
+    response = client.post(f'/api/drafts/{draft_id}/finalize', json={'transcript': 5})
+    assert response.status_code == 400
+
+def test_draft_is_kept_until_generation_succeeds(app, client, monkeypatch):
+    monkeypatch.setenv('SLIDE_ENGINE', 'local')
+    draft_id = create_draft(client)
+    client.post(f'/api/drafts/{draft_id}/delta', json={'offset': 0, 'text': TRANSCRIPT})
+
+    monkeypatch.setattr(routes, 'generate_slides_for_presentation', lambda *args, **kwargs: False)
+    assert client.post(f'/api/drafts/{draft_id}/finalize', json={}).status_code == 500
+    with app.app_context():
+        assert db.session.get(TranscriptDraft, draft_id) is not None
+
+    monkeypatch.undo()
+    monkeypatch.setenv('SLIDE_ENGINE', 'local')
+    response = client.post(f'/api/drafts/{draft_id}/finalize', json={})
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(TranscriptDraft, draft_id) is None
+        assert db.session.get(Presentation, response.get_json()['presentation_id']).status == 'completed'
+
+def test_abandoned_drafts_expire(app, client):
+    draft_id = create_draft(client)
+    with app.app_context():
+        draft = db.session.get(TranscriptDraft, draft_id)
+        draft.updated_at = datetime.utcnow() - timedelta(seconds=app.config['DRAFT_EXPIRY_SECONDS'] + 60)
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['prune-drafts'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(TranscriptDraft, draft_id) is None
@@ -0,0 +1,21 @@
+from app import db
+from models import Job, Presentation
+from routes import JOB_HANDLERS, mark_job_presentation_failed
+from services.job_queue import JobQueue, Worker
+
+def test_audio_job_without_its_file_fails_at_once(app):
+    with app.app_context():
+        presentation = Presentation(title='Upload', status='processing')
+        db.session.add(presentation)
+        db.session.commit()
+        queue = JobQueue(lease_seconds=30)
+        job = queue.enqueue('process_audio', {'filepath': '/nonexistent/uploads/talk.mp3'}, presentation_id=presentation.id)
+
+        worker = Worker(queue, JOB_HANDLERS, on_failure=mark_job_presentation_failed, worker_id='other-host:1')
+        worker.run_job(queue.claim(worker.worker_id))
+
+        job = db.session.get(Job, job.id, populate_existing=True)
+        assert job.status == 'failed'
+        assert job.attempts == 1
+        assert 'uploads folder' in job.last_error
+        assert db.session.get(Presentation, presentation.id, populate_existing=True).status == 'error'
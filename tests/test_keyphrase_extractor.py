@@ -0,0 +1,40 @@
+import os
+import pytest
+from services.keyphrase_extractor import KeyphraseExtractor, COMMON_VERBS, NUMBER_WORDS
+
+TRANSCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transcripts')
+
+def load_transcript(name):
+    with open(os.path.join(TRANSCRIPT_DIR, f"{name}.txt")) as f:
+        return f.read()
+
+def excerpt(transcript):
+    # Titles are generated from the first 100 words, as in SlideGenerator
+    return ' '.join(transcript.split()[:100])
+
+@pytest.mark.parametrize('name, title', [
+    ('climate', 'Solar Power'),
+    ('sales', 'Enterprise Segment'),
+    ('onboarding', 'Code Review'),
+    ('history', 'Roman Empire'),
+    ('health', 'Sleep and Mental Health'),
+])
+def test_titles_name_the_topic(name, title):
+    assert KeyphraseExtractor().generate_title(excerpt(load_transcript(name))) == title
+
+@pytest.mark.parametrize('name', ['climate', 'sales', 'onboarding', 'history', 'health'])
+def test_keyphrases_hold_no_verbs_or_numbers(name):
+    extractor = KeyphraseExtractor()
+    for phrase in extractor.extract(load_transcript(name), top_n=10):
+        words = phrase.split()
+        assert not set(words) & (COMMON_VERBS | NUMBER_WORDS), phrase
+        assert not extractor._is_adjective(words[-1]), phrase
+
+def test_verbs_split_long_runs():
+    phrases = KeyphraseExtractor().candidates("solar power provides steady income for farmers")
+    assert ('solar', 'power') in phrases
+    assert not any('provides' in phrase or phrase[-1] == 'steady' for phrase in phrases)
+
+def test_numbers_end_phrases():
+    phrases = KeyphraseExtractor().candidates("revenue grew twelve percent in the enterprise segment, churn stayed at 6 percent")
+    assert phrases == [('revenue',), ('enterprise', 'segment'), ('churn',)]
@@ -0,0 +1,131 @@
+import time
+import uuid
+import asyncio
+import threading
+import anthropic
+import pytest
+from benchmarks.load_test import AnthropicStub, serve_in_thread
+from services import llm_router
+from services.llm_router import LatencyHistogram, ModelRouter, get_histogram
+from services.scheduler import Scheduler
+
+class SlowFirstStub(AnthropicStub):
+    """Stub whose first request takes ``first_latency`` seconds and the rest none"""
+
+    def __init__(self, first_latency):
+        super().__init__()
+        self.first_latency = first_latency
+        self._served = 0
+        self._latency_lock = threading.Lock()
+
+    @property
+    def latency(self):
+        with self._latency_lock:
+            self._served += 1
+            return self.first_latency if self._served == 1 else 0.0
+
+    @latency.setter
+    def latency(self, value):
+        pass
+
+@pytest.fixture
+def stub():
+    server = serve_in_thread(AnthropicStub())
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def slow_first_stub():
+    server = serve_in_thread(SlowFirstStub(first_latency=1.5))
+    yield server
+    server.shutdown()
+
+def scheduler(max_concurrency=2):
+    result = Scheduler()
+    result.configure('anthropic', rate_per_minute=1e6, max_concurrency=max_concurrency, burst=1000)
+    return result
+
+def warm_model(samples=20, seconds=0.05):
+    """A model name of its own with a latency history that makes it hedge quickly"""
+    model = f"model-{uuid.uuid4().hex[:8]}"
+    for _ in range(samples):
+        get_histogram(model).record(seconds)
+    return model
+
+def wait_for_calls_to_finish(model, count, timeout=5):
+    # Abandoned calls still record their latency once the stub answers
+    stop_at = time.monotonic() + timeout
+    while get_histogram(model).count() < count and time.monotonic() < stop_at:
+        time.sleep(0.05)
+
+def message(text='hello'):
+    return [{'role': 'user', 'content': text}]
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(window=100)
+    assert histogram.percentile(95) is None
+    for value in range(1, 101):
+        histogram.record(value / 100)
+    assert histogram.count() == 100
+    assert histogram.percentile(50) == pytest.approx(0.5, abs=0.02)
+    assert histogram.percentile(95) == pytest.approx(0.95, abs=0.02)
+    histogram.record(10.0)
+    # The oldest sample dropped out of the window
+    assert histogram.count() == 100
+
+def test_short_inputs_go_to_the_small_model(stub):
+    client = anthropic.Anthropic(api_key='test', base_url=stub.url, max_retries=0)
+    router = ModelRouter(client, default_model='large', small_model='small', small_input_tokens=400)
+    router.create(100, max_tokens=10, messages=message())
+    router.create(1000, max_tokens=10, messages=message())
+    assert stub.models == ['small', 'large']
+
+def test_slow_request_is_hedged_and_the_loser_frees_its_slot(slow_first_stub):
+    client = anthropic.Anthropic(api_key='test', base_url=slow_first_stub.url, max_retries=0)
+    limits = scheduler()
+    model = warm_model()
+    router = ModelRouter(client, default_model=model, min_hedge_delay=0.1, scheduler=limits)
+
+    started = time.monotonic()
+    response = router.create(1000, max_tokens=10, messages=message())
+    assert response.content[0].text
+    assert time.monotonic() - started < 1
+    assert slow_first_stub.calls == 2
+    # The primary is still waiting on the stub, but no longer holds a slot
+    assert limits.stats('anthropic')['in_flight'] == 0
+    wait_for_calls_to_finish(model, 22)
+
+def test_async_hedge_cancels_the_loser(slow_first_stub):
+    client = anthropic.AsyncAnthropic(api_key='test', base_url=slow_first_stub.url, max_retries=0)
+    limits = scheduler()
+    model = warm_model()
+    router = ModelRouter(None, default_model=model, min_hedge_delay=0.1, scheduler=limits, async_client=client)
+
+    async def run():
+        started = time.monotonic()
+        response = await router.create_async(1000, max_tokens=10, messages=message())
+        return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(run())
+    assert response.content[0].text
+    assert elapsed < 1
+    assert slow_first_stub.calls == 2
+    assert limits.stats('anthropic')['in_flight'] == 0
+
+def test_no_hedge_when_the_upstream_is_at_capacity(slow_first_stub):
+    slow_first_stub.first_latency = 0.5
+    client = anthropic.Anthropic(api_key='test', base_url=slow_first_stub.url, max_retries=0)
+    limits = scheduler(max_concurrency=1)
+    model = warm_model()
+    router = ModelRouter(client, default_model=model, min_hedge_delay=0.1, scheduler=limits)
+    router.create(1000, max_tokens=10, messages=message())
+    assert slow_first_stub.calls == 1
+    assert limits.stats('anthropic')['in_flight'] == 0
+
+def test_executor_is_sized_from_the_concurrency_cap(monkeypatch):
+    monkeypatch.setattr(llm_router, '_executor', None)
+    router = ModelRouter(None, default_model='any', scheduler=scheduler(max_concurrency=3))
+    future = router._submit(None, 'any', {}, llm_router._Slot(None))
+    with pytest.raises(AttributeError):
+        future.result()
+    assert llm_router._executor._max_workers == 6
@@ -0,0 +1,17 @@
+from sqlalchemy import inspect, text
+import schema
+from app import db
+
+def test_first_request_brings_an_old_schema_up_to_date(app, client, monkeypatch):
+    # A database from before drafts and content versions, that never saw init-db
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP TABLE transcript_draft'))
+            connection.execute(text('ALTER TABLE presentation DROP COLUMN version'))
+    monkeypatch.setattr(schema, '_schema_checked', False)
+
+    assert client.post('/api/drafts').status_code == 201
+    with app.app_context():
+        columns = {column['name'] for column in inspect(db.engine).get_columns('presentation')}
+    assert 'version' in columns
+    assert schema.schema_checked()
@@ -0,0 +1,17 @@
+import pytest
+from services.slide_generator import SlideGenerator, SLIDE_SYSTEM_PROMPT
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test')
+    monkeypatch.setenv('SLIDE_ENGINE', 'anthropic')
+    return SlideGenerator()
+
+def test_short_system_prompt_is_not_marked_for_caching(generator):
+    _, request = generator._slide_generation_request('word ' * 200)
+    assert request['system'] == [{'type': 'text', 'text': SLIDE_SYSTEM_PROMPT}]
+
+def test_cache_marker_follows_the_model_minimum(generator):
+    prefix = 'x' * 4 * 1500
+    assert generator.prompt_cache_control('claude-sonnet-4-20250514', prefix) == {'type': 'ephemeral'}
+    assert generator.prompt_cache_control('claude-3-5-haiku-20241022', prefix) is None
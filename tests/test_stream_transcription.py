@@ -0,0 +1,48 @@
+import json
+import pytest
+from simple_websocket import ConnectionClosed
+
+class FakeWebSocket:
+    def __init__(self, *messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    def receive(self, timeout=None):
+        if not self.messages:
+            raise ConnectionClosed()
+        return self.messages.pop(0)
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+@pytest.fixture
+def stream_transcription(app):
+    # flask-sock registers a wrapper that builds the socket from the request
+    return app.view_functions['stream_transcription'].__wrapped__
+
+@pytest.mark.parametrize('config', [
+    '[1, 2]',
+    '"pcm"',
+    'not json',
+    '{"sample_rate": 0}',
+    '{"sample_rate": 40}',
+    '{"sample_rate": 192000}',
+    '{"sample_rate": "fast"}',
+    '{"format": "mp3"}',
+])
+def test_invalid_configuration_is_reported(stream_transcription, config):
+    ws = FakeWebSocket(config)
+    stream_transcription(ws)
+    assert len(ws.sent) == 1
+    assert ws.sent[0]['type'] == 'error'
+    assert ws.sent[0]['error'].startswith('Invalid stream configuration')
+
+def test_disconnect_before_configuration(stream_transcription):
+    ws = FakeWebSocket()
+    stream_transcription(ws)
+    assert ws.sent == []
+
+def test_stop_ends_the_stream(stream_transcription):
+    ws = FakeWebSocket('{"format": "pcm", "sample_rate": 16000}', '[1]', '{"type": "stop"}')
+    stream_transcription(ws)
+    assert ws.sent == [{'type': 'final', 'transcript': ''}]
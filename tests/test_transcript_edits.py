@@ -0,0 +1,53 @@
+from app import db
+from models import Presentation
+from services.slide_generator import SlideGenerator
+
+ORIGINAL = (
+    "Solar power gives farmers a steady second income. Drip irrigation cuts water use by forty percent. "
+    "Cover crops protect the soil between seasons. Farms that adapt early keep their yields and their water. "
+    "Every farm should look at solar power, drip irrigation and cover crops."
+)
+
+REWRITTEN = (
+    "Quarterly revenue grew twelve percent, mostly from enterprise customers. Enterprise renewals reached "
+    "ninety five percent. The small business segment stayed flat. Next quarter the team focuses on renewals "
+    "and on reducing small business churn."
+)
+
+def create_presentation(app, monkeypatch):
+    monkeypatch.setenv('SLIDE_ENGINE', 'local')
+    with app.app_context():
+        generator = SlideGenerator()
+        slides = generator.generate_slides(ORIGINAL)
+        generator.assign_source_spans(ORIGINAL, slides)
+        presentation = Presentation(title='Farms', transcript=ORIGINAL, status='completed')
+        presentation.set_slides(slides)
+        db.session.add(presentation)
+        db.session.commit()
+        return presentation.id, slides
+
+def test_failed_full_regeneration_keeps_the_old_transcript(app, client, monkeypatch):
+    presentation_id, slides = create_presentation(app, monkeypatch)
+    monkeypatch.setattr(SlideGenerator, 'generate_slides', lambda self, *args, **kwargs: None)
+
+    response = client.post(f'/presentation/{presentation_id}/transcript', json={'transcript': REWRITTEN})
+    assert response.status_code == 500
+    with app.app_context():
+        presentation = db.session.get(Presentation, presentation_id)
+        assert presentation.transcript == ORIGINAL
+        assert presentation.get_slides() == slides
+
+def test_full_regeneration_saves_the_transcript_with_its_slides(app, client, monkeypatch):
+    presentation_id, slides = create_presentation(app, monkeypatch)
+
+    response = client.post(f'/presentation/{presentation_id}/transcript', json={'transcript': REWRITTEN})
+    assert response.get_json()['regenerated'] == 'all'
+    with app.app_context():
+        presentation = db.session.get(Presentation, presentation_id)
+        assert presentation.transcript == REWRITTEN
+        assert presentation.get_slides() != slides
+
+def test_unknown_presentation_and_bad_transcript(app, client, monkeypatch):
+    presentation_id, _ = create_presentation(app, monkeypatch)
+    assert client.post('/presentation/999999/transcript', json={'transcript': REWRITTEN}).status_code == 404
+    assert client.post(f'/presentation/{presentation_id}/transcript', json={'transcript': 5}).status_code == 400